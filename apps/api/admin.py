@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from apps.api.models import ApiToken
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ["id", "name", "user", "created_at"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    readonly_fields = ["key"]
@@ -0,0 +1,20 @@
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.db import models
+
+
+class ApiToken(models.Model):
+    """
+    A key authenticating a user's API requests, sent as an
+    "Authorization: Token <key>" header
+    """
+    key = models.CharField(max_length=64, unique=True, default=secrets.token_hex)
+    user = models.ForeignKey(
+        get_user_model(), related_name="api_tokens", on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name or f"Token of {self.user}"
@@ -0,0 +1,258 @@
+import datetime as dt
+import json
+import pytest
+
+from django import urls
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django_dynamic_fixture import G
+
+from apps.api.models import ApiToken
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+from apps.notifications.models import Notification
+
+
+@pytest.fixture
+def test_feed(authenticated_user):
+    return G(Feed, title="test_feed", subscriber=authenticated_user)
+
+
+@pytest.mark.parametrize(
+    "url_name, url_kwargs",
+    [
+        ("api:feeds", None),
+        ("api:feed_detail", {"pk": 1}),
+        ("api:items", None),
+        ("api:item_detail", {"pk": 1}),
+        ("api:bookmarks", None),
+        ("api:notifications", None),
+    ],
+)
+@pytest.mark.django_db
+def test_protected_views(client, url_name, url_kwargs):
+    """
+    Verify API views are protected from unauthenticated access
+    """
+    resp = client.get(urls.reverse(url_name, kwargs=url_kwargs))
+
+    assert resp.status_code == 401
+    assert resp.json() == {"error": "Authentication credentials were not provided"}
+
+    resp = client.get(
+        urls.reverse(url_name, kwargs=url_kwargs), HTTP_AUTHORIZATION="Token invalid"
+    )
+
+    assert resp.status_code == 401
+    assert resp.json() == {"error": "Invalid token"}
+
+
+@pytest.mark.django_db
+def test_token_auth(test_feed):
+    """
+    Verify requests are authenticated by their API token,
+    and only session authenticated requests need a CSRF token
+    """
+    token = G(ApiToken, user=test_feed.subscriber)
+    item = G(Item, feed=test_feed, subscriber=test_feed.subscriber)
+    client = Client(enforce_csrf_checks=True)
+
+    resp = client.get(urls.reverse("api:feeds"), HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    assert resp.status_code == 200
+    assert [feed["id"] for feed in resp.json()["results"]] == [test_feed.id]
+
+    resp = client.post(
+        urls.reverse("api:items_bookmark"),
+        json.dumps({"ids": [item.id], "bookmark": True}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=f"Token {token.key}",
+    )
+
+    assert resp.json() == {"updated": 1}
+
+    client.force_login(test_feed.subscriber)
+    resp = client.post(
+        urls.reverse("api:items_bookmark"),
+        json.dumps({"ids": [item.id], "bookmark": False}),
+        content_type="application/json",
+    )
+
+    assert resp.status_code == 403
+    assert resp.json() == {"error": "CSRF verification failed"}
+
+
+@pytest.mark.django_db
+def test_feeds(client, authenticated_user, test_feed):
+    """
+    Verify the user's feeds are listed with the default fields,
+    leaving out descriptions
+    """
+    G(Feed, subscriber=G(get_user_model()))
+    G(Item, feed=test_feed, subscriber=authenticated_user)
+
+    resp = client.get(urls.reverse("api:feeds"))
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [feed["id"] for feed in data["results"]] == [test_feed.id]
+    assert "description" not in data["results"][0]
+    assert data["next_cursor"] is None
+
+    resp = client.get(urls.reverse("api:feeds"), {"fields": "id,unread_count"})
+
+    assert resp.json()["results"] == [{"id": test_feed.id, "unread_count": 1}]
+
+
+@pytest.mark.django_db
+def test_unknown_fields(client, authenticated_user):
+    """
+    Verify selecting unknown fields is a bad request
+    """
+    resp = client.get(urls.reverse("api:items"), {"fields": "id,subscriber"})
+
+    assert resp.status_code == 400
+    assert resp.json() == {"error": "Unknown fields: subscriber"}
+
+
+@pytest.mark.django_db
+def test_items_cursor_pagination(client, authenticated_user, test_feed):
+    """
+    Verify items are paged newest first, following next_cursor
+    """
+    now = dt.datetime(2020, 6, 1)
+    items = [
+        G(
+            Item,
+            feed=test_feed,
+            subscriber=authenticated_user,
+            published_at=now - dt.timedelta(hours=i),
+        )
+        for i in range(5)
+    ]
+    G(Item, feed=G(Feed), subscriber=G(get_user_model()))
+
+    url = urls.reverse("api:items")
+    pages = []
+    params = {"fields": "id,title", "limit": 2}
+    while True:
+        data = client.get(url, params).json()
+        pages.append([item["id"] for item in data["results"]])
+        if not data["next_cursor"]:
+            break
+        params["cursor"] = data["next_cursor"]
+
+    assert pages == [
+        [items[0].id, items[1].id],
+        [items[2].id, items[3].id],
+        [items[4].id],
+    ]
+    assert set(data["results"][0]) == {"id", "title"}
+
+    resp = client.get(url, {"cursor": "invalid"})
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_item_detail(client, authenticated_user, test_feed):
+    """
+    Verify an item's detail includes its text, and other
+    users' items aren't found
+    """
+    item = G(Item, feed=test_feed, subscriber=authenticated_user, entry__description="foo")
+    other = G(Item, feed=G(Feed), subscriber=G(get_user_model()))
+
+    resp = client.get(urls.reverse("api:item_detail", kwargs={"pk": item.id}))
+
+    assert resp.status_code == 200
+    assert resp.json()["description"] == "foo"
+    assert resp.json()["feed_title"] == "test_feed"
+
+    resp = client.get(urls.reverse("api:item_detail", kwargs={"pk": other.id}))
+    assert resp.status_code == 404
+
+
+@pytest.mark.django_db
+def test_bookmarks(client, authenticated_user, test_feed):
+    """
+    Verify only bookmarked items are listed
+    """
+    bookmarked = G(Item, feed=test_feed, subscriber=authenticated_user, bookmark=True)
+    G(Item, feed=test_feed, subscriber=authenticated_user, bookmark=False)
+
+    data = client.get(urls.reverse("api:bookmarks")).json()
+
+    assert [item["id"] for item in data["results"]] == [bookmarked.id]
+
+
+@pytest.mark.django_db
+def test_etag(client, authenticated_user):
+    """
+    Verify an unchanged response is answered with a 304
+    """
+    G(Notification, user=authenticated_user)
+    url = urls.reverse("api:notifications")
+
+    resp = client.get(url)
+    etag = resp["ETag"]
+
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 304
+    assert not resp.content
+
+    G(Notification, user=authenticated_user)
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert len(resp.json()["results"]) == 2
+
+
+@pytest.mark.django_db
+def test_bulk_update_items(client, authenticated_user, test_feed):
+    """
+    Verify items are marked read and bookmarked in bulk,
+    leaving other users' items untouched
+    """
+    items = [
+        G(Item, feed=test_feed, subscriber=authenticated_user)
+        for _ in range(3)
+    ]
+    other = G(Item, feed=G(Feed), subscriber=G(get_user_model()))
+    ids = [item.id for item in items[:2]] + [other.id]
+
+    resp = client.post(
+        urls.reverse("api:items_unread"),
+        json.dumps({"ids": ids, "unread": False}),
+        content_type="application/json",
+    )
+
+    assert resp.json() == {"updated": 2}
+    assert [item.id for item in Item.objects.order_by("id") if item.unread] == [
+        items[2].id,
+        other.id,
+    ]
+
+    resp = client.post(
+        urls.reverse("api:items_bookmark"),
+        json.dumps({"ids": [items[2].id], "bookmark": True}),
+        content_type="application/json",
+    )
+
+    assert resp.json() == {"updated": 1}
+    assert Item.objects.get(id=items[2].id).bookmark
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "body",
+    ["not json", json.dumps({"ids": ["1"], "unread": False}), json.dumps({"ids": [1]})],
+)
+def test_bulk_update_invalid(client, authenticated_user, body):
+    """
+    Verify malformed bulk updates are bad requests
+    """
+    resp = client.post(
+        urls.reverse("api:notifications_unread"), body, content_type="application/json"
+    )
+
+    assert resp.status_code == 400
+    assert "error" in resp.json()
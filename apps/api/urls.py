@@ -0,0 +1,26 @@
+from django.urls import path
+
+import apps.api.views as api_views
+
+
+app_name = "api"
+urlpatterns = [
+    path("v1/feeds/", api_views.FeedList.as_view(), name="feeds"),
+    path("v1/feeds/<int:pk>/", api_views.FeedDetail.as_view(), name="feed_detail"),
+    path("v1/items/", api_views.ItemList.as_view(), name="items"),
+    path("v1/items/<int:pk>/", api_views.ItemDetail.as_view(), name="item_detail"),
+    path("v1/items/unread/", api_views.MarkItemsUnread.as_view(), name="items_unread"),
+    path("v1/items/bookmark/", api_views.BookmarkItems.as_view(), name="items_bookmark"),
+    path("v1/bookmarks/", api_views.BookmarkList.as_view(), name="bookmarks"),
+    path("v1/notifications/", api_views.NotificationList.as_view(), name="notifications"),
+    path(
+        "v1/notifications/<int:pk>/",
+        api_views.NotificationDetail.as_view(),
+        name="notification_detail",
+    ),
+    path(
+        "v1/notifications/unread/",
+        api_views.MarkNotificationsUnread.as_view(),
+        name="notifications_unread",
+    ),
+]
@@ -0,0 +1,403 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.middleware.http import ConditionalGetMiddleware
+from django.utils.decorators import decorator_from_middleware
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic import View
+from stronghold.decorators import public
+
+from apps.api.models import ApiToken
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+from apps.feeds.models import Profile
+from apps.feeds.models import ReadState
+from apps.notifications.models import Notification
+from rss_scraper.pagination import InvalidCursor
+from rss_scraper.pagination import paginate_keyset
+
+# Sets a hash of the body as ETag, and answers a matching
+# If-None-Match with a bodyless 304
+conditional_get = method_decorator(
+    decorator_from_middleware(ConditionalGetMiddleware), name="dispatch"
+)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder)
+
+
+@method_decorator(public, name="dispatch")
+@method_decorator(csrf_exempt, name="dispatch")
+class ApiView(View):
+    """
+    Base of the JSON API views, rendering ApiErrors as JSON. Views
+    authenticate requests themselves (see authenticate), rather than
+    redirecting them to the login page
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.authenticate(request)
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as exc:
+            return api_response({"error": str(exc)}, status=exc.status)
+
+    def authenticate(self, request):
+        """
+        Authenticate a request by its "Authorization: Token <key>" header,
+        or else by the website's session. Browsers don't send the header on
+        their own, so only session authenticated requests need a CSRF token
+
+        :param request: HttpRequest
+        :return: None
+        :raises: ApiError - 401 without valid credentials, 403 without
+            the CSRF token of a session
+        """
+        scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "token":
+            token = ApiToken.objects.select_related("user").filter(key=key.strip()).first()
+            if token is None or not token.user.is_active:
+                raise ApiError("Invalid token", status=401)
+            request.user = token.user
+            return
+
+        if not request.user.is_authenticated:
+            raise ApiError("Authentication credentials were not provided", status=401)
+        if CsrfViewMiddleware().process_view(request, None, (), {}) is not None:
+            raise ApiError("CSRF verification failed", status=403)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        response = api_response({"error": "Method not allowed"}, status=405)
+        response["Allow"] = ", ".join(
+            method.upper() for method in self._allowed_methods()
+        )
+        return response
+
+
+@conditional_get
+class ResourceView(ApiView):
+    """
+    Base of the views reading a resource: the rows of model owned by
+    the user. Clients select the fields to read with ?fields=a,b, only
+    the selected columns are queried
+    """
+    model = None
+    # Field pointing to the user owning a row
+    owner_field = "user"
+    # Field name -> lookup of the field's value
+    fields = {}
+    # Fields read when none are selected, leave out large text columns
+    default_fields = []
+
+    def get_queryset(self, fields):
+        """
+        :param fields: List - Selected field names
+        :return: QuerySet
+        """
+        return self.model.objects.filter(**{self.owner_field: self.request.user})
+
+    def get_fields(self):
+        selected = self.request.GET.get("fields")
+        if not selected:
+            return self.default_fields
+
+        fields = [name for name in selected.split(",") if name]
+        unknown = set(fields) - set(self.fields)
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return fields
+
+    def get_values(self, fields, extra=()):
+        """
+        Query the rows' values of given fields (plus extra ones, e.g. to
+        order by), rather than whole model instances
+
+        :return: QuerySet - Dicts keyed by field name
+        """
+        names = list(dict.fromkeys([*fields, *extra]))
+        queryset = self.get_queryset(fields)
+        return queryset.values(
+            *[name for name in names if self.fields.get(name, name) == name],
+            **{
+                name: F(self.fields[name])
+                for name in names
+                if self.fields.get(name, name) != name
+            },
+        )
+
+
+class ListView(ResourceView):
+    """
+    A cursor paginated list of a resource. Responds with
+    {"results": [...], "next_cursor": str or null}
+    """
+    # Keyset ordering, see paginate_keyset
+    ordering = ["-id"]
+    nullable = ()
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.GET.get("limit", settings.API_PAGE_SIZE))
+        except ValueError:
+            raise ApiError("Invalid limit")
+        return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        names = [field.lstrip("-") for field in self.ordering]
+
+        try:
+            rows, next_cursor = paginate_keyset(
+                self.get_values(fields, extra=names),
+                self.ordering,
+                cursor=request.GET.get("cursor"),
+                page_size=self.get_page_size(),
+                nullable=self.nullable,
+            )
+        except InvalidCursor as exc:
+            raise ApiError(str(exc))
+
+        return api_response(
+            {
+                "results": [{name: row[name] for name in fields} for row in rows],
+                "next_cursor": next_cursor,
+            }
+        )
+
+
+class DetailView(ResourceView):
+    def get(self, request, pk, *args, **kwargs):
+        fields = self.get_fields()
+        row = self.get_values(fields).filter(pk=pk).first()
+        if row is None:
+            raise ApiError("Not found", status=404)
+        return api_response(row)
+
+
+class BulkUpdateView(ApiView):
+    """
+    Set a boolean field of several of the user's rows at once.
+    Takes a JSON body of {"ids": [...], <field>: true|false},
+    responds with {"updated": <count of rows updated>}
+    """
+    model = None
+    field = None
+    # Field pointing to the user owning a row
+    owner_field = "user"
+    # Whether updates change what the user's pages show, see conditional_page
+    touches_read_state = False
+
+    def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            raise ApiError("Invalid JSON")
+
+        ids = data.get("ids") if isinstance(data, dict) else None
+        value = data.get(self.field) if isinstance(data, dict) else None
+        if (
+            not isinstance(ids, list)
+            or not all(isinstance(pk, int) for pk in ids)
+            or not isinstance(value, bool)
+        ):
+            raise ApiError(f'Expected {{"ids": [int, ...], "{self.field}": bool}}')
+        if len(ids) > settings.API_MAX_BULK_SIZE:
+            raise ApiError(f"At most {settings.API_MAX_BULK_SIZE} ids per request")
+
+        updated = self.update(request.user, ids, value)
+        if updated and self.touches_read_state:
+            Profile.objects.touch_read_state(request.user)
+        return api_response({"updated": updated})
+
+    def update(self, user, ids, value):
+        """
+        :return: int - Count of rows updated
+        """
+        return (
+            self.model.objects.filter(**{self.owner_field: user, "pk__in": ids})
+            .exclude(**{self.field: value})
+            .update(**{self.field: value})
+        )
+
+
+class FeedResource:
+    model = Feed
+    owner_field = "subscriber"
+    fields = {
+        "id": "id",
+        "title": "title",
+        "link": "link",
+        "description": "description",
+        "rss_url": "rss_url",
+        "folder": "folder",
+        "status": "status",
+        "last_updated_at": "last_updated_at",
+        "unread_count": "unread",
+    }
+    default_fields = [
+        "id", "title", "link", "rss_url", "folder", "status", "last_updated_at"
+    ]
+
+    def get_queryset(self, fields):
+        if "unread_count" in fields:
+            # Only count unread items when asked to
+            return Feed.objects.annotate_unread_items_count(self.request.user)
+        return super().get_queryset(fields)
+
+
+class FeedList(FeedResource, ListView):
+    ordering = ["title", "id"]
+
+
+class FeedDetail(FeedResource, DetailView):
+    pass
+
+
+class ItemResource:
+    model = Item
+    owner_field = "subscriber"
+    fields = {
+        "id": "id",
+        "feed_id": "feed_id",
+        "feed_title": "feed__title",
+        "title": "entry__title",
+        "link": "entry__link",
+        "description": "entry__description",
+        "summary": "entry__summary",
+        "excerpt": "entry__excerpt",
+        "content_length": "entry__content_length",
+        "unread": "unread",
+        "bookmark": "bookmark",
+        "published_at": "published_at",
+    }
+    default_fields = [
+        "id",
+        "feed_id",
+        "title",
+        "link",
+        "excerpt",
+        "content_length",
+        "unread",
+        "bookmark",
+        "published_at",
+    ]
+
+    def get_queryset(self, fields):
+        items = super().get_queryset(fields)
+        if "unread" in fields or self.request.GET.get("unread") == "1":
+            items = items.annotate_unread(self.request.user)
+        return items
+
+
+class ItemList(ItemResource, ListView):
+    """
+    Items of all the user's feeds, newest first. Filtered
+    with ?feed=<id>, ?folder=<name> and ?unread=1
+    """
+    ordering = ["-published_at", "-id"]
+    nullable = ["published_at"]
+
+    def get_queryset(self, fields):
+        items = super().get_queryset(fields)
+        params = self.request.GET
+
+        if params.get("feed"):
+            if not params["feed"].isdigit():
+                raise ApiError("Invalid feed")
+            items = items.filter(feed_id=params["feed"])
+        if params.get("folder") is not None:
+            items = items.filter(feed__folder=params["folder"])
+        if params.get("unread") == "1":
+            items = items.filter(unread=True)
+        return items
+
+
+class ItemDetail(ItemResource, DetailView):
+    default_fields = list(ItemResource.fields)
+
+
+class BookmarkList(ItemList):
+    """
+    The user's bookmarked items, newest first
+    """
+
+    def get_queryset(self, fields):
+        return super().get_queryset(fields).filter(bookmark=True)
+
+
+class MarkItemsUnread(BulkUpdateView):
+    model = Item
+    field = "unread"
+    owner_field = "subscriber"
+    touches_read_state = True
+
+    def update(self, user, ids, value):
+        feed_items = defaultdict(list)
+        items = Item.objects.filter(subscriber=user, pk__in=ids)
+        for feed_id, item_id in items.values_list("feed_id", "id"):
+            feed_items[feed_id].append(item_id)
+
+        for feed_id, item_ids in feed_items.items():
+            if value:
+                ReadState.objects.mark_unread(feed_id, item_ids)
+            else:
+                ReadState.objects.mark_read(feed_id, item_ids)
+        return sum(len(item_ids) for item_ids in feed_items.values())
+
+
+class BookmarkItems(BulkUpdateView):
+    model = Item
+    field = "bookmark"
+    owner_field = "subscriber"
+    touches_read_state = True
+
+
+class NotificationResource:
+    model = Notification
+    fields = {
+        "id": "id",
+        "title": "title",
+        "details": "details",
+        "unread": "unread",
+        "created_at": "created_at",
+        "occurrences": "occurrences",
+        "last_seen_at": "last_seen_at",
+    }
+    default_fields = [
+        "id", "title", "unread", "created_at", "occurrences", "last_seen_at"
+    ]
+
+
+class NotificationList(NotificationResource, ListView):
+    """
+    The user's notifications, newest first. Filtered with ?unread=1
+    """
+    ordering = ["-created_at", "-id"]
+
+    def get_queryset(self, fields):
+        notifications = super().get_queryset(fields)
+        if self.request.GET.get("unread") == "1":
+            notifications = notifications.filter(unread=True)
+        return notifications
+
+
+class NotificationDetail(NotificationResource, DetailView):
+    default_fields = list(NotificationResource.fields)
+
+
+class MarkNotificationsUnread(BulkUpdateView):
+    model = Notification
+    field = "unread"
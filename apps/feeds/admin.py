@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.contrib import admin
+
+from apps.feeds.models import Comment
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+from apps.feeds.tasks import purge_feed_items
+from apps.feeds.tasks import quarantine_feeds
+from apps.feeds.tasks import refresh_feeds
+from apps.feeds.url_utils import normalize_url
+from rss_scraper.admin import LargeTableAdmin
+
+
+@admin.register(Feed)
+class FeedAdmin(LargeTableAdmin):
+    list_display = [
+        "id",
+        "title",
+        "rss_url",
+        "subscriber",
+        "status",
+        "consecutive_failures",
+        "last_updated_at",
+        "next_attempt_at",
+    ]
+    list_filter = ["status"]
+    list_select_related = ["subscriber"]
+    raw_id_fields = ["subscriber"]
+    search_lookups = ["id", "rss_url", "subscriber__username"]
+    actions = ["refresh", "quarantine", "purge_items"]
+
+    def get_search_results(self, request, queryset, search_term):
+        if "://" in search_term:
+            # Feed urls are stored normalized
+            search_term = normalize_url(search_term.strip())
+        return super().get_search_results(request, queryset, search_term)
+
+    def run_in_background(self, request, queryset, task, description):
+        """
+        Run a task over the selected feeds, by batches of
+        ADMIN_ACTION_BATCH_SIZE feeds
+        """
+        feed_ids = list(queryset.values_list("id", flat=True))
+        batch_size = settings.ADMIN_ACTION_BATCH_SIZE
+        for start in range(0, len(feed_ids), batch_size):
+            task.delay(feed_ids[start : start + batch_size])
+        self.message_user(request, f"{description} of {len(feed_ids)} feeds queued")
+
+    def refresh(self, request, queryset):
+        self.run_in_background(request, queryset, refresh_feeds, "Refresh")
+
+    refresh.short_description = "Refresh selected feeds now"
+
+    def quarantine(self, request, queryset):
+        self.run_in_background(request, queryset, quarantine_feeds, "Quarantine")
+
+    quarantine.short_description = "Quarantine selected feeds"
+
+    def purge_items(self, request, queryset):
+        self.run_in_background(request, queryset, purge_feed_items, "Purge")
+
+    purge_items.short_description = "Purge the items of selected feeds, but bookmarks"
+
+
+@admin.register(Item)
+class ItemAdmin(LargeTableAdmin):
+    list_display = ["id", "__str__", "feed", "subscriber", "bookmark", "published_at"]
+    list_filter = ["bookmark"]
+    list_select_related = ["entry", "feed", "subscriber"]
+    raw_id_fields = ["entry", "feed", "subscriber"]
+    search_lookups = ["id", "feed_id", "subscriber__username"]
+
+    def get_queryset(self, request):
+        # Leave the entries' and feeds' content out of changelists
+        return (
+            super()
+            .get_queryset(request)
+            .defer("entry__description", "entry__summary", "feed__description")
+        )
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ["id", "__str__", "item", "created_at"]
+    list_select_related = ["item__entry"]
+    raw_id_fields = ["item"]
+    search_lookups = ["id", "item_id"]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer(
+            "item__entry__description", "item__entry__summary"
+        )
@@ -0,0 +1,317 @@
+import datetime as dt
+import json
+import random
+import subprocess
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db import transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+
+
+class BenchmarkRollback(Exception):
+    pass
+
+
+WORDS = (
+    "feed item news update article report world market science health sport "
+    "travel culture music film review opinion analysis weather city policy data "
+    "energy climate election economy research technology startup phone release"
+).split()
+
+
+# name -> (number of feeds, entries per feed, options)
+SCENARIOS = {
+    "many_feeds": (200, 20, {}),
+    "huge_feeds": (4, 5000, {}),
+    "atom_feeds": (100, 50, {"fmt": "atom"}),
+    "malformed_feeds": (100, 20, {"malformed_ratio": 0.3}),
+    "duplicate_feeds": (50, 200, {"duplicate_ratio": 0.8}),
+}
+
+
+def generate_feed(entries, fmt="rss", duplicate_ratio=0.0, malformed=False, seed=0):
+    """
+    Generate a synthetic RSS 2.0 or Atom document
+
+    :param entries: int - Number of entries/items in the feed
+    :param fmt: str - "rss" or "atom"
+    :param duplicate_ratio: float - Share of entries repeating an earlier entry
+    :param malformed: Boolean - Truncate the document so it fails to parse
+    :param seed: int - Seed making the generated content reproducible
+    :return: bytes - feed xml
+    """
+    rnd = random.Random(seed)
+    published = dt.datetime(2020, 7, 1)
+    unique = []
+    parts = []
+
+    for i in range(entries):
+        if unique and rnd.random() < duplicate_ratio:
+            title, link, body, date = rnd.choice(unique)
+        else:
+            title = escape(f"Entry {seed}-{i} " + " ".join(rnd.choices(WORDS, k=8)))
+            link = f"https://bench.example.com/{seed}/{i}"
+            body = escape(" ".join(rnd.choices(WORDS, k=rnd.randint(40, 400))))
+            date = published - dt.timedelta(minutes=i)
+            unique.append((title, link, body, date))
+
+        if fmt == "atom":
+            parts.append(
+                f"<entry><title>{title}</title><link href=\"{link}\"/><id>{link}</id>"
+                f"<updated>{date.isoformat()}Z</updated><summary>{body}</summary>"
+                f"</entry>"
+            )
+        else:
+            parts.append(
+                f"<item><title>{title}</title><link>{link}</link><guid>{link}</guid>"
+                f"<pubDate>{date.strftime('%a, %d %b %Y %H:%M:%S +0000')}</pubDate>"
+                f"<description>{body}</description></item>"
+            )
+
+    if fmt == "atom":
+        doc = (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>Bench feed {seed}</title>"
+            f'<link href="https://bench.example.com/{seed}"/>'
+            f"<subtitle>Synthetic feed {seed}</subtitle>"
+            f"<id>https://bench.example.com/{seed}</id>"
+            f"<updated>{published.isoformat()}Z</updated>"
+            f"{''.join(parts)}</feed>"
+        )
+    else:
+        doc = (
+            '<?xml version="1.0" encoding="utf-8"?>\n<rss version="2.0"><channel>'
+            f"<title>Bench feed {seed}</title>"
+            f"<link>https://bench.example.com/{seed}</link>"
+            f"<description>Synthetic feed {seed}</description>"
+            f"{''.join(parts)}</channel></rss>"
+        )
+
+    if malformed:
+        doc = doc[: len(doc) // 2]
+    return doc.encode("utf-8")
+
+
+def generate_corpus(scenario, scale=1.0):
+    """
+    Generate all feed documents of a benchmark scenario
+
+    :param scenario: str - Key of SCENARIOS
+    :param scale: float - Multiplier applied to the number of feeds
+    :return: Dict - url path -> feed xml
+    """
+    feeds, entries, options = SCENARIOS[scenario]
+    options = dict(options)
+    fmt = options.pop("fmt", "rss")
+    malformed_ratio = options.pop("malformed_ratio", 0.0)
+    rnd = random.Random(scenario)
+
+    corpus = {}
+    for i in range(max(1, int(feeds * scale))):
+        corpus[f"/{scenario}/{i}.xml"] = generate_feed(
+            entries,
+            fmt=fmt,
+            malformed=rnd.random() < malformed_ratio,
+            seed=i,
+            **options,
+        )
+    return corpus
+
+
+class CorpusServer:
+    """
+    A local HTTP stand-in for feed publishers, serving
+    a generated corpus from a background thread
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+
+    def __enter__(self):
+        corpus = self.corpus
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = corpus.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, path):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}{path}"
+
+
+def run_benchmark(scenario, scale=1.0):
+    """
+    Measure update_feed_items end to end over a scenario's corpus.
+    Celery tasks run eagerly and every database change is rolled back.
+
+    Throughput is timed on a pass without instrumentation, memory and
+    queries are measured on a second pass over a fresh copy of the feeds:
+    tracing allocations and capturing queries slow ingestion down unevenly
+
+    :param scenario: str - Key of SCENARIOS
+    :param scale: float - Multiplier applied to the number of feeds
+    :return: Dict - measured metrics
+    """
+    from apps.feeds.fetcher import dns_cache
+    from rss_scraper.celery import app
+
+    corpus = generate_corpus(scenario, scale)
+    result = {"scenario": scenario, "scale": scale, "feeds": len(corpus)}
+    always_eager = app.conf.task_always_eager
+    app.conf.task_always_eager = True
+
+    try:
+        with CorpusServer(corpus) as server:
+            dns_cache.clear()
+            timed = ingest_corpus(server, corpus)
+            dns_stats = dns_cache.stats()
+            measured = ingest_corpus(server, corpus, measure=True)
+    finally:
+        app.conf.task_always_eager = always_eager
+
+    seconds = timed["seconds"]
+    result.update(
+        {
+            "seconds": round(seconds, 4),
+            "entries": timed["entries"],
+            "feeds_per_sec": round(len(corpus) / seconds, 2),
+            "entries_per_sec": round(timed["entries"] / seconds, 2),
+            "peak_memory_kb": measured["peak_memory"] // 1024,
+            "queries_per_feed": round(
+                sum(measured["queries"]) / len(measured["queries"]), 2
+            ),
+            "max_queries_per_feed": max(measured["queries"]),
+            "dns_hit_rate": dns_stats["hit_rate"],
+            "dns_resolve_ms": dns_stats["resolve_ms"],
+        }
+    )
+    return result
+
+
+def ingest_corpus(server, corpus, measure=False):
+    """
+    Follow every feed of a corpus and update them all, rolling back
+    the changes afterwards
+
+    :param server: CorpusServer - Serving the corpus
+    :param corpus: Dict - Path -> feed body, see generate_corpus
+    :param measure: Boolean - Trace allocations and capture the
+        queries of each feed's update
+    :return: Dict - "seconds" and "entries", and when measured
+        "peak_memory" (bytes) and "queries" (count per feed)
+    """
+    from apps.feeds.tasks import update_feed_items
+
+    stats = {"queries": []}
+    try:
+        with transaction.atomic():
+            user = get_user_model().objects.create(username="benchmark")
+            feed_ids = [
+                Feed.objects.create(
+                    title=path, link=path, description=path,
+                    rss_url=server.url(path), subscriber=user,
+                ).pk
+                for path in corpus
+            ]
+
+            if measure:
+                tracemalloc.start()
+            started = time.perf_counter()
+            for feed_id in feed_ids:
+                if measure:
+                    with CaptureQueriesContext(connection) as ctx:
+                        update_feed_items(feed_id)
+                    stats["queries"].append(len(ctx.captured_queries))
+                else:
+                    update_feed_items(feed_id)
+            stats["seconds"] = time.perf_counter() - started
+            if measure:
+                stats["peak_memory"] = tracemalloc.get_traced_memory()[1]
+
+            stats["entries"] = Item.objects.filter(feed_id__in=feed_ids).count()
+            raise BenchmarkRollback()
+    except BenchmarkRollback:
+        pass
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return stats
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_results(path):
+    """
+    Read stored benchmark results, one JSON object per line
+
+    :param path: str - Results file
+    :return: List - results in the order they were recorded
+    """
+    try:
+        with open(path) as results_file:
+            return [json.loads(line) for line in results_file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def record_result(result, path):
+    """
+    Append a benchmark result, tagged with the current commit,
+    and return the previous result of the same scenario and scale
+
+    :param result: Dict - Output of run_benchmark
+    :param path: str - Results file
+    :return: Dict or None
+    """
+    previous = None
+    for stored in load_results(path):
+        if stored["scenario"] == result["scenario"] and stored["scale"] == result["scale"]:
+            previous = stored
+
+    result = dict(
+        result,
+        commit=current_commit(),
+        recorded_at=dt.datetime.utcnow().isoformat(timespec="seconds"),
+    )
+    with open(path, "a") as results_file:
+        results_file.write(json.dumps(result, sort_keys=True) + "\n")
+    return previous
+
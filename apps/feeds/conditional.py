@@ -0,0 +1,114 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import Q
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+from apps.feeds.models import Profile
+
+
+def conditional_page(stamp_func):
+    """
+    Decorate a view of a user's page to answer If-None-Match and
+    If-Modified-Since with a 304, from cheap version stamps of the
+    data the page shows rather than by rendering it. Every page
+    is stamped with the user's read state version and unread
+    notifications count, shown in the sidebar
+
+    :param stamp_func: Callable - Given the request and the view's
+        kwargs, returns a tuple of (list of values the page depends on,
+        list of datetimes it was last changed at), or None if the page's
+        object doesn't exist
+    :return: Callable - View decorator
+    """
+
+    def get_state(request, *args, **kwargs):
+        if not hasattr(request, "_page_state"):
+            request._page_state = page_state(request, stamp_func(request, **kwargs))
+        return request._page_state
+
+    def etag(request, *args, **kwargs):
+        return get_state(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return get_state(request, *args, **kwargs)[1]
+
+    def decorator(view):
+        # Browsers may store the page, but must revalidate it before reuse
+        return cache_control(private=True, no_cache=True)(
+            condition(etag_func=etag, last_modified_func=last_modified)(view)
+        )
+
+    return decorator
+
+
+def page_state(request, stamps):
+    """
+    :param request: HttpRequest
+    :param stamps: Tuple - See conditional_page's stamp_func
+    :return: Tuple - (ETag, Last-Modified datetime), (None, None)
+        if the page can't be stamped
+    """
+    if stamps is None:
+        return None, None
+    values, modified = stamps
+
+    profile = (
+        Profile.objects.filter(user=request.user)
+        .annotate(
+            unread_notifications=Count(
+                "user__notifications", filter=Q(user__notifications__unread=True)
+            )
+        )
+        .values("read_state_version", "read_state_updated_at", "unread_notifications")
+        .first()
+    )
+    if profile is None:
+        return None, None
+
+    values = [
+        request.user.pk,
+        # Pages embed a CSRF token, don't reuse them once it rotates
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME),
+        profile["read_state_version"],
+        profile["unread_notifications"],
+        *values,
+    ]
+    etag = hashlib.md5(repr(values).encode()).hexdigest()
+
+    modified = [profile["read_state_updated_at"], *modified]
+    return etag, max(filter(None, modified), default=None)
+
+
+def feed_stamps(request, pk):
+    feed = (
+        Feed.objects.filter(pk=pk, subscriber=request.user)
+        .values_list("last_updated_at", "status")
+        .first()
+    )
+    if feed is None:
+        return None
+    return list(feed), [feed[0]]
+
+
+def bookmarks_stamps(request):
+    feeds = Feed.objects.filter(subscriber=request.user).aggregate(
+        count=Count("id"), last_updated_at=Max("last_updated_at")
+    )
+    return [feeds["count"], feeds["last_updated_at"]], [feeds["last_updated_at"]]
+
+
+def item_stamps(request, pk):
+    item = (
+        Item.objects.filter(pk=pk, feed__subscriber=request.user)
+        .values_list("bookmark", "feed__last_updated_at")
+        .first()
+    )
+    if item is None:
+        return None
+    return list(item), [item[1]]
@@ -1,7 +1,7 @@
-from dateutil import parser
-
-
 def str_to_datetime(str_datetime):
+    # Imported on first use, the web processes don't parse dates
+    from dateutil import parser
+
     if not str_datetime:
         return None
 
@@ -0,0 +1,177 @@
+import logging
+import socket
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.connectionpool import HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class DNSCache:
+    """
+    In process cache of host name resolutions, shared by all fetches
+    of a worker. getaddrinfo doesn't report the records' TTL, so
+    resolutions are cached for a fixed ttl (keep it at or below the
+    TTL of the records fetched). Failed resolutions are cached for
+    negative_ttl, so dead hosts don't hit the resolver on every poll.
+
+    :param ttl: int - Seconds to cache resolved addresses
+    :param negative_ttl: int - Seconds to cache failed resolutions
+    :param max_size: int - Maximum cached host names
+    :param stats_interval: int - Log the stats every so many lookups
+    :param resolver: Callable - getaddrinfo compatible resolver,
+        defaults to socket.getaddrinfo (as patched by gevent, if so)
+    :param clock: Callable - Monotonic time in seconds
+    """
+
+    def __init__(
+        self,
+        ttl,
+        negative_ttl,
+        max_size=10000,
+        stats_interval=None,
+        resolver=None,
+        clock=time.monotonic,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.stats_interval = stats_interval
+        self.resolver = resolver
+        self.clock = clock
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.resolve_seconds = 0.0
+
+    def getaddrinfo(self, host, port, family=0, type=socket.SOCK_STREAM):
+        """
+        Resolve host like socket.getaddrinfo, from the cache if possible
+
+        :return: List - (family, type, proto, canonname, sockaddr) tuples
+        :raises: socket.gaierror
+        """
+        key = (host, port, family, type)
+        now = self.clock()
+
+        entry = self.entries.get(key)
+        if entry and entry[0] > now:
+            self.hits += 1
+            result = entry[1]
+        else:
+            self.misses += 1
+            started = self.clock()
+            try:
+                resolver = self.resolver or socket.getaddrinfo
+                result = resolver(host, port, family, type)
+                ttl = self.ttl
+            except socket.gaierror as exc:
+                result = exc
+                ttl = self.negative_ttl
+            self.resolve_seconds += self.clock() - started
+
+            if len(self.entries) >= self.max_size:
+                # Evict the oldest resolution
+                self.entries.pop(next(iter(self.entries)))
+            self.entries.pop(key, None)
+            self.entries[key] = (now + ttl, result)
+
+        if self.stats_interval and (self.hits + self.misses) % self.stats_interval == 0:
+            logger.info("DNS cache stats=%s", self.stats())
+        if isinstance(result, socket.gaierror):
+            raise result
+        return result
+
+    def clear(self):
+        """
+        Drop cached resolutions and reset the stats
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.resolve_seconds = 0.0
+
+    def stats(self):
+        """
+        :return: Dict - Lookups, hit rate and mean resolver latency (ms)
+        """
+        lookups = self.hits + self.misses
+        return {
+            "lookups": lookups,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "resolve_ms": (
+                round(self.resolve_seconds / self.misses * 1000, 3) if self.misses else 0.0
+            ),
+            "size": len(self.entries),
+        }
+
+
+class CachedDNSConnectionMixin:
+    """
+    Connect to the addresses of the connection pool's DNS cache.
+    The host name is still used for SNI, certificate checks and the
+    Host header
+    """
+    dns_cache = None
+
+    def _new_conn(self):
+        try:
+            addresses = self.dns_cache.getaddrinfo(self.host, self.port)
+        except socket.gaierror as exc:
+            raise NewConnectionError(
+                self, f"Failed to establish a new connection: {exc}"
+            )
+
+        dns_host = self._dns_host
+        try:
+            for i, (_, _, _, _, sockaddr) in enumerate(addresses):
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError):
+                    # Try the host's next address, like socket.create_connection
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+
+
+class CachedDNSAdapter(HTTPAdapter):
+    """
+    Transport adapter resolving host names through a DNS cache
+
+    :param dns_cache: DNSCache
+    """
+
+    def __init__(self, dns_cache, **kwargs):
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        def connection_cls(base):
+            return type(
+                f"CachedDNS{base.__name__}",
+                (CachedDNSConnectionMixin, base),
+                {"dns_cache": self.dns_cache},
+            )
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type(
+                "CachedDNSHTTPConnectionPool",
+                (HTTPConnectionPool,),
+                {"ConnectionCls": connection_cls(HTTPConnection)},
+            ),
+            "https": type(
+                "CachedDNSHTTPSConnectionPool",
+                (HTTPSConnectionPool,),
+                {"ConnectionCls": connection_cls(HTTPSConnection)},
+            ),
+        }
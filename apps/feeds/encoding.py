@@ -0,0 +1,81 @@
+import codecs
+import re
+
+# Bytes sniffed by chardet when no declared encoding decodes a feed
+DETECTION_PREFIX_SIZE = 64 * 1024
+
+BOMS = [
+    # UTF-32 LE's BOM starts with UTF-16 LE's, check it first
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+XML_DECLARATION_ENCODING = re.compile(
+    rb"^\s*<\?xml[^>]*?encoding\s*=\s*[\"']([\w.:-]+)[\"']"
+)
+XML_DECLARATION_ENCODING_STR = re.compile(
+    r"^(\ufeff?\s*<\?xml[^>]*?encoding\s*=\s*)([\"'])[\w.:-]+\2"
+)
+
+
+def decode_feed(content, content_type=None):
+    """
+    Decode a feed's raw bytes, without running encoding detection
+    over the whole document (as requests' Response.text does when
+    no charset is given). Encodings are tried in order:
+    1) byte order mark
+    2) charset of the Content-Type header
+    3) encoding of the XML declaration
+    4) utf-8
+    5) chardet, over the first DETECTION_PREFIX_SIZE bytes only
+
+    :param content: bytes - Feed's raw body
+    :param content_type: str - Content-Type response header
+    :return: str
+    """
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return content[len(bom):].decode(encoding, errors="replace")
+
+    candidates = []
+    charset = CHARSET.search(content_type or "")
+    if charset:
+        candidates.append(charset.group(1))
+    declaration = XML_DECLARATION_ENCODING.match(content[:1024])
+    if declaration:
+        candidates.append(declaration.group(1).decode("ascii"))
+    candidates.append("utf-8")
+
+    for encoding in candidates:
+        try:
+            return content.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+
+    return content.decode(detect_encoding(content), errors="replace")
+
+
+def detect_encoding(content):
+    import chardet
+
+    encoding = chardet.detect(content[:DETECTION_PREFIX_SIZE])["encoding"]
+    try:
+        return codecs.lookup(encoding).name
+    except (TypeError, LookupError):
+        return "windows-1252"
+
+
+def encode_feed(text):
+    """
+    Encode a decoded feed as utf-8, declaring utf-8 in its
+    XML declaration so the parser doesn't decode it again
+    with the originally declared encoding
+
+    :param text: str - Decoded feed
+    :return: bytes
+    """
+    text = XML_DECLARATION_ENCODING_STR.sub(r"\1\2utf-8\2", text, count=1)
+    return text.lstrip("\ufeff").encode("utf-8")
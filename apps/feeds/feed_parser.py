@@ -1,11 +1,36 @@
-import feedparser
+from typing import NamedTuple
+from typing import Optional
+
+from apps.feeds.encoding import encode_feed
 
 
 class ParseContentError(Exception):
     pass
 
 
+class ParsedEntry(NamedTuple):
+    """
+    The fields of a parsed feed entry that are stored. Passed between
+    the parse and store tasks, where it's serialized as a JSON list
+    """
+
+    id: Optional[str] = None
+    title: Optional[str] = None
+    link: Optional[str] = None
+    description: Optional[str] = None
+    summary: Optional[str] = None
+    published: Optional[str] = None
+
+
 def parse(feed):
+    # feedparser is slow to import, only the processes parsing feeds need it
+    import feedparser
+
+    if isinstance(feed, str):
+        # Hand the parser bytes matching the declared encoding,
+        # so it neither re-decodes nor sniffs the document
+        feed = encode_feed(feed)
+
     parsed_feed = feedparser.parse(feed)
     if parsed_feed.bozo:
         raise ParseContentError(f"{parsed_feed.bozo_exception}")
@@ -37,3 +62,43 @@ def has_required_fields(parsed_feed):
         if not any([hasattr(entry, "title"), hasattr(entry, "description")]):
             return False
     return True
+
+
+def get_hub(parsed_feed):
+    """
+    Get the WebSub hub a feed advertises, and the feed's canonical
+    (self) url to subscribe to. See https://www.w3.org/TR/websub/#discovery
+
+    :param parsed_feed: FeedParserDict
+    :return: Tuple - (hub url, topic url) or (None, None)
+    """
+    links = parsed_feed.feed.get("links", [])
+    hubs = [link.get("href") for link in links if link.get("rel") == "hub"]
+    topics = [link.get("href") for link in links if link.get("rel") == "self"]
+    if not hubs or not topics:
+        return None, None
+    return hubs[0], topics[0]
+
+
+def get_entries(parsed_feed):
+    """
+    :param parsed_feed: FeedParserDict
+    :return: List - ParsedEntry tuples of the feed's entries
+    """
+    # Read the parser's own keys, skipping FeedParserDict's key aliasing.
+    # An entry's description is an alias of its summary
+    get = dict.get
+    entries = []
+    for entry in parsed_feed.entries:
+        summary = get(entry, "summary")
+        entries.append(
+            ParsedEntry(
+                get(entry, "id"),
+                get(entry, "title"),
+                get(entry, "link"),
+                get(entry, "description", summary),
+                summary,
+                get(entry, "published"),
+            )
+        )
+    return entries
@@ -0,0 +1,155 @@
+from collections import namedtuple
+
+import requests
+from urllib3.util import make_headers
+
+from django.conf import settings
+
+from apps.feeds.dns import CachedDNSAdapter
+from apps.feeds.dns import DNSCache
+from apps.feeds.encoding import decode_feed
+
+# Size of the decoded chunks read from the response. Bounds how far
+# a compressed body can overshoot the maximum size before aborting
+CHUNK_SIZE = 16 * 1024
+
+# gzip and deflate, plus br when the brotli package is installed
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+# Redirects that may be persisted as the feed's new url
+PERMANENT_REDIRECTS = {301, 308}
+
+# Shared by all fetches of a worker process, so connections
+# and host name resolutions are reused
+dns_cache = DNSCache(
+    ttl=settings.DNS_CACHE_TTL,
+    negative_ttl=settings.DNS_CACHE_NEGATIVE_TTL,
+    max_size=settings.DNS_CACHE_MAX_SIZE,
+    stats_interval=settings.DNS_CACHE_STATS_INTERVAL,
+)
+session = requests.Session()
+session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+# Pools of as many hosts and connections as fetches run at once, so
+# concurrent fetches don't discard each other's connections
+for scheme in ("http://", "https://"):
+    session.mount(
+        scheme,
+        CachedDNSAdapter(
+            dns_cache,
+            pool_connections=settings.FETCH_CONCURRENCY,
+            pool_maxsize=settings.FETCH_CONCURRENCY,
+        ),
+    )
+
+
+class FeedTooLargeError(Exception):
+    pass
+
+
+class FetchResult(
+    namedtuple(
+        "FetchResult",
+        [
+            "content",
+            "status_code",
+            "reason",
+            "headers",
+            "bytes_transferred",
+            "permanent_url",
+        ],
+    )
+):
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def bytes_decoded(self):
+        return len(self.content)
+
+    @property
+    def text(self):
+        return decode_feed(self.content, self.headers.get("Content-Type"))
+
+    @property
+    def transient(self):
+        """
+        Whether the server failed or throttled the request, rather than
+        rejected it, so a later request may succeed
+        """
+        return self.status_code >= 500 or self.status_code == 429
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} {self.reason}")
+
+
+def is_transient_error(exc):
+    """
+    Whether a fetch error is the host's rather than the url's: the host's
+    name didn't resolve, or it didn't connect or answer in time
+
+    :param exc: Exception - Raised by fetch
+    :return: Boolean
+    """
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
+
+
+def fetch(url, max_size=None):
+    """
+    Download a feed, streaming the body and aborting as soon as
+    the decoded (decompressed) body exceeds max_size bytes
+
+    :param url: str - Feed's rss url
+    :param max_size: int - Defaults to FEED_MAX_BODY_SIZE
+    :return: FetchResult
+    :raises: FeedTooLargeError, requests.RequestException
+    """
+    max_size = max_size or settings.FEED_MAX_BODY_SIZE
+
+    with session.get(url, stream=True, timeout=settings.REQUEST_TIMEOUT) as resp:
+        content_length = resp.headers.get("Content-Length", "")
+        if (
+            "Content-Encoding" not in resp.headers
+            and content_length.isdigit()
+            and int(content_length) > max_size
+        ):
+            raise FeedTooLargeError(f"{url} is {content_length} bytes")
+
+        chunks = []
+        size = 0
+        for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise FeedTooLargeError(f"{url} exceeds {max_size} bytes")
+            chunks.append(chunk)
+
+        return FetchResult(
+            content=b"".join(chunks),
+            status_code=resp.status_code,
+            reason=resp.reason,
+            headers=resp.headers,
+            # Bytes read off the wire, before decompression
+            bytes_transferred=resp.raw.tell(),
+            permanent_url=get_permanent_url(resp),
+        )
+
+
+def get_permanent_url(resp):
+    """
+    Return the url the response's leading permanent redirects point to.
+    Hops after a temporary redirect don't count, the feed's url should
+    still be requested first
+
+    :param resp: requests.Response
+    :return: str or None - None if the response wasn't permanently redirected
+    """
+    permanent_url = None
+    targets = [hop.url for hop in resp.history[1:]] + [resp.url]
+    for hop, target in zip(resp.history, targets):
+        if hop.status_code not in PERMANENT_REDIRECTS:
+            break
+        permanent_url = target
+    return permanent_url
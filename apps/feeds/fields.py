@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class IntegerListField(models.TextField):
+    """
+    A set of integers, e.g. PKs, stored as sorted comma separated text
+    """
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if isinstance(value, list):
+            return value
+        if not value:
+            return []
+        return [int(number) for number in value.split(",")]
+
+    def get_prep_value(self, value):
+        return ",".join(str(number) for number in sorted(set(value or [])))
@@ -1,15 +1,20 @@
-import requests
-
 from django import forms
 from django.conf import settings
 
 from apps.feeds.models import Comment
 from apps.feeds.models import Feed
 from apps.feeds.models import Item
+from apps.feeds.models import Profile
+from apps.feeds.tasks import discover_hub
+from apps.feeds.tasks import import_opml
+from apps.feeds.tasks import refresh_feed
 from apps.feeds.tasks import update_feed
-from apps.feeds.tasks import update_feed_items
 from apps.feeds.feed_parser import ParseContentError
+from apps.feeds.feed_parser import get_entries
 from apps.feeds.feed_parser import parse
+from apps.feeds.opml import OPMLError
+from apps.feeds.opml import parse_opml
+from apps.feeds.url_utils import normalize_url
 
 
 class FollowFeedForm(forms.Form):
@@ -19,11 +24,24 @@ class FollowFeedForm(forms.Form):
     """
     rss_url = forms.URLField(label="Type in feed address")
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+
+    def clean_rss_url(self):
+        return normalize_url(self.cleaned_data["rss_url"])
+
     def clean(self):
+        # Keep requests out of the web processes until a feed is followed
+        from apps.feeds.fetcher import fetch
+
         clean_data = super().clean()
+        if "rss_url" not in clean_data:
+            return clean_data
+        self.check_not_following(clean_data["rss_url"])
 
         try:
-            resp = requests.get(clean_data["rss_url"], timeout=settings.REQUEST_TIMEOUT)
+            resp = fetch(clean_data["rss_url"])
         except Exception as exc:
             raise forms.ValidationError(f"Error getting RSS. Details: {exc}")
 
@@ -31,6 +49,11 @@ class FollowFeedForm(forms.Form):
             raise forms.ValidationError(f"Error getting RSS. Details: {resp.reason}")
         rss = resp.text
 
+        if resp.permanent_url:
+            # Store the url the feed moved to, not the one typed in
+            clean_data["rss_url"] = normalize_url(resp.permanent_url)
+            self.check_not_following(clean_data["rss_url"])
+
         try:
             parsed_rss = parse(rss)
         except ParseContentError as exc:
@@ -40,6 +63,10 @@ class FollowFeedForm(forms.Form):
 
         return clean_data
 
+    def check_not_following(self, rss_url):
+        if self.user and self.user.feeds.filter(rss_url=rss_url).exists():
+            raise forms.ValidationError("You are already following this feed")
+
     def save(self, user):
         parsed_rss = self.cleaned_data["parsed_rss"]
         rss_url = self.cleaned_data["rss_url"]
@@ -52,7 +79,38 @@ class FollowFeedForm(forms.Form):
             "subscriber": user,
         }
         feed = Feed.objects.create(**data)
-        update_feed(parsed_rss.entries, feed.pk)
+        update_feed(get_entries(parsed_rss), feed.pk)
+        discover_hub(parsed_rss, feed.pk)
+
+
+class ImportOPMLForm(forms.Form):
+    """
+    Form to follow the feeds of an OPML file,
+    e.g. exported from another feed reader
+    """
+    opml = forms.FileField(label="OPML file")
+
+    def clean_opml(self):
+        opml = self.cleaned_data["opml"]
+        if opml.size > settings.OPML_MAX_SIZE:
+            raise forms.ValidationError("OPML file is too large")
+
+        try:
+            outlines, invalid = parse_opml(opml.read())
+        except OPMLError as exc:
+            raise forms.ValidationError(f"Error parsing OPML. Details: {exc}")
+
+        if not outlines and not invalid:
+            raise forms.ValidationError("OPML file has no feeds")
+        if len(outlines) + invalid > settings.OPML_MAX_FEEDS:
+            raise forms.ValidationError(
+                f"OPML file has more than {settings.OPML_MAX_FEEDS} feeds"
+            )
+        return outlines, invalid
+
+    def save(self, user):
+        outlines, invalid = self.cleaned_data["opml"]
+        return import_opml(user, outlines, invalid)
 
 
 class UpdateFeedForm(forms.ModelForm):
@@ -68,7 +126,7 @@ class UpdateFeedForm(forms.ModelForm):
         self.fields["title"].widget.attrs["readonly"] = True
 
     def update(self, feed):
-        update_feed_items.delay(feed.pk)
+        refresh_feed(feed.pk)
 
 
 class UpdateItemForm(forms.ModelForm):
@@ -91,3 +149,6 @@ class UpdateItemForm(forms.ModelForm):
             Comment.objects.create(
                 text=self.cleaned_data["comment"], item=item,
             )
+
+        if self.changed_data:
+            Profile.objects.touch_read_state(user)
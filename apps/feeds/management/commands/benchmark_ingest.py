@@ -0,0 +1,59 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.feeds.benchmark import SCENARIOS
+from apps.feeds.benchmark import record_result
+from apps.feeds.benchmark import run_benchmark
+
+METRICS = [
+    "feeds_per_sec",
+    "entries_per_sec",
+    "peak_memory_kb",
+    "queries_per_feed",
+    "max_queries_per_feed",
+    "dns_hit_rate",
+    "dns_resolve_ms",
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark feed ingestion (update_feed_items) over synthetic feed corpora"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(SCENARIOS),
+            help="Scenario to run, can be repeated. Runs all scenarios by default",
+        )
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiplier applied to the number of feeds of each scenario",
+        )
+        parser.add_argument(
+            "--output",
+            default=settings.BENCHMARK_RESULTS_FILE,
+            help="File results are appended to, one JSON object per line",
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(os.path.dirname(os.path.abspath(options["output"])), exist_ok=True)
+
+        for scenario in options["scenario"] or sorted(SCENARIOS):
+            result = run_benchmark(scenario, scale=options["scale"])
+            previous = record_result(result, options["output"])
+
+            self.stdout.write(
+                f"{scenario}: {result['feeds']} feeds, {result['entries']} entries "
+                f"in {result['seconds']}s"
+            )
+            for metric in METRICS:
+                line = f"  {metric}: {result[metric]}"
+                if previous and previous.get(metric):
+                    change = (result[metric] - previous[metric]) / previous[metric]
+                    line += f" ({change:+.1%} vs {previous.get('commit') or 'previous'})"
+                self.stdout.write(line)
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='refresh_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
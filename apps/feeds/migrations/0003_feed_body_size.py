@@ -0,0 +1,23 @@
+# Generated by Django 3.0.7 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0002_feed_refresh_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feed',
+            name='bytes_decoded',
+            field=models.PositiveIntegerField(blank=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='bytes_transferred',
+            field=models.PositiveIntegerField(blank=True, default=0),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0003_feed_body_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Host',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('consecutive_failures', models.PositiveIntegerField(blank=True, default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(blank=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='first_failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='feed',
+            name='status',
+            field=models.CharField(blank=True, choices=[('active', 'Active'), ('failing', 'Failing'), ('quarantined', 'Quarantined')], default='active', max_length=16),
+        ),
+    ]
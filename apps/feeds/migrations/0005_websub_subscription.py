@@ -0,0 +1,25 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0004_feed_breaker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebSubSubscription',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rss_url', models.URLField(max_length=255, unique=True)),
+                ('hub', models.URLField(max_length=255)),
+                ('topic', models.URLField(max_length=255)),
+                ('secret', models.CharField(max_length=64)),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
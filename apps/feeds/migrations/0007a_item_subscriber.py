@@ -0,0 +1,21 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('feeds', '0006_opml_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='subscriber',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:17
+
+from django.db import migrations, models
+
+
+def copy_feed_subscriber(apps, schema_editor):
+    Feed = apps.get_model('feeds', 'Feed')
+    Item = apps.get_model('feeds', 'Item')
+    Item.objects.update(
+        subscriber_id=models.Subquery(
+            Feed.objects.filter(pk=models.OuterRef('feed_id')).values('subscriber_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0007a_item_subscriber'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_feed_subscriber, migrations.RunPython.noop),
+    ]
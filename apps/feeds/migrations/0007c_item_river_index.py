@@ -0,0 +1,17 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0007b_fill_item_subscriber'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['subscriber', '-published_at', '-id'], name='item_river_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0007c_item_river_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='read_state_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='read_state_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
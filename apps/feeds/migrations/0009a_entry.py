@@ -0,0 +1,36 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0008_profile_read_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Entry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField(max_length=255)),
+                ('guid', models.CharField(max_length=255)),
+                ('title', models.CharField(blank=True, max_length=255, null=True)),
+                ('link', models.CharField(blank=True, max_length=255, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('summary', models.TextField(blank=True, null=True)),
+                ('published_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='entry',
+            constraint=models.UniqueConstraint(fields=('source_url', 'guid'), name='entry_source_guid_uniq'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='entry',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='feeds.Entry'),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:40
+
+from itertools import islice
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+from django.db import migrations, models
+
+CONTENT_FIELDS = ['title', 'link', 'description', 'summary', 'published_at']
+CHUNK_SIZE = 2000
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'mc_cid', 'mc_eid', '_ga'}
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+
+def is_tracking_param(param):
+    key = unquote(param.split('=', 1)[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def normalize_url(url):
+    """
+    Copy of apps.feeds.url_utils.normalize_url as of this migration
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    netloc = (parts.hostname or '').lower()
+    if ':' in netloc:
+        netloc = f'[{netloc}]'
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{netloc}:{parts.port}'
+    if parts.username:
+        credentials = parts.username
+        if parts.password:
+            credentials = f'{credentials}:{parts.password}'
+        netloc = f'{credentials}@{netloc}'
+
+    query = '&'.join(
+        param for param in parts.query.split('&') if not is_tracking_param(param)
+    )
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def split_item_content(apps, schema_editor):
+    """
+    Move the content of items into entries, shared by the items
+    with the same link (or title) of feeds with the same rss url
+    """
+    Entry = apps.get_model('feeds', 'Entry')
+    Item = apps.get_model('feeds', 'Item')
+
+    entries = {}
+    items = Item.objects.select_related('feed').order_by('id').iterator(chunk_size=CHUNK_SIZE)
+    while True:
+        chunk = list(islice(items, CHUNK_SIZE))
+        if not chunk:
+            break
+
+        item_keys = {}
+        new_entries = {}
+        for item in chunk:
+            guid = (item.link or item.title or '')[:255]
+            if item.feed and guid:
+                key = (normalize_url(item.feed.rss_url), guid)
+            else:
+                key = ('', f'item:{item.pk}')
+            item_keys[item.pk] = key
+
+            if key not in entries and key not in new_entries:
+                new_entries[key] = Entry(
+                    source_url=key[0],
+                    guid=key[1],
+                    **{field: getattr(item, field) for field in CONTENT_FIELDS},
+                )
+
+        # bulk_create only sets primary keys on postgres, read back
+        # the entries created past the last one
+        last_id = Entry.objects.aggregate(id=models.Max('id'))['id'] or 0
+        Entry.objects.bulk_create(new_entries.values())
+        created = Entry.objects.filter(pk__gt=last_id).values_list('id', 'source_url', 'guid')
+        for entry_id, source_url, guid in created:
+            entries[(source_url, guid)] = entry_id
+
+        for item in chunk:
+            item.entry_id = entries[item_keys[item.pk]]
+        Item.objects.bulk_update(chunk, ['entry'])
+
+
+def join_item_content(apps, schema_editor):
+    Entry = apps.get_model('feeds', 'Entry')
+    Item = apps.get_model('feeds', 'Item')
+    for field in CONTENT_FIELDS[:-1]:
+        Item.objects.update(
+            **{
+                field: models.Subquery(
+                    Entry.objects.filter(pk=models.OuterRef('entry_id')).values(field)[:1]
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0009a_entry'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_item_content, join_item_content),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0009b_split_item_content'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='item',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='link',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='summary',
+        ),
+        migrations.RemoveField(
+            model_name='item',
+            name='title',
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='feeds.Entry'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:29
+
+import html
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# ENTRY_EXCERPT_LENGTH as of this migration
+EXCERPT_LENGTH = 200
+WHITESPACE = re.compile(r'\s+')
+
+
+def make_excerpt(content, length):
+    """
+    Copy of apps.feeds.text_utils.make_excerpt as of this migration
+    """
+    text = WHITESPACE.sub(' ', html.unescape(strip_tags(content or ''))).strip()
+    return Truncator(text).chars(length)
+
+
+def compute_excerpts(apps, schema_editor):
+    Entry = apps.get_model('feeds', 'Entry')
+    entries = Entry.objects.only('description', 'summary').order_by('id')
+
+    batch = []
+    for entry in entries.iterator(chunk_size=2000):
+        content = entry.description or entry.summary or ''
+        entry.excerpt = make_excerpt(content, EXCERPT_LENGTH)
+        entry.content_length = len(content)
+        batch.append(entry)
+        if len(batch) == 2000:
+            Entry.objects.bulk_update(batch, ['excerpt', 'content_length'])
+            batch = []
+    Entry.objects.bulk_update(batch, ['excerpt', 'content_length'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0009c_remove_item_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='content_length',
+            field=models.PositiveIntegerField(blank=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(compute_excerpts, migrations.RunPython.noop),
+    ]
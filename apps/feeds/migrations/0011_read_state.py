@@ -0,0 +1,91 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:32
+
+import apps.feeds.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+# READ_STATE_MAX_EXCEPTIONS as of this migration
+MAX_EXCEPTIONS = 100
+
+
+def pick_read_up_to(items):
+    """
+    Copy of apps.feeds.querysets.pick_read_up_to as of this migration
+    """
+    read_up_to = 0
+    exceptions = fewest = sum(1 for _, unread in items if not unread)
+    for item_id, unread in items:
+        exceptions += 1 if unread else -1
+        if exceptions < fewest:
+            fewest = exceptions
+            read_up_to = item_id
+
+    return (
+        read_up_to,
+        [item_id for item_id, unread in items if item_id > read_up_to and not unread],
+        [item_id for item_id, unread in items if item_id <= read_up_to and unread],
+    )
+
+
+def build_read_states(apps, schema_editor):
+    """
+    Replace the unread flags of each feed's items with a read state
+    needing the fewest exceptions. Like ReadStateQuerySet.compact, the
+    oldest exceptions past MAX_EXCEPTIONS are dropped
+    """
+    Feed = apps.get_model('feeds', 'Feed')
+    Item = apps.get_model('feeds', 'Item')
+    ReadState = apps.get_model('feeds', 'ReadState')
+
+    for feed_id in Feed.objects.values_list('id', flat=True).iterator():
+        items = list(
+            Item.objects.filter(feed_id=feed_id).order_by('id').values_list('id', 'unread')
+        )
+        read_up_to, read_ids, unread_ids = pick_read_up_to(items)
+        kept = set(sorted(read_ids + unread_ids, reverse=True)[:MAX_EXCEPTIONS])
+        read_ids = [item_id for item_id in read_ids if item_id in kept]
+        unread_ids = [item_id for item_id in unread_ids if item_id in kept]
+        ReadState.objects.create(
+            feed_id=feed_id,
+            read_up_to=read_up_to,
+            read_ids=read_ids,
+            unread_ids=unread_ids,
+        )
+
+
+def restore_unread(apps, schema_editor):
+    Item = apps.get_model('feeds', 'Item')
+    ReadState = apps.get_model('feeds', 'ReadState')
+
+    Item.objects.update(unread=True)
+    for state in ReadState.objects.iterator():
+        items = Item.objects.filter(feed_id=state.feed_id)
+        items.filter(id__lte=state.read_up_to).exclude(id__in=state.unread_ids).update(
+            unread=False
+        )
+        items.filter(id__in=state.read_ids).update(unread=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0010_entry_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_up_to', models.PositiveIntegerField(default=0)),
+                ('read_ids', apps.feeds.fields.IntegerListField(blank=True, default=list)),
+                ('unread_ids', apps.feeds.fields.IntegerListField(blank=True, default=list)),
+                ('feed', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='read_state', to='feeds.Feed')),
+            ],
+        ),
+        migrations.RunPython(build_read_states, restore_unread),
+        migrations.RemoveField(
+            model_name='item',
+            name='unread',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0011_read_state'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feed',
+            name='rss_url',
+            field=models.URLField(blank=True, db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.0.7 on 2026-10-19 17:20
+
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+from django.db import migrations
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'mc_cid', 'mc_eid', '_ga'}
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+
+def is_tracking_param(param):
+    key = unquote(param.split('=', 1)[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def normalize_url(url):
+    """
+    Copy of apps.feeds.url_utils.normalize_url as of this migration
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    netloc = (parts.hostname or '').lower()
+    if ':' in netloc:
+        netloc = f'[{netloc}]'
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f'{netloc}:{parts.port}'
+    if parts.username:
+        credentials = parts.username
+        if parts.password:
+            credentials = f'{credentials}:{parts.password}'
+        netloc = f'{credentials}@{netloc}'
+
+    query = '&'.join(
+        param for param in parts.query.split('&') if not is_tracking_param(param)
+    )
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def normalize_feed_urls(apps, schema_editor):
+    """
+    Canonicalize the urls of feeds followed before urls were
+    normalized, as the urls of newly followed feeds are
+    """
+    Feed = apps.get_model('feeds', 'Feed')
+
+    changed = []
+    for feed in Feed.objects.only('id', 'rss_url').iterator(chunk_size=2000):
+        if not feed.rss_url:
+            continue
+        rss_url = normalize_url(feed.rss_url)
+        if rss_url != feed.rss_url and len(rss_url) <= 255:
+            feed.rss_url = rss_url
+            changed.append(feed)
+    Feed.objects.bulk_update(changed, ['rss_url'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0012_feed_rss_url_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_feed_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.0.7 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0013_normalize_feed_rss_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='websubsubscription',
+            name='pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='websubsubscription',
+            name='token',
+            field=models.CharField(max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.0.7 on 2026-10-19 17:41
+
+import datetime as dt
+import secrets
+
+from django.db import migrations
+
+
+def fill_tokens(apps, schema_editor):
+    """
+    Give existing subscriptions a callback token. Their hubs still call
+    back the former (pk) urls, so their leases are ended: they're polled
+    again and renewed with their new callback url
+    """
+    WebSubSubscription = apps.get_model('feeds', 'WebSubSubscription')
+
+    now = dt.datetime.utcnow()
+    subscriptions = list(WebSubSubscription.objects.filter(token__isnull=True))
+    for subscription in subscriptions:
+        subscription.token = secrets.token_urlsafe()
+        if subscription.lease_expires_at:
+            subscription.lease_expires_at = now
+    WebSubSubscription.objects.bulk_update(
+        subscriptions, ['token', 'lease_expires_at'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0014_websub_subscription_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_tokens, migrations.RunPython.noop),
+    ]
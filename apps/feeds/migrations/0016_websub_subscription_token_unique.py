@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-19 17:42
+
+from django.db import migrations, models
+import secrets
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0015_fill_websub_subscription_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='websubsubscription',
+            name='token',
+            field=models.CharField(default=secrets.token_urlsafe, max_length=64, unique=True),
+        ),
+    ]
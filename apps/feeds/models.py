@@ -1,10 +1,19 @@
+import secrets
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.urls import reverse
 
+from apps.feeds.fields import IntegerListField
 from apps.feeds.querysets import FeedQuerySet
+from apps.feeds.querysets import HostQuerySet
+from apps.feeds.querysets import ItemQuerySet
+from apps.feeds.querysets import ProfileQuerySet
+from apps.feeds.querysets import ReadStateQuerySet
+from apps.feeds.querysets import WebSubSubscriptionQuerySet
 
 
 class Feed(models.Model):
@@ -12,14 +21,37 @@ class Feed(models.Model):
     A news/article feed that users can subscribe to.
     A feed consists of multiple items
     """
+    ACTIVE = "active"
+    FAILING = "failing"
+    QUARANTINED = "quarantined"
+    STATUS_CHOICES = [
+        (ACTIVE, "Active"),
+        (FAILING, "Failing"),
+        (QUARANTINED, "Quarantined"),
+    ]
+
     title = models.CharField(max_length=255)
     link = models.CharField(max_length=255)
     description = models.TextField()
-    rss_url = models.URLField(max_length=255, blank=True)
+    rss_url = models.URLField(max_length=255, blank=True, db_index=True)
+    # Folder/category the user files the feed under, e.g. from OPML imports
+    folder = models.CharField(max_length=255, blank=True, default="")
     subscriber = models.ForeignKey(
         get_user_model(), related_name="feeds", on_delete=models.CASCADE, blank=True
     )
     last_updated_at = models.DateTimeField(auto_now=True, blank=True)
+    # Set while an update of the feed's items is in flight
+    refresh_started_at = models.DateTimeField(null=True, blank=True)
+    # Body size of the last fetch, as sent over the wire and decompressed
+    bytes_transferred = models.PositiveIntegerField(default=0, blank=True)
+    bytes_decoded = models.PositiveIntegerField(default=0, blank=True)
+    # Circuit breaker state, see FEED_BREAKER_* settings
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=ACTIVE, blank=True
+    )
+    consecutive_failures = models.PositiveIntegerField(default=0, blank=True)
+    first_failed_at = models.DateTimeField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
 
     objects = FeedQuerySet.as_manager()
 
@@ -38,36 +70,195 @@ class Feed(models.Model):
     def get_unfollow_url(self):
         return reverse("feeds:unfollow", args=[str(self.id)])
 
+    def get_mark_read_url(self):
+        return reverse("feeds:mark_read", args=[str(self.id)])
 
-class Item(models.Model):
+
+class ReadState(models.Model):
     """
-    An entity within a Feed.
-    An item can have multiple comments
+    The subscriber's read state of a feed's items, without a row per
+    item: items up to read_up_to (an Item PK, as items are created in
+    order) are read except unread_ids, later items are unread except
+    read_ids. Marking all items read only moves read_up_to
+    """
+    feed = models.OneToOneField(Feed, on_delete=models.CASCADE, related_name="read_state")
+    read_up_to = models.PositiveIntegerField(default=0)
+    # Items read/marked unread out of order
+    read_ids = IntegerListField(default=list, blank=True)
+    unread_ids = IntegerListField(default=list, blank=True)
+
+    objects = ReadStateQuerySet.as_manager()
+
+    def is_read(self, item_id):
+        if item_id <= self.read_up_to:
+            return item_id not in self.unread_ids
+        return item_id in self.read_ids
+
+
+class Host(models.Model):
+    """
+    Circuit breaker state of a host serving feeds, shared by all
+    feeds of the host (e.g. a host that is down or blocking us)
+    """
+    name = models.CharField(max_length=255, unique=True)
+    consecutive_failures = models.PositiveIntegerField(default=0, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    objects = HostQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+
+class WebSubSubscription(models.Model):
+    """
+    A push subscription to a feed's WebSub hub, shared by
+    all feeds with the subscribed rss url
+    """
+    rss_url = models.URLField(max_length=255, unique=True)
+    hub = models.URLField(max_length=255)
+    # The feed's canonical (self) url, may differ from rss_url
+    topic = models.URLField(max_length=255)
+    secret = models.CharField(max_length=64)
+    # Identifies the subscription in its callback url, unguessable so
+    # only the hub can verify or push to the subscription
+    token = models.CharField(max_length=64, unique=True, default=secrets.token_urlsafe)
+    requested_at = models.DateTimeField(null=True, blank=True)
+    # Set while a subscription request awaits the hub's verification
+    pending = models.BooleanField(default=False)
+    # Set once the hub verifies the subscription
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    objects = WebSubSubscriptionQuerySet.as_manager()
+
+    def __str__(self):
+        return self.topic
+
+    def get_callback_url(self):
+        path = reverse("feeds:websub_callback", args=[self.token])
+        return f"{settings.WEBSUB_CALLBACK_URL.rstrip('/')}{path}"
+
+
+class OPMLImport(models.Model):
+    """
+    Progress of importing a user's subscriptions from an OPML file.
+    Imported feeds are validated in the background
+    """
+    user = models.ForeignKey(
+        get_user_model(), related_name="opml_imports", on_delete=models.CASCADE
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Feeds to validate, feeds skipped as already followed
+    total = models.PositiveIntegerField(default=0)
+    duplicates = models.PositiveIntegerField(default=0)
+    # Feeds validated so far, and the ones that failed validation
+    processed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def get_absolute_url(self):
+        return reverse("feeds:import_detail", args=[str(self.id)])
+
+    @property
+    def finished(self):
+        return self.processed >= self.total
+
+    @property
+    def progress(self):
+        return 100 * self.processed // self.total if self.total else 100
+
+
+class Entry(models.Model):
+    """
+    Content of an entry of a feed, stored once and shared by the
+    items of all the feeds subscribed to the same rss url
     """
+    # Normalized rss url of the feed the entry was read from
+    source_url = models.URLField(max_length=255)
+    # Identifies the entry within its source: its id, link or title
+    guid = models.CharField(max_length=255)
     title = models.CharField(max_length=255, null=True, blank=True)
     link = models.CharField(max_length=255, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
     summary = models.TextField(null=True, blank=True)
-    unread = models.BooleanField(default=True, blank=True)
+    # Plain text start of the description (or summary) and its full
+    # length, so lists don't read the unbounded columns
+    excerpt = models.CharField(max_length=255, blank=True, default="")
+    content_length = models.PositiveIntegerField(default=0, blank=True)
+    published_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source_url", "guid"], name="entry_source_guid_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return self.title or ""
+
+
+class Item(models.Model):
+    """
+    A subscriber's state of an entry within a Feed.
+    An item can have multiple comments
+    """
+    entry = models.ForeignKey(Entry, on_delete=models.CASCADE, related_name="items")
     bookmark = models.BooleanField(default=False, blank=True)
     feed = models.ForeignKey(
         Feed, on_delete=models.CASCADE, related_name="items", null=True,
     )
+    # The feed's subscriber, so a user's items can be read without a join
+    subscriber = models.ForeignKey(
+        get_user_model(), related_name="items", on_delete=models.CASCADE, null=True,
+    )
+    # The entry's, so items are ordered without a join
     published_at = models.DateTimeField(blank=True, null=True)
 
+    objects = ItemQuerySet.as_manager()
+
     class Meta:
         ordering = ["-published_at"]
+        indexes = [
+            # Serves the river's keyset pagination
+            models.Index(
+                fields=["subscriber", "-published_at", "-id"], name="item_river_idx"
+            ),
+        ]
 
     def __str__(self):
-        return self.title
+        return str(self.entry)
 
     def get_absolute_url(self):
         return reverse("feeds:item_detail", args=[str(self.id)])
 
+    _unread = None
+
+    @property
+    def unread(self):
+        """
+        Whether the subscriber hasn't read the item yet. Annotated by
+        ItemQuerySet.annotate_unread, else read from the feed's ReadState:
+        select_related("feed__read_state") to load it along with the item
+        """
+        if self._unread is None:
+            try:
+                state = self.feed.read_state if self.feed_id else None
+            except ReadState.DoesNotExist:
+                state = None
+            self._unread = not (state and state.is_read(self.pk))
+        return self._unread
+
+    @unread.setter
+    def unread(self, value):
+        self._unread = value
+
     def mark_as_read(self):
-        if self.unread:
-            self.unread = False
-            self.save()
+        if self.unread and self.feed_id:
+            ReadState.objects.mark_read(self.feed_id, [self.pk])
+            self._unread = False
 
 
 class Comment(models.Model):
@@ -92,6 +283,12 @@ class Profile(models.Model):
     Extends the django User model
     """
     user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE)
+    # Bumped whenever the user changes what their pages show (reading,
+    # bookmarking, commenting, unfollowing), stamps conditional responses
+    read_state_version = models.PositiveIntegerField(default=0)
+    read_state_updated_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ProfileQuerySet.as_manager()
 
     def get_unread_notifications_count(self):
         return self.user.notifications.filter(unread=True).count()
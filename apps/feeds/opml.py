@@ -0,0 +1,89 @@
+from collections import namedtuple
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+from xml.sax.saxutils import quoteattr
+
+from apps.feeds.url_utils import is_valid_feed_url
+
+Outline = namedtuple("Outline", ["title", "rss_url", "link", "folder"])
+
+
+class OPMLError(Exception):
+    pass
+
+
+def parse_opml(content):
+    """
+    Get the feed outlines of an OPML document. Outlines nested in
+    another outline (a folder) keep the folder's title. Outlines whose
+    url isn't a valid http(s) url, or is too long, are skipped
+
+    :param content: bytes - OPML document
+    :return: Tuple - (list of Outline tuples in document order,
+        number of skipped outlines)
+    """
+    # Entity declarations are never needed, refuse them (billion laughs)
+    if b"<!DOCTYPE" in content or b"<!ENTITY" in content:
+        raise OPMLError("OPML documents can't declare a DOCTYPE")
+
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError as exc:
+        raise OPMLError(f"Invalid OPML: {exc}")
+
+    body = root.find("body")
+    if root.tag != "opml" or body is None:
+        raise OPMLError("Not an OPML document")
+
+    outlines = []
+    invalid = []
+
+    def walk(element, folder):
+        for outline in element.findall("outline"):
+            title = outline.get("title") or outline.get("text") or ""
+            rss_url = outline.get("xmlUrl")
+            if rss_url is None:
+                walk(outline, title or folder)
+            elif is_valid_feed_url(rss_url.strip()):
+                outlines.append(
+                    Outline(title, rss_url.strip(), outline.get("htmlUrl", ""), folder)
+                )
+            else:
+                invalid.append(rss_url)
+
+    walk(body, "")
+    return outlines, len(invalid)
+
+
+def iter_opml(outlines, title="Feeds"):
+    """
+    Render an OPML document chunk by chunk, e.g. for streaming it.
+    Outlines must be ordered by folder
+
+    :param outlines: Iterable - Outline tuples
+    :param title: str - Document title
+    :return: Generator - str chunks
+    """
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n<opml version="2.0">\n'
+        f"<head><title>{escape(title)}</title></head>\n<body>\n"
+    )
+
+    folder = ""
+    for outline in outlines:
+        if outline.folder != folder:
+            if folder:
+                yield "</outline>\n"
+            if outline.folder:
+                yield f"<outline text={quoteattr(outline.folder)}>\n"
+            folder = outline.folder
+
+        yield (
+            f'<outline type="rss" text={quoteattr(outline.title)} '
+            f"title={quoteattr(outline.title)} xmlUrl={quoteattr(outline.rss_url)} "
+            f"htmlUrl={quoteattr(outline.link)}/>\n"
+        )
+
+    if folder:
+        yield "</outline>\n"
+    yield "</body>\n</opml>\n"
@@ -1,7 +1,77 @@
+import datetime as dt
+
+from django.conf import settings
 from django.db import models
+from django.db import transaction
+from django.db.models import BooleanField
+from django.db.models import Case
 from django.db.models import Count
+from django.db.models import F
+from django.db.models import Max
+from django.db.models import Min
 from django.db.models import Prefetch
 from django.db.models import Q
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.functions import Coalesce
+
+
+def breaker_delay(failures, threshold):
+    """
+    Seconds to wait before probing again after given consecutive
+    failures, doubling with every failure past threshold
+
+    :param failures: int - Consecutive failures
+    :param threshold: int - Failures opening the breaker
+    :return: int
+    """
+    exponent = min(failures - threshold, 32)
+    return min(
+        settings.FEED_BREAKER_BASE_DELAY * 2 ** exponent,
+        settings.FEED_BREAKER_MAX_DELAY,
+    )
+
+
+def unread_filter(read_ids, unread_ids, item="", read_up_to="feed__read_state__read_up_to"):
+    """
+    Filter selecting unread items, see ReadState. Items of feeds
+    without a read state are unread
+
+    :param read_ids: Iterable - Read exceptions of the feeds' read states
+    :param unread_ids: Iterable - Unread exceptions of the feeds' read states
+    :param item: str - Lookup prefix of the items, e.g. "items__"
+    :param read_up_to: str - Lookup of the items' feed's read_up_to
+    :return: Q
+    """
+    unread = Q(**{f"{item}id__gt": Coalesce(read_up_to, 0)})
+    if read_ids:
+        unread &= ~Q(**{f"{item}id__in": read_ids})
+    if unread_ids:
+        unread |= Q(**{f"{item}id__in": unread_ids})
+    return unread
+
+
+def pick_read_up_to(items):
+    """
+    Pick the read state of items needing the fewest exceptions
+
+    :param items: List - (Item PK, unread) tuples, ordered by PK
+    :return: Tuple - (read_up_to, read_ids, unread_ids)
+    """
+    read_up_to = 0
+    # Exceptions when reading up to the item, starting with none read
+    exceptions = fewest = sum(1 for _, unread in items if not unread)
+    for item_id, unread in items:
+        exceptions += 1 if unread else -1
+        if exceptions < fewest:
+            fewest = exceptions
+            read_up_to = item_id
+
+    return (
+        read_up_to,
+        [item_id for item_id, unread in items if item_id > read_up_to and not unread],
+        [item_id for item_id, unread in items if item_id <= read_up_to and unread],
+    )
 
 
 class FeedQuerySet(models.QuerySet):
@@ -11,15 +81,381 @@ class FeedQuerySet(models.QuerySet):
         marked as unread and return a title ordered
         queryset
         """
+        from apps.feeds.models import ReadState
+
+        feeds = self.filter(subscriber=user)
+        # Only the exceptions of the feeds counted
+        read_ids, unread_ids = ReadState.objects.filter(feed__in=feeds).exceptions()
+        unread = unread_filter(
+            read_ids, unread_ids, item="items__", read_up_to="read_state__read_up_to"
+        )
+        return feeds.annotate(
+            unread=Count("items", distinct=True, filter=unread)
+        ).order_by("title")
+
+    def prefetch_items(self):
+        """
+        Prefetch feed items, for pages rendering a feed's items
+        """
         from apps.feeds.models import Item
 
-        return (
-            self.filter(subscriber=user)
-            .prefetch_related(
-                Prefetch("items", queryset=Item.objects.defer("comments"))
+        return self.prefetch_related(
+            Prefetch(
+                "items",
+                queryset=Item.objects.list_columns(),
+            )
+        )
+
+    def refreshable(self, now, min_interval=0):
+        """
+        Feeds without a refresh in flight, updated at least min_interval
+        seconds ago. A refresh stuck in flight for longer than
+        FEED_REFRESH_LOCK_TIMEOUT is taken over
+
+        :param now: datetime - Time of the refresh
+        :param min_interval: int - Minimum seconds between refreshes
+        """
+        stale = now - dt.timedelta(seconds=settings.FEED_REFRESH_LOCK_TIMEOUT)
+        return self.filter(
+            Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=stale)
+        ).exclude(last_updated_at__gt=now - dt.timedelta(seconds=min_interval))
+
+    def acquire_refresh(self, feed_id, min_interval=0):
+        """
+        Mark a feed's refresh as in flight, see refreshable
+
+        :param feed_id: str - Feed's PK
+        :param min_interval: int - Minimum seconds between refreshes
+        :return: Boolean - True if the caller should refresh the feed
+        """
+        now = dt.datetime.utcnow()
+        return bool(
+            self.filter(pk=feed_id)
+            .refreshable(now, min_interval)
+            .update(refresh_started_at=now)
+        )
+
+    def acquire_refreshes(self, min_interval=0):
+        """
+        Mark the refreshes of the feeds as in flight with a single
+        update, see refreshable
+
+        :param min_interval: int - Minimum seconds between refreshes
+        :return: List - PKs of the feeds the caller should refresh
+        """
+        now = dt.datetime.utcnow()
+        if not self.refreshable(now, min_interval).update(refresh_started_at=now):
+            return []
+        # The feeds acquired are the ones stamped with this refresh's time
+        return list(self.filter(refresh_started_at=now).values_list("id", flat=True))
+
+    def release_refresh(self, feed_id):
+        """
+        Mark a feed's refresh as no longer in flight
+        """
+        return self.filter(pk=feed_id).update(refresh_started_at=None)
+
+    def due_for_update(self):
+        """
+        Feeds to include in scheduled updates: not quarantined,
+        and past their next probe if their breaker is open
+        """
+        return self.exclude(status=self.model.QUARANTINED).filter(
+            Q(next_attempt_at__isnull=True)
+            | Q(next_attempt_at__lte=dt.datetime.utcnow())
+        )
+
+    def record_success(self):
+        """
+        Close the breaker of the feeds, e.g. after a successful fetch
+        """
+        return self.exclude(status=self.model.ACTIVE, consecutive_failures=0).update(
+            status=self.model.ACTIVE,
+            consecutive_failures=0,
+            first_failed_at=None,
+            next_attempt_at=None,
+        )
+
+    def record_failure(self):
+        """
+        Count a failed update of the feeds. Opens a feed's breaker after
+        FEED_BREAKER_THRESHOLD consecutive failures, and quarantines feeds
+        failing for FEED_QUARANTINE_DAYS
+
+        :return: List - PKs of the feeds quarantined by this failure
+        """
+        now = dt.datetime.utcnow()
+        quarantine_before = now - dt.timedelta(days=settings.FEED_QUARANTINE_DAYS)
+        threshold = settings.FEED_BREAKER_THRESHOLD
+
+        # Conditions on the counts and times before this failure: feeds
+        # staying below the threshold, and feeds failing for too long
+        below_threshold = Q(consecutive_failures__lt=threshold - 1)
+        expired = Q(first_failed_at__lte=quarantine_before)
+
+        quarantined = list(
+            self.exclude(below_threshold)
+            .filter(expired)
+            .exclude(status=self.model.QUARANTINED)
+            .values_list("id", flat=True)
+        )
+
+        # Next probe by count of failures, until the delay maxes out
+        probes = []
+        failures = threshold
+        while breaker_delay(failures, threshold) < settings.FEED_BREAKER_MAX_DELAY:
+            probes.append(
+                When(
+                    consecutive_failures=failures - 1,
+                    then=Value(now + dt.timedelta(seconds=breaker_delay(failures, threshold))),
+                )
             )
-            .annotate(
-                unread=Count("items", distinct=True, filter=Q(items__unread=True))
+            failures += 1
+
+        self.update(
+            consecutive_failures=F("consecutive_failures") + 1,
+            first_failed_at=Coalesce("first_failed_at", Value(now)),
+            status=Case(
+                When(below_threshold, then=F("status")),
+                When(expired, then=Value(self.model.QUARANTINED)),
+                default=Value(self.model.FAILING),
+                output_field=models.CharField(),
+            ),
+            next_attempt_at=Case(
+                When(below_threshold | expired, then=None),
+                *probes,
+                default=Value(
+                    now + dt.timedelta(seconds=settings.FEED_BREAKER_MAX_DELAY)
+                ),
+                output_field=models.DateTimeField(),
+            ),
+        )
+        return quarantined
+
+
+class ItemQuerySet(models.QuerySet):
+    def list_columns(self, *fields):
+        """
+        Only load the columns item lists render, leaving out the
+        entries' unbounded description and summary
+
+        :param fields: str - Other fields to load, e.g. "feed__title"
+        """
+        related = {field.split("__")[0] for field in fields if "__" in field}
+        return self.select_related("entry", *related).only(
+            "id",
+            "feed_id",
+            "bookmark",
+            "published_at",
+            "entry__title",
+            "entry__excerpt",
+            "entry__content_length",
+            *fields,
+        )
+
+    def annotate_unread(self, user):
+        """
+        Annotate whether the items of given user are unread
+        """
+        from apps.feeds.models import ReadState
+
+        read_ids, unread_ids = ReadState.objects.filter(feed__subscriber=user).exceptions()
+        return self.annotate(
+            unread=Case(
+                When(unread_filter(read_ids, unread_ids), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
             )
-            .order_by("title")
+        )
+
+    def river(self, user, unread=False, folder=None):
+        """
+        Items of all feeds the user follows, for the river timeline.
+        Ordered by -published_at, -id these page through item_river_idx
+
+        :param user: User - Subscriber
+        :param unread: Boolean - Only unread items
+        :param folder: str - Only items of the feeds in this folder
+        :return: QuerySet
+        """
+        items = self.filter(subscriber=user).list_columns("feed__title")
+        items = items.annotate_unread(user)
+        if unread:
+            items = items.filter(unread=True)
+        if folder is not None:
+            items = items.filter(feed__folder=folder)
+        return items
+
+
+class ReadStateQuerySet(models.QuerySet):
+    def exceptions(self):
+        """
+        :return: Tuple - Sets of the read and unread exceptions of the
+            read states, at most READ_STATE_MAX_EXCEPTIONS per feed
+        """
+        read_ids, unread_ids = set(), set()
+        states = self.exclude(read_ids="", unread_ids="")
+        for feed_read_ids, feed_unread_ids in states.values_list("read_ids", "unread_ids"):
+            read_ids.update(feed_read_ids)
+            unread_ids.update(feed_unread_ids)
+        return read_ids, unread_ids
+
+    def mark_read(self, feed_id, item_ids):
+        """
+        Mark items of a feed as read. read_up_to advances past the
+        items read in order, so only out of order reads are kept
+        as exceptions
+
+        :param feed_id: str - Feed's PK
+        :param item_ids: Iterable - Item PKs
+        """
+        from apps.feeds.models import Item
+
+        item_ids = set(item_ids)
+        with transaction.atomic():
+            state, _ = self.select_for_update().get_or_create(feed_id=feed_id)
+            read_ids = set(state.read_ids) | {
+                item_id for item_id in item_ids if item_id > state.read_up_to
+            }
+
+            if read_ids:
+                first_unread = (
+                    Item.objects.filter(feed_id=feed_id, id__gt=state.read_up_to)
+                    .exclude(id__in=read_ids)
+                    .aggregate(id=Min("id"))["id"]
+                )
+                if first_unread is None:
+                    state.read_up_to = max(read_ids)
+                else:
+                    state.read_up_to = max(state.read_up_to, first_unread - 1)
+
+            state.read_ids = [i for i in read_ids if i > state.read_up_to]
+            state.unread_ids = [i for i in state.unread_ids if i not in item_ids]
+            self.compact(state)
+            state.save()
+
+    def mark_unread(self, feed_id, item_ids):
+        """
+        Mark items of a feed as unread
+
+        :param feed_id: str - Feed's PK
+        :param item_ids: Iterable - Item PKs
+        """
+        item_ids = set(item_ids)
+        with transaction.atomic():
+            state, _ = self.select_for_update().get_or_create(feed_id=feed_id)
+            state.read_ids = [i for i in state.read_ids if i not in item_ids]
+            state.unread_ids = set(state.unread_ids) | {
+                item_id for item_id in item_ids if item_id <= state.read_up_to
+            }
+            self.compact(state)
+            state.save()
+
+    def compact(self, state):
+        """
+        Keep a read state's exceptions within READ_STATE_MAX_EXCEPTIONS,
+        as they're inlined in the unread filters. Once over, read_up_to is
+        moved to where the feed's current items need the fewest exceptions
+        (see pick_read_up_to). Exceptions still over are dropped, the
+        oldest first: those items are taken as read up to read_up_to
+        and unread past it
+
+        :param state: ReadState
+        :return: None
+        """
+        from apps.feeds.models import Item
+
+        max_exceptions = settings.READ_STATE_MAX_EXCEPTIONS
+        if len(state.read_ids) + len(state.unread_ids) <= max_exceptions:
+            return None
+
+        item_ids = Item.objects.filter(feed_id=state.feed_id).order_by("id")
+        state.read_up_to, read_ids, unread_ids = pick_read_up_to(
+            [
+                (item_id, not state.is_read(item_id))
+                for item_id in item_ids.values_list("id", flat=True)
+            ]
+        )
+
+        kept = set(sorted(read_ids + unread_ids, reverse=True)[:max_exceptions])
+        state.read_ids = [item_id for item_id in read_ids if item_id in kept]
+        state.unread_ids = [item_id for item_id in unread_ids if item_id in kept]
+
+    def mark_all_read(self, feed_id):
+        """
+        Mark all the items of a feed as read, without touching them
+
+        :param feed_id: str - Feed's PK
+        """
+        from apps.feeds.models import Item
+
+        read_up_to = Item.objects.filter(feed_id=feed_id).aggregate(id=Max("id"))["id"]
+        self.update_or_create(
+            feed_id=feed_id,
+            defaults={"read_up_to": read_up_to or 0, "read_ids": [], "unread_ids": []},
+        )
+
+
+class ProfileQuerySet(models.QuerySet):
+    def touch_read_state(self, user):
+        """
+        Bump the read state version of a user, invalidating the
+        version stamps of their pages
+        """
+        return self.filter(user=user).update(
+            read_state_version=F("read_state_version") + 1,
+            read_state_updated_at=dt.datetime.utcnow(),
+        )
+
+
+class HostQuerySet(models.QuerySet):
+    def open_breakers(self):
+        """
+        Names of the hosts not to fetch feeds from, until their next probe
+        """
+        return self.filter(next_attempt_at__gt=dt.datetime.utcnow()).values_list(
+            "name", flat=True
+        )
+
+    def record_success(self, name):
+        return self.filter(name=name).exclude(consecutive_failures=0).update(
+            consecutive_failures=0, next_attempt_at=None
+        )
+
+    def record_failure(self, name):
+        """
+        Count a failed fetch from a host, by any of its feeds. Opens the
+        host's breaker after HOST_BREAKER_THRESHOLD consecutive failures
+        """
+        host, _ = self.get_or_create(name=name)
+        # Fetches from the same host fail concurrently, count atomically
+        self.filter(pk=host.pk).update(consecutive_failures=F("consecutive_failures") + 1)
+        host.refresh_from_db(fields=["consecutive_failures"])
+
+        threshold = settings.HOST_BREAKER_THRESHOLD
+        if host.consecutive_failures >= threshold:
+            host.next_attempt_at = dt.datetime.utcnow() + dt.timedelta(
+                seconds=breaker_delay(host.consecutive_failures, threshold)
+            )
+            host.save(update_fields=["next_attempt_at"])
+        return host
+
+
+class WebSubSubscriptionQuerySet(models.QuerySet):
+    def active(self):
+        """
+        Subscriptions verified by their hub, with a lease not expired yet
+        """
+        return self.filter(lease_expires_at__gt=dt.datetime.utcnow())
+
+    def due_for_renewal(self):
+        """
+        Subscriptions whose lease expires within WEBSUB_RENEWAL_MARGIN,
+        or that their hub never verified
+        """
+        now = dt.datetime.utcnow()
+        margin = dt.timedelta(seconds=settings.WEBSUB_RENEWAL_MARGIN)
+        return self.filter(
+            Q(lease_expires_at__lte=now + margin)
+            | Q(lease_expires_at__isnull=True, requested_at__lte=now - margin)
         )
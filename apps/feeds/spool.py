@@ -0,0 +1,79 @@
+import os
+import secrets
+import time
+
+from django.conf import settings
+
+from apps.feeds.encoding import encode_feed
+
+
+class SpoolError(Exception):
+    pass
+
+
+def spool_body(text):
+    """
+    Hand a fetched feed body over to the parse stage. Bodies of at least
+    FEED_SPOOL_MIN_SIZE chars are written, encoded for the parser (see
+    encode_feed), to a file of FEED_SPOOL_DIR shared with the parse
+    workers. Only the file's name is sent through the broker
+
+    :param text: str - Feed body
+    :return: str or Dict - The body, or {"spooled": file name}
+    """
+    if not settings.FEED_SPOOL_DIR or len(text) < settings.FEED_SPOOL_MIN_SIZE:
+        return text
+
+    name = f"{secrets.token_hex(16)}.xml"
+    with open(os.path.join(settings.FEED_SPOOL_DIR, name), "wb") as spool_file:
+        spool_file.write(encode_feed(text))
+    return {"spooled": name}
+
+
+def read_spooled(body):
+    """
+    Get a body handed over by spool_body, removing its spool file
+
+    :param body: str or Dict - See spool_body
+    :return: str or bytes - The body
+    """
+    if not isinstance(body, dict):
+        return body
+
+    name = str(body.get("spooled", ""))
+    if not name or os.path.basename(name) != name:
+        raise SpoolError(f"Invalid spool file {name!r}")
+
+    path = os.path.join(settings.FEED_SPOOL_DIR, name)
+    try:
+        with open(path, "rb") as spool_file:
+            content = spool_file.read()
+    except OSError as exc:
+        raise SpoolError(f"Can't read spool file: {exc}")
+    os.remove(path)
+    return content
+
+
+def clean_spool(max_age):
+    """
+    Remove spool files older than max_age, left behind by
+    bodies that were never parsed
+
+    :param max_age: int - Seconds
+    :return: int - Count of files removed
+    """
+    if not settings.FEED_SPOOL_DIR:
+        return 0
+
+    removed = 0
+    expired = time.time() - max_age
+    with os.scandir(settings.FEED_SPOOL_DIR) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                # Read by a parse worker meanwhile
+                pass
+    return removed
@@ -1,123 +1,762 @@
-import requests
 import datetime as dt
+import secrets
+import time
+from collections import defaultdict
 
+from celery import current_app
+from celery import group
 from celery.decorators import task
 from celery.exceptions import MaxRetriesExceededError
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 
+from apps.feeds.models import Entry
 from apps.feeds.models import Feed
+from apps.feeds.models import Host
 from apps.feeds.models import Item
+from apps.feeds.models import OPMLImport
+from apps.feeds.models import Profile
+from apps.feeds.models import WebSubSubscription
 from apps.feeds.date_utils import str_to_datetime
 from apps.feeds.feed_parser import ParseContentError
+from apps.feeds.feed_parser import ParsedEntry
+from apps.feeds.feed_parser import get_entries
+from apps.feeds.feed_parser import get_hub
 from apps.feeds.feed_parser import parse
+from apps.feeds.spool import SpoolError
+from apps.feeds.spool import clean_spool
+from apps.feeds.spool import read_spooled
+from apps.feeds.spool import spool_body
+from apps.feeds.text_utils import make_excerpt
+from apps.feeds.url_utils import get_host
+from apps.feeds.url_utils import normalize_url
+from apps.feeds.websub import request_subscription
 from apps.notifications.models import Notification
+from rss_scraper.db import db_slot
 
 
 @task(name="feeds.update_all")
 def update_all_feeds():
-    feed_ids = Feed.objects.values_list("id", flat=True)
+    feeds = Feed.objects.due_for_update().values_list("id", "rss_url", "last_updated_at")
+    open_hosts = set(Host.objects.open_breakers())
+    pushed_urls = set(WebSubSubscription.objects.active().values_list("rss_url", flat=True))
+    fallback_poll_before = dt.datetime.utcnow() - dt.timedelta(
+        seconds=settings.WEBSUB_FALLBACK_POLL_INTERVAL
+    )
+
+    urls = {}
+    for feed_id, rss_url, last_updated_at in feeds:
+        if get_host(rss_url) in open_hosts:
+            continue
+        # Feeds pushed by their hub are only polled as a fallback
+        rss_url = normalize_url(rss_url)
+        if rss_url in pushed_urls and last_updated_at > fallback_poll_before:
+            continue
+        urls[feed_id] = rss_url
+
+    # Skip feeds with a refresh already in flight
+    acquired = Feed.objects.filter(pk__in=list(urls)).acquire_refreshes()
 
-    for feed_id in feed_ids:
-        update_feed_items.delay(feed_id)
+    # Feeds sharing a url (subscribed by several users) are fetched once
+    fetch_groups = defaultdict(list)
+    for feed_id in sorted(acquired):
+        fetch_groups[urls[feed_id]].append(feed_id)
+
+    for feed_ids in fetch_groups.values():
+        update_feed_items.delay(feed_ids[0], feed_ids=feed_ids)
 
     return "Started feed updates!"
 
 
+def refresh_feed(feed_id):
+    """
+    Update a feed's items on behalf of a user, ahead of
+    any scheduled feed updates waiting in the queues.
+
+    Does nothing if the feed is already being refreshed or was
+    updated less than FEED_MIN_REFRESH_INTERVAL seconds ago.
+
+    :param feed_id: str - Feed's PK
+    :return: Boolean - True if a refresh was started
+    """
+    if not Feed.objects.acquire_refresh(
+        feed_id, min_interval=settings.FEED_MIN_REFRESH_INTERVAL
+    ):
+        return False
+
+    priority = settings.FEED_REFRESH_PRIORITY
+    update_feed_items.apply_async((feed_id, priority), priority=priority)
+    return True
+
+
 @task
-def update_feed_items(feed_id):
+def update_feed_items(feed_id, priority=settings.FEED_POLL_PRIORITY, feed_ids=None):
     """
     For given feed ID: get new items --> parse items --> store items
     Chain function using Celery's chain primitive:
     https://docs.celeryproject.org/en/stable/userguide/canvas.html#chains
 
+    Each step is routed to its own queue (fetch, parse, store)
+    with the given priority.
+
     If any function in the chain fails, it'll return a None.
 
     :param feed_id: str - Feed's PK
+    :param priority: int - Priority of the chain's tasks
+    :param feed_ids: List - PKs of the feeds sharing feed_id's url,
+        updated from the same fetch. Defaults to [feed_id]
     :return: None
     """
-    chain = get_feed.s(feed_id) | parse_feed.s() | update_feed.s(feed_id)
+    feed_ids = feed_ids or [feed_id]
+    chain = (
+        get_feed.s(feed_id, feed_ids).set(priority=priority)
+        | parse_feed.s(feed_id).set(priority=priority)
+        | update_feeds.s(feed_ids).set(priority=priority)
+    )
     chain()
 
 
 @task(bind=True, max_retries=settings.CELERY_MAX_RETRIES)
-def get_feed(self, feed_id):
+def get_feed(self, feed_id, feed_ids=None):
     """
     Get a feed's rss and return rss xml as str.
+    Records the feed's transferred and decoded body sizes, and
+    its new url when the feed's url is permanently redirected.
 
     In case of errors while requesting feed rss:
-    1) retry x (max_retries)
-    2) notify user/subscriber when max retries exceeds
+    1) retry x (max_retries) connection, DNS and timeout errors,
+       server errors (5xx) and throttling (429), unless the feed's
+       breaker is open
+    2) record the failure in the feed's breaker, and the host's
+       breaker for the errors above
+    3) notify user/subscriber
+
+    Feeds rejected by their server (4xx) or exceeding FEED_MAX_BODY_SIZE
+    fail without retrying. Failures are recorded/notified for all feeds
+    in feed_ids.
+
+    Waits for the parse stage to catch up with its backlog before
+    fetching, and hands large bodies over through spool files.
 
     :param feed_id: str - Feed's PK
-    :return: str - rss xml or ""
+    :param feed_ids: List - PKs of the feeds sharing feed_id's url
+    :return: str or Dict - rss xml, "" or a spooled body (see spool_body)
     """
-    feed = Feed.objects.get(pk=feed_id)
+    # requests is only imported by the processes fetching feeds
+    from apps.feeds.fetcher import FeedTooLargeError
+    from apps.feeds.fetcher import fetch
+    from apps.feeds.fetcher import is_transient_error
+
+    wait_for_parse_backlog()
+    # No connection is held while fetching, see db_slot
+    with db_slot():
+        feed = Feed.objects.get(pk=feed_id)
+    feed_ids = feed_ids or [feed.pk]
+    host = get_host(feed.rss_url)
 
     try:
-        resp = requests.get(feed.rss_url)
-        return resp.text
+        result = fetch(feed.rss_url)
+        failed = not result.ok
+        transient = result.transient
+    except FeedTooLargeError:
+        # Retrying won't make the feed any smaller
+        failed, transient = True, False
     except Exception as exc:
-        try:
-            self.retry(countdown=settings.CELERY_RETRY_BACKOFF ** self.request.retries)
-        except MaxRetriesExceededError as exc:
-            notify_subscriber(feed.pk)
-            return ""
+        failed, transient = True, is_transient_error(exc)
+
+    if failed:
+        # Failing feeds are probed once, not retried
+        if transient and feed.status == Feed.ACTIVE:
+            try:
+                self.retry(countdown=settings.CELERY_RETRY_BACKOFF ** self.request.retries)
+            except MaxRetriesExceededError:
+                pass
+        with db_slot():
+            # Errors of the feed's url don't tell whether its host is down
+            feed_failed(feed_ids, host if transient else None)
+        return ""
+
+    fields = {
+        "bytes_transferred": result.bytes_transferred,
+        "bytes_decoded": result.bytes_decoded,
+    }
+    if result.permanent_url:
+        # Skip the redirect hops on the next fetches
+        fields["rss_url"] = normalize_url(result.permanent_url)
+    with db_slot():
+        Feed.objects.filter(pk__in=feed_ids).update(**fields)
+        Feed.objects.filter(pk__in=feed_ids).record_success()
+        Host.objects.record_success(host)
+    return spool_body(result.text)
+
+
+# Last checked parse backlog of the worker process, (monotonic time, count)
+_parse_backlog = (0, 0)
+
+
+def get_parse_backlog():
+    """
+    :return: int - Count of messages waiting in the parse queue, checked
+        at most once per FEED_PARSE_BACKLOG_CHECK_INTERVAL secs per process
+    """
+    global _parse_backlog
+    checked_at, count = _parse_backlog
+    now = time.monotonic()
+    if now - checked_at < settings.FEED_PARSE_BACKLOG_CHECK_INTERVAL:
+        return count
+
+    try:
+        with current_app.connection_or_acquire() as conn:
+            count = conn.default_channel.queue_declare(
+                queue="parse", passive=True
+            ).message_count
+    except Exception:
+        # Fetch as usual when the broker can't tell
+        count = 0
+    _parse_backlog = (now, count)
+    return count
+
+
+def wait_for_parse_backlog():
+    """
+    Hold a fetch while more than FEED_PARSE_MAX_BACKLOG bodies wait to be
+    parsed, for up to FEED_PARSE_MAX_WAIT secs. Waiting fetches take up
+    fetch slots, so fetching slows down to the pace of the parse workers
+
+    :return: Boolean - True if the backlog was within bounds
+    """
+    if not settings.FEED_PARSE_MAX_BACKLOG:
+        return True
+
+    deadline = time.monotonic() + settings.FEED_PARSE_MAX_WAIT
+    while get_parse_backlog() > settings.FEED_PARSE_MAX_BACKLOG:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(settings.FEED_PARSE_BACKLOG_CHECK_INTERVAL)
+    return True
+
+
+@task(name="feeds.refresh_feeds")
+def refresh_feeds(feed_ids):
+    """
+    Update given feeds now, e.g. from the admin. Failing and quarantined
+    feeds are updated too, feeds with an update in flight are skipped
+
+    :param feed_ids: List - Feed PKs
+    :return: int - Count of updates started
+    """
+    priority = settings.FEED_REFRESH_PRIORITY
+    acquired = Feed.objects.filter(pk__in=feed_ids).acquire_refreshes()
+    for feed_id in acquired:
+        update_feed_items.apply_async((feed_id, priority), priority=priority)
+    return len(acquired)
+
+
+@task(name="feeds.quarantine_feeds")
+def quarantine_feeds(feed_ids):
+    """
+    Stop the scheduled updates of given feeds, like the updates of feeds
+    failing for FEED_QUARANTINE_DAYS. Users can still update them
+
+    :param feed_ids: List - Feed PKs
+    :return: int - Count of feeds quarantined
+    """
+    return (
+        Feed.objects.filter(pk__in=feed_ids)
+        .exclude(status=Feed.QUARANTINED)
+        .update(status=Feed.QUARANTINED, next_attempt_at=None)
+    )
+
+
+@task(name="feeds.purge_feed_items")
+def purge_feed_items(feed_ids):
+    """
+    Delete the items of given feeds, except bookmarked ones,
+    and the feeds' entries no item refers to anymore
+
+    :param feed_ids: List - Feed PKs
+    :return: int - Count of items deleted
+    """
+    feeds = Feed.objects.filter(pk__in=feed_ids)
+    _, deleted = Item.objects.filter(feed__in=feeds, bookmark=False).delete()
+
+    source_urls = {normalize_url(rss_url) for rss_url in feeds.values_list("rss_url", flat=True)}
+    Entry.objects.filter(source_url__in=source_urls, items__isnull=True).delete()
+
+    # The feeds' pages changed without an update of the feeds
+    for user_id in set(feeds.values_list("subscriber_id", flat=True)):
+        Profile.objects.touch_read_state(user_id)
+    return deleted.get(Item._meta.label, 0)
+
+
+def feed_failed(feed_ids, host):
+    """
+    Record a failed fetch of given feeds from host
+    and notify the feeds' subscribers
+
+    :param feed_ids: List - Feed PKs
+    :param host: str - Host the feeds were fetched from, None
+        if the failure isn't the host's
+    :return: None
+    """
+    Feed.objects.filter(pk__in=feed_ids).record_failure()
+    if host:
+        Host.objects.record_failure(host)
+    notify_subscribers(feed_ids)
 
 
 @task
-def parse_feed(feed):
+def parse_feed(feed, feed_id=None):
     """
-    A simple wrapper to the feed parser's parse function
+    A simple wrapper to the feed parser's parse function.
+    Subscribes to the WebSub hub the feed advertises, if any
 
-    :param feed: str - rss xml
-    :return: List - entries/items within the feed
+    :param feed: str or Dict - rss xml, or a spooled body (see spool_body)
+    :param feed_id: str - Feed's PK
+    :return: List - ParsedEntry tuples of the items within the feed
     """
     try:
-        return parse(feed).entries
-    except ParseContentError as exc:
+        parsed_feed = parse(read_spooled(feed))
+    except (ParseContentError, SpoolError) as exc:
         return []
 
+    if feed_id:
+        discover_hub(parsed_feed, feed_id)
+    return get_entries(parsed_feed)
+
 
 @task
 def update_feed(parsed_items, feed_id):
     """
     Create item instances from parsed items and
-    update/replace given feed's items & last_updated_at
+    update/replace given feed's items & last_updated_at.
+    Ends the feed's in flight refresh
 
-    :param parsed_items: List - Items within feed
+    :param parsed_items: List - ParsedEntry tuples of the items within feed
     :param feed_id: str - Feed's PK
     :return: None
     """
-    if not parsed_items:
-        return None
+    update_feeds(parsed_items, [feed_id])
+
+
+@task
+def update_feeds(parsed_items, feed_ids, merge=False):
+    """
+    Store the items of a single fetch into each of the feeds sharing
+    its url. Ends the feeds' in flight refreshes
 
-    feed = Feed.objects.get(pk=feed_id)
-    feed.items.filter(bookmark=False).delete()
+    :param parsed_items: List - ParsedEntry tuples (or lists, when
+        deserialized) of the items within feed
+    :param feed_ids: List - Feed PKs
+    :param merge: Boolean - Keep the feeds' items missing from parsed_items
+    :return: None
+    """
+    try:
+        if not parsed_items:
+            return None
+        parsed_items = [ParsedEntry(*item) for item in parsed_items]
+
+        entries = {}
+        for feed in Feed.objects.filter(pk__in=feed_ids):
+            source_url = normalize_url(feed.rss_url)
+            if source_url not in entries:
+                entries[source_url] = store_entries(parsed_items, source_url)
+            store_items(entries[source_url], feed, merge=merge)
+
+        for source_url in entries:
+            delete_orphaned_entries(source_url, parsed_items)
+    finally:
+        for feed_id in feed_ids:
+            Feed.objects.release_refresh(feed_id)
+
+
+def get_guid(parsed_item):
+    """
+    :param parsed_item: ParsedEntry
+    :return: str - Identity of the entry within its feed, "" if it has none
+    """
+    guid = parsed_item.link or parsed_item.id or parsed_item.title
+    return (guid or "")[:255]
+
+
+def store_entries(parsed_items, source_url):
+    """
+    Create the entries of a source's parsed items, once for all the
+    feeds subscribed to the source. Entries already stored are only
+    written if their content changed
 
-    items_list = []
+    :param parsed_items: List - ParsedEntry tuples of the items within feed
+    :param source_url: str - Normalized rss url of the feed
+    :return: Dict - Entry PK -> published datetime, of the parsed items
+    """
+    parsed = {}
     for item in parsed_items:
-        items_list.append(
-            Item(
-                title=item.get("title"),
-                link=item.get("link"),
-                description=item.get("description"),
-                summary=item.get("summary"),
-                feed=feed,
-                published_at=str_to_datetime(item.get("published")),
+        guid = get_guid(item)
+        if guid and guid not in parsed:
+            content = item.description or item.summary or ""
+            parsed[guid] = Entry(
+                source_url=source_url,
+                guid=guid,
+                title=item.title,
+                link=item.link,
+                description=item.description,
+                summary=item.summary,
+                excerpt=make_excerpt(content, settings.ENTRY_EXCERPT_LENGTH),
+                content_length=len(content),
+                published_at=str_to_datetime(item.published),
+            )
+
+    fields = [
+        "title",
+        "link",
+        "description",
+        "summary",
+        "excerpt",
+        "content_length",
+        "published_at",
+    ]
+    # Only load the source's entries still in the feed, and only
+    # the compared columns
+    entries = Entry.objects.filter(source_url=source_url, guid__in=list(parsed))
+    stored = {entry.guid: entry for entry in entries.only("guid", *fields)}
+    changed = []
+    for guid, entry in stored.items():
+        if any(getattr(entry, f) != getattr(parsed[guid], f) for f in fields):
+            for field in fields:
+                setattr(entry, field, getattr(parsed[guid], field))
+            changed.append(entry)
+
+    Entry.objects.bulk_update(changed, fields)
+    new = [entry for guid, entry in parsed.items() if guid not in stored]
+    if not new:
+        return {entry.pk: entry.published_at for entry in stored.values()}
+
+    # Concurrent fetches of the source may create the same entries
+    Entry.objects.bulk_create(new, ignore_conflicts=True)
+    return dict(entries.values_list("id", "published_at"))
+
+
+def store_items(entries, feed, merge=False):
+    """
+    Update a feed's items to given entries: items of new entries are
+    created, the ones of entries no longer in the feed are deleted
+    unless bookmarked. Items of entries still in the feed keep their
+    read/bookmark state
+
+    :param entries: Dict - Entry PK -> published datetime
+    :param feed: Feed
+    :param merge: Boolean - Keep the items of entries missing from entries
+    :return: None
+    """
+    with transaction.atomic():
+        items = {
+            entry_id: (item_id, bookmark, published_at)
+            for item_id, entry_id, bookmark, published_at in feed.items.values_list(
+                "id", "entry_id", "bookmark", "published_at"
+            )
+        }
+
+        stale_ids = [
+            item_id
+            for entry_id, (item_id, bookmark, _) in items.items()
+            if entry_id not in entries and not bookmark and not merge
+        ]
+        if stale_ids:
+            Item.objects.filter(pk__in=stale_ids).delete()
+
+        Item.objects.bulk_create(
+            [
+                Item(
+                    entry_id=entry_id,
+                    feed=feed,
+                    subscriber_id=feed.subscriber_id,
+                    published_at=published_at,
+                )
+                for entry_id, published_at in entries.items()
+                if entry_id not in items
+            ]
+        )
+
+        # Entries may be republished at another time
+        Item.objects.bulk_update(
+            [
+                Item(pk=items[entry_id][0], published_at=published_at)
+                for entry_id, published_at in entries.items()
+                if entry_id in items and items[entry_id][2] != published_at
+            ],
+            ["published_at"],
+        )
+
+        # The feed's row was read before the fetch, only write what changed
+        feed.last_updated_at = dt.datetime.utcnow()
+        feed.save(update_fields=["last_updated_at"])
+
+
+def delete_orphaned_entries(source_url, parsed_items):
+    """
+    Delete the entries of a source no item refers to anymore. Entries
+    still in the feed are kept, a concurrent store may be adding them
+    """
+    guids = {get_guid(item) for item in parsed_items}
+    orphaned = [
+        entry_id
+        for entry_id, guid in Entry.objects.filter(
+            source_url=source_url, items__isnull=True
+        ).values_list("id", "guid")
+        if guid not in guids
+    ]
+    if orphaned:
+        Entry.objects.filter(pk__in=orphaned).delete()
+
+
+def import_opml(user, outlines, invalid=0):
+    """
+    Follow the feeds of an OPML file. Feeds the user already follows
+    (or listed twice) are skipped, the others are created in bulk and
+    validated concurrently by import_feed tasks
+
+    :param user: User - Subscriber of the feeds
+    :param outlines: List - opml.Outline tuples
+    :param invalid: int - Outlines with an invalid url, counted as failed
+    :return: OPMLImport - Progress of the import
+    """
+    followed = {normalize_url(url) for url in user.feeds.values_list("rss_url", flat=True)}
+
+    new_outlines = {}
+    for outline in outlines:
+        rss_url = normalize_url(outline.rss_url)
+        if rss_url not in followed and rss_url not in new_outlines:
+            new_outlines[rss_url] = outline
+
+    opml_import = OPMLImport.objects.create(
+        user=user,
+        total=len(new_outlines) + invalid,
+        duplicates=len(outlines) - len(new_outlines),
+        processed=invalid,
+        failed=invalid,
+    )
+    if not new_outlines:
+        return opml_import
+
+    Feed.objects.bulk_create(
+        [
+            Feed(
+                title=(outline.title or rss_url)[:255],
+                link=outline.link[:255],
+                description="",
+                rss_url=rss_url,
+                folder=outline.folder[:255],
+                subscriber=user,
+            )
+            for rss_url, outline in new_outlines.items()
+        ]
+    )
+    # bulk_create only sets primary keys on postgres
+    feed_ids = user.feeds.filter(rss_url__in=list(new_outlines)).values_list("id", flat=True)
+
+    priority = settings.FEED_REFRESH_PRIORITY
+    group(
+        import_feed.s(opml_import.pk, feed_id).set(priority=priority)
+        for feed_id in feed_ids
+    ).apply_async()
+    return opml_import
+
+
+@task(bind=True, max_retries=settings.CELERY_MAX_RETRIES)
+def import_feed(self, import_id, feed_id):
+    """
+    Validate an imported feed like FollowFeedForm does: fetch and parse
+    it, then store its details and items. Feeds rejected by their server
+    (4xx), with an invalid url or failing to parse are removed. Timeouts,
+    connection errors and server errors are retried, once retries run
+    out the feed is kept for the scheduled updates. Counts the feed in
+    the import's progress
+
+    :param import_id: str - OPMLImport's PK
+    :param feed_id: str - Feed's PK
+    :return: Boolean - True if the feed is valid
+    """
+    from apps.feeds.fetcher import FeedTooLargeError
+    from apps.feeds.fetcher import fetch
+    from apps.feeds.fetcher import is_transient_error
+
+    with db_slot():
+        feed = Feed.objects.filter(pk=feed_id).first()
+    parsed_feed = None
+    transient = False
+    if feed is not None:
+        try:
+            result = fetch(feed.rss_url)
+            # Failing or throttling servers may recover
+            transient = result.transient
+            if result.ok:
+                parsed_feed = parse(result.text)
+        except (FeedTooLargeError, ParseContentError):
+            pass
+        except Exception as exc:
+            # Timeouts and connection errors, unlike invalid urls
+            transient = is_transient_error(exc)
+
+        if transient:
+            try:
+                self.retry(countdown=settings.CELERY_RETRY_BACKOFF ** self.request.retries)
+            except MaxRetriesExceededError:
+                pass
+    valid = parsed_feed is not None
+    removed = not valid and not transient
+    with db_slot():
+        if removed and feed is not None:
+            feed.delete()
+        if valid:
+            Feed.objects.filter(pk=feed_id).update(
+                link=parsed_feed.feed.get("link", "")[:255],
+                description=parsed_feed.feed.get("description", ""),
             )
+            update_feed(get_entries(parsed_feed), feed_id)
+            discover_hub(parsed_feed, feed_id)
+
+        OPMLImport.objects.filter(pk=import_id).update(
+            processed=F("processed") + 1, failed=F("failed") + (1 if removed else 0)
         )
-    Item.objects.bulk_create(items_list)
-    feed.last_updated_at = dt.datetime.utcnow()
-    feed.save()
+    return valid
+
+
+def discover_hub(parsed_feed, feed_id):
+    """
+    Subscribe to the WebSub hub a feed advertises, when WebSub is enabled
+
+    :param parsed_feed: FeedParserDict
+    :param feed_id: str - Feed's PK
+    :return: None
+    """
+    if not settings.WEBSUB_CALLBACK_URL:
+        return None
+
+    hub, topic = get_hub(parsed_feed)
+    if hub:
+        websub_subscribe.delay(feed_id, hub, topic)
+
+
+@task(name="feeds.websub_subscribe")
+def websub_subscribe(feed_id, hub, topic):
+    """
+    Subscribe to a feed's WebSub hub, unless the feed's url
+    is already subscribed to the hub and topic
+
+    :param feed_id: str - Feed's PK
+    :param hub: str - Hub's url
+    :param topic: str - Feed's canonical (self) url
+    :return: Boolean - True if a subscription was requested
+    """
+    feed = Feed.objects.filter(pk=feed_id).first()
+    if not feed:
+        return False
+
+    subscription, created = WebSubSubscription.objects.get_or_create(
+        rss_url=normalize_url(feed.rss_url),
+        defaults={"hub": hub, "topic": topic, "secret": secrets.token_hex(20)},
+    )
+    unchanged = (subscription.hub, subscription.topic) == (hub, topic)
+    due = WebSubSubscription.objects.due_for_renewal().filter(pk=subscription.pk)
+    if not created and unchanged and not due.exists():
+        return False
+
+    subscription.hub = hub
+    subscription.topic = topic
+    return renew_subscription(subscription)
+
+
+@task(name="feeds.renew_websub_subscriptions")
+def renew_websub_subscriptions():
+    """
+    Renew WebSub subscriptions before their lease expires. Subscriptions
+    of urls no one follows anymore are dropped and left to expire
+    """
+    if not settings.WEBSUB_CALLBACK_URL:
+        return None
+
+    for subscription in WebSubSubscription.objects.due_for_renewal():
+        if Feed.objects.filter(rss_url=subscription.rss_url).exists():
+            renew_subscription(subscription)
+        else:
+            subscription.delete()
+
+
+@task(name="feeds.clean_spool")
+def clean_feed_spool():
+    """
+    Remove the spool files of bodies that were never parsed, e.g. of
+    parse tasks lost with their worker. Routed to the parse queue,
+    whose workers share the spool directory
+    """
+    return clean_spool(settings.FEED_SPOOL_MAX_AGE)
+
+
+def renew_subscription(subscription):
+    subscription.requested_at = dt.datetime.utcnow()
+    # Set before the request, hubs may verify it before answering
+    subscription.pending = True
+    subscription.save()
+
+    try:
+        request_subscription(subscription)
+    except Exception as exc:
+        # Retried by the next renewal, once due
+        return False
+    return True
+
+
+@task
+def store_pushed_feed(subscription_id, feed):
+    """
+    Store feed content pushed by a WebSub hub into the feeds of the
+    subscription, through the same parse/store tasks as polled feeds.
+    Pushed content may only hold new entries, so it's merged with the
+    feeds' items
+
+    :param subscription_id: str - WebSubSubscription's PK
+    :param feed: str - rss xml
+    :return: None
+    """
+    subscription = WebSubSubscription.objects.filter(pk=subscription_id).first()
+    if not subscription:
+        return None
+
+    feeds = Feed.objects.filter(rss_url=subscription.rss_url)
+    # Feeds with a refresh in flight get the content from their fetch
+    feed_ids = feeds.acquire_refreshes()
+    if not feed_ids:
+        return None
+
+    chain = parse_feed.s(feed) | update_feeds.s(feed_ids, merge=True)
+    chain()
 
 
 def notify_subscriber(feed_id):
-    feed = Feed.objects.get(pk=feed_id)
-    update_feed_url = feed.get_update_url()
+    notify_subscribers([feed_id])
+
 
-    Notification.objects.create(
-        title=f"Failed to Update feed: {feed}",
-        details=f"{update_feed_url}",
-        user=feed.subscriber,
+def notify_subscribers(feed_ids):
+    """
+    Notify the subscribers of given feeds that updating the feed failed.
+    Notifications are inserted in bulk, and repeated failures of a feed
+    are coalesced into the subscriber's unread notification
+
+    :param feed_ids: List - Feed PKs
+    :return: None
+    """
+    feeds = Feed.objects.filter(pk__in=feed_ids).only("title", "subscriber_id")
+
+    Notification.objects.notify(
+        [
+            Notification(
+                title=f"Failed to Update feed: {feed}",
+                details=f"{feed.get_update_url()}",
+                user_id=feed.subscriber_id,
+                key=f"feed-update-failed:{feed.pk}",
+            )
+            for feed in feeds
+        ]
     )
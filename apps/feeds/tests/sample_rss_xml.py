@@ -12,3 +12,10 @@ FEED = (
     f"<item><title>{ITEM2_TITLE}</title></item>"
     f"</channel></rss>"
 )
+HUB = "https://hub.test.com/"
+TOPIC = "https://test.com/rss"
+FEED_WITH_HUB = FEED.replace(
+    "<channel>",
+    f'<channel><atom:link rel="hub" href="{HUB}"/>'
+    f'<atom:link rel="self" href="{TOPIC}"/>',
+)
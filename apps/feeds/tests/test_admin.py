@@ -0,0 +1,132 @@
+import pytest
+
+from django import urls
+from django.contrib.auth import get_user_model
+from django_dynamic_fixture import G
+
+from apps.feeds.models import Comment
+from apps.feeds.models import Entry
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+from apps.feeds.tasks import purge_feed_items
+from apps.feeds.tasks import quarantine_feeds
+from apps.feeds.tasks import refresh_feeds
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [Feed, Item, Comment])
+def test_admin_changelist(admin_client, django_assert_max_num_queries, model):
+    """
+    Verify changelists load their rows' relations in
+    a constant number of queries
+    """
+    feed = G(Feed, rss_url="https://test.com/rss")
+    for _ in range(10):
+        G(Comment, item=G(Item, feed=feed, subscriber=feed.subscriber))
+    url = urls.reverse(f"admin:feeds_{model._meta.model_name}_changelist")
+
+    with django_assert_max_num_queries(8):
+        resp = admin_client.get(url)
+
+    assert resp.status_code == 200
+    assert resp.context["cl"].result_count == model.objects.count()
+
+
+@pytest.mark.django_db
+def test_admin_feed_search(admin_client):
+    """
+    Verify feeds are searched by id, normalized rss url
+    and subscriber's username
+    """
+    user = G(get_user_model(), username="reader")
+    feed = G(Feed, rss_url="https://test.com/rss", subscriber=user)
+    other = G(Feed, rss_url="https://other.com/rss")
+    url = urls.reverse("admin:feeds_feed_changelist")
+
+    def search(term):
+        resp = admin_client.get(url, {"q": term})
+        return [result.pk for result in resp.context["cl"].result_list]
+
+    assert search(str(other.pk)) == [other.pk]
+    assert search("HTTPS://TEST.com:443/rss") == [feed.pk]
+    assert search("reader") == [feed.pk]
+    assert search("rss") == []
+
+
+@pytest.mark.django_db
+def test_admin_feed_actions(admin_client, mocker, settings):
+    """
+    Verify feed actions are run in the background,
+    by batches of selected feeds
+    """
+    settings.ADMIN_ACTION_BATCH_SIZE = 2
+    feeds = [G(Feed) for _ in range(3)]
+    delay = mocker.patch("apps.feeds.admin.quarantine_feeds.delay")
+
+    resp = admin_client.post(
+        urls.reverse("admin:feeds_feed_changelist"),
+        {"action": "quarantine", "_selected_action": [feed.pk for feed in feeds]},
+    )
+
+    assert resp.status_code == 302
+    batches = sorted(call[0][0] for call in delay.call_args_list)
+    assert sorted(pk for batch in batches for pk in batch) == [feed.pk for feed in feeds]
+    assert [len(batch) for batch in batches] == [1, 2]
+
+
+@pytest.mark.django_db
+def test_refresh_feeds(mocker):
+    """
+    Verify feeds are refreshed unless a refresh is in flight
+    """
+    apply_async = mocker.patch("apps.feeds.tasks.update_feed_items.apply_async")
+    feed = G(Feed, status=Feed.QUARANTINED)
+
+    assert refresh_feeds([feed.pk]) == 1
+    assert refresh_feeds([feed.pk]) == 0
+    assert apply_async.call_count == 1
+
+
+@pytest.mark.django_db
+def test_quarantine_feeds():
+    """
+    Verify feeds are quarantined
+    """
+    feeds = [G(Feed), G(Feed, status=Feed.QUARANTINED)]
+
+    assert quarantine_feeds([feed.pk for feed in feeds]) == 1
+    assert set(Feed.objects.values_list("status", flat=True)) == {Feed.QUARANTINED}
+
+
+@pytest.mark.django_db
+def test_purge_feed_items():
+    """
+    Verify a feed's items are purged but bookmarks,
+    with the entries left without items
+    """
+    feed = G(Feed, rss_url="https://test.com/rss")
+    other = G(Feed, rss_url="https://test.com/rss")
+    entries = [G(Entry, source_url=feed.rss_url, guid=str(i)) for i in range(3)]
+    G(Item, entry=entries[0], feed=feed, subscriber=feed.subscriber)
+    G(Item, entry=entries[1], feed=feed, subscriber=feed.subscriber, bookmark=True)
+    G(Item, entry=entries[2], feed=feed, subscriber=feed.subscriber)
+    G(Item, entry=entries[2], feed=other, subscriber=other.subscriber)
+
+    assert purge_feed_items([feed.pk]) == 2
+
+    assert list(feed.items.values_list("entry_id", flat=True)) == [entries[1].pk]
+    assert other.items.count() == 1
+    assert set(Entry.objects.values_list("id", flat=True)) == {entries[1].pk, entries[2].pk}
+
+
+@pytest.mark.django_db
+def test_admin_item_change(admin_client):
+    """
+    Verify an item's change form loads its deferred entry
+    """
+    item = G(Item, entry__title="entry title", feed=G(Feed))
+
+    resp = admin_client.get(urls.reverse("admin:feeds_item_change", args=[item.pk]))
+
+    assert resp.status_code == 200
+    assert b"entry title" in resp.content
@@ -0,0 +1,52 @@
+import pytest
+
+from apps.feeds.benchmark import generate_feed
+from apps.feeds.benchmark import load_results
+from apps.feeds.benchmark import record_result
+from apps.feeds.benchmark import run_benchmark
+from apps.feeds.feed_parser import ParseContentError
+from apps.feeds.feed_parser import parse
+from apps.feeds.models import Feed
+
+
+@pytest.mark.parametrize("fmt", ["rss", "atom"])
+def test_generate_feed(fmt):
+    """
+    Verify generated feeds parse and contain the requested number of entries
+    """
+    parsed = parse(generate_feed(25, fmt=fmt, duplicate_ratio=0.5))
+
+    assert len(parsed.entries) == 25
+    assert len({entry.link for entry in parsed.entries}) < 25
+
+    with pytest.raises(ParseContentError):
+        parse(generate_feed(25, fmt=fmt, malformed=True))
+
+
+@pytest.mark.django_db
+def test_run_benchmark():
+    """
+    Verify a benchmark run ingests the corpus, reports its metrics
+    and leaves no data behind
+    """
+    result = run_benchmark("atom_feeds", scale=0.02)
+
+    assert result["feeds"] == 2
+    assert result["entries"] == 100
+    assert result["feeds_per_sec"] > 0
+    assert result["queries_per_feed"] > 0
+    assert not Feed.objects.exists()
+
+
+def test_record_result(tmp_path):
+    """
+    Verify results are stored and compared with the previous run
+    """
+    results_file = str(tmp_path / "results.jsonl")
+    result = {"scenario": "many_feeds", "scale": 1.0, "feeds_per_sec": 10}
+
+    assert record_result(result, results_file) is None
+    assert record_result(dict(result, feeds_per_sec=20), results_file)[
+        "feeds_per_sec"
+    ] == 10
+    assert [r["feeds_per_sec"] for r in load_results(results_file)] == [10, 20]
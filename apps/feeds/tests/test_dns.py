@@ -0,0 +1,150 @@
+import logging
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+
+import pytest
+import requests
+
+from apps.feeds.dns import CachedDNSAdapter
+from apps.feeds.dns import DNSCache
+from apps.feeds.fetcher import session
+
+
+class StubResolver:
+    """
+    Resolves every host name to 127.0.0.1, or fails for unknown hosts
+    """
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.lookups = []
+
+    def __call__(self, host, port, family=0, type=0):
+        self.lookups.append(host)
+        if host not in self.hosts:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_dns_cache_ttl():
+    """
+    Verify resolutions are cached until their TTL expires,
+    and failed resolutions until their negative TTL expires
+    """
+    resolver = StubResolver({"test.com"})
+    clock = Clock()
+    cache = DNSCache(ttl=300, negative_ttl=60, resolver=resolver, clock=clock)
+
+    for _ in range(3):
+        addresses = cache.getaddrinfo("test.com", 443)
+    assert addresses[0][4] == ("127.0.0.1", 443)
+    assert resolver.lookups == ["test.com"]
+
+    for _ in range(2):
+        with pytest.raises(socket.gaierror):
+            cache.getaddrinfo("dead.com", 443)
+    assert resolver.lookups == ["test.com", "dead.com"]
+
+    clock.now = 61
+    with pytest.raises(socket.gaierror):
+        cache.getaddrinfo("dead.com", 443)
+    cache.getaddrinfo("test.com", 443)
+    assert resolver.lookups == ["test.com", "dead.com", "dead.com"]
+
+    clock.now = 301
+    cache.getaddrinfo("test.com", 443)
+    assert resolver.lookups == ["test.com", "dead.com", "dead.com", "test.com"]
+
+    assert cache.stats()["lookups"] == 8
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_dns_cache_stats_logged(caplog):
+    """
+    Verify the stats are logged every stats interval lookups
+    """
+    cache = DNSCache(
+        ttl=300, negative_ttl=60, stats_interval=2, resolver=StubResolver({"test.com"})
+    )
+
+    with caplog.at_level(logging.INFO, logger="apps.feeds.dns"):
+        for _ in range(5):
+            cache.getaddrinfo("test.com", 443)
+
+    stats = [record.args for record in caplog.records]
+    assert [(s["lookups"], s["hit_rate"]) for s in stats] == [(2, 0.5), (4, 0.75)]
+
+
+def test_dns_cache_max_size():
+    """
+    Verify the oldest resolutions are evicted once the cache is full
+    """
+    resolver = StubResolver({"a.com", "b.com", "c.com"})
+    cache = DNSCache(ttl=300, negative_ttl=60, max_size=2, resolver=resolver)
+
+    for host in ["a.com", "b.com", "c.com", "b.com", "a.com"]:
+        cache.getaddrinfo(host, 80)
+
+    assert resolver.lookups == ["a.com", "b.com", "c.com", "a.com"]
+    assert cache.stats()["size"] == 2
+
+
+def test_cached_dns_adapter():
+    """
+    Verify sessions with the adapter mounted connect to the cached
+    address, keeping the requested host name in the Host header
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = self.headers["Host"].encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    port = httpd.server_address[1]
+
+    resolver = StubResolver({"feeds.test"})
+    cache = DNSCache(ttl=300, negative_ttl=60, resolver=resolver)
+    session = requests.Session()
+    session.mount("http://", CachedDNSAdapter(cache))
+
+    try:
+        for _ in range(2):
+            resp = session.get(f"http://feeds.test:{port}/rss", headers={"Connection": "close"})
+            assert resp.text == f"feeds.test:{port}"
+
+        with pytest.raises(requests.ConnectionError):
+            session.get(f"http://dead.test:{port}/rss")
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert resolver.lookups == ["feeds.test", "dead.test"]
+
+
+def test_session_pool_size(settings):
+    """
+    Verify the fetches' connection pools fit the fetch concurrency
+    """
+    for scheme in ("http://", "https://"):
+        adapter = session.get_adapter(scheme)
+        assert adapter._pool_maxsize == settings.FETCH_CONCURRENCY
+        assert adapter._pool_connections == settings.FETCH_CONCURRENCY
@@ -0,0 +1,77 @@
+import codecs
+
+import pytest
+
+from apps.feeds.encoding import decode_feed
+from apps.feeds.encoding import encode_feed
+from apps.feeds.feed_parser import parse
+
+TITLE = "Café – Ünïcödé"
+FEED = (
+    '<?xml version="1.0" encoding="{encoding}"?>\n<rss version="2.0"><channel>'
+    f"<title>{TITLE}</title><link>https://test.com</link>"
+    f"<description>testing</description><item><title>{TITLE}</title></item>"
+    "</channel></rss>"
+)
+
+
+@pytest.mark.parametrize(
+    "content, content_type",
+    [
+        # XML declaration
+        (FEED.format(encoding="utf-8").encode("utf-8"), "application/rss+xml"),
+        (FEED.format(encoding="windows-1252").encode("windows-1252"), None),
+        # Content-Type charset takes precedence
+        (
+            FEED.format(encoding="utf-8").encode("windows-1252"),
+            "text/xml; charset=windows-1252",
+        ),
+        # Byte order marks
+        (codecs.BOM_UTF8 + FEED.format(encoding="utf-8").encode("utf-8"), None),
+        (
+            codecs.BOM_UTF16_LE + FEED.format(encoding="utf-16").encode("utf-16-le"),
+            None,
+        ),
+    ],
+)
+def test_decode_feed(content, content_type):
+    """
+    Verify feeds are decoded with their declared encoding
+    """
+    text = decode_feed(content, content_type)
+
+    assert TITLE in text
+    assert parse(text).feed.title == TITLE
+
+
+def test_decode_feed_detection(mocker):
+    """
+    Verify encoding detection only runs on a bounded prefix
+    when no declared encoding decodes the feed
+    """
+    detect = mocker.patch("chardet.detect", return_value={"encoding": "windows-1252"})
+    content = FEED.format(encoding="foo").encode("windows-1252") * 10000
+
+    assert TITLE in decode_feed(content)
+    assert len(detect.call_args[0][0]) < len(content)
+
+
+def test_decode_feed_does_not_detect_declared_encodings(mocker):
+    """
+    Verify encoding detection doesn't run for declared encodings
+    """
+    detect = mocker.patch("chardet.detect")
+
+    decode_feed(FEED.format(encoding="windows-1252").encode("windows-1252"))
+
+    assert not detect.called
+
+
+def test_encode_feed():
+    """
+    Verify the XML declaration matches the utf-8 encoded feed
+    """
+    content = encode_feed(FEED.format(encoding="iso-8859-1"))
+
+    assert content.startswith(b'<?xml version="1.0" encoding="utf-8"?>')
+    assert TITLE.encode("utf-8") in content
@@ -1,3 +1,4 @@
+import feedparser
 from feedparser import FeedParserDict
 import pytest
 
@@ -6,7 +7,10 @@ from django_dynamic_fixture import G
 from apps.feeds import feed_parser
 from apps.feeds.feed_parser import has_required_fields
 from apps.feeds.feed_parser import ParseContentError
+from apps.feeds.feed_parser import ParsedEntry
+from apps.feeds.feed_parser import get_entries
 from apps.feeds.feed_parser import parse
+from apps.feeds.tests import sample_rss_xml
 
 
 @pytest.fixture
@@ -43,7 +47,7 @@ def test_parse_rss_success(mocker, rss_feed):
     """
     Test parsing feed xml successfully
     """
-    mocker.patch("apps.feeds.feed_parser.feedparser.parse", return_value=rss_feed)
+    mocker.patch("feedparser.parse", return_value=rss_feed)
     mocker.patch("apps.feeds.feed_parser.has_required_fields", return_value=True)
 
     parsed_data = parse("foo")
@@ -56,13 +60,13 @@ def test_parse_rss_error(mocker):
     Test exceptions are handled for error while parsing rss
     """
     feed = FeedParserDict({"bozo": True, "bozo_exception": "details",})
-    mocker.patch("apps.feeds.feed_parser.feedparser.parse", return_value=feed)
+    mocker.patch("feedparser.parse", return_value=feed)
 
     with pytest.raises(ParseContentError):
         parse("foo")
 
     feed = FeedParserDict({"bozo": False, "feed": "test"})
-    mocker.patch("apps.feeds.feed_parser.feedparser.parse", return_value=feed)
+    mocker.patch("feedparser.parse", return_value=feed)
 
     mocker.patch("apps.feeds.feed_parser.has_required_fields", return_value=False)
     with pytest.raises(ParseContentError):
@@ -78,3 +82,32 @@ def test_has_required_fields(
     assert has_required_fields(rss_feed)
     assert not has_required_fields(rss_feed_missing_feed_title)
     assert not has_required_fields(rss_feed_missing_item_title_and_description)
+
+
+def test_get_entries(rss_feed):
+    """
+    Verify parsed entries are converted to ParsedEntry tuples
+    """
+    assert get_entries(rss_feed) == [
+        ParsedEntry(title="test1", link="https://test.com/item1"),
+        ParsedEntry(title="test2", description="foo"),
+        ParsedEntry(title="test3", description="bar", summary="bar"),
+    ]
+
+
+def test_get_entries_parsed():
+    """
+    Verify the fields of entries parsed from xml are kept,
+    with the description of an item as its summary
+    """
+    parsed_feed = feedparser.parse(sample_rss_xml.FEED)
+
+    entries = get_entries(parsed_feed)
+
+    assert len(entries) == len(parsed_feed.entries)
+    for entry, parsed_entry in zip(entries, parsed_feed.entries):
+        assert entry.id == parsed_entry.get("id")
+        assert entry.link == parsed_entry.get("link")
+        assert entry.title == parsed_entry.get("title")
+        assert entry.description == entry.summary == parsed_entry.get("description")
+        assert entry.published == parsed_entry.get("published")
@@ -0,0 +1,103 @@
+import gzip
+
+import pytest
+
+from django_dynamic_fixture import G
+
+from apps.feeds.fetcher import FeedTooLargeError
+from apps.feeds.fetcher import fetch
+from apps.feeds.models import Feed
+from apps.feeds.tasks import get_feed
+from apps.feeds.tests import sample_rss_xml
+
+RSS_URL = "https://test.com/rss"
+
+
+def test_fetch_compressed(requests_mock):
+    """
+    Verify compressed feeds are decoded and both sizes are reported
+    """
+    content = sample_rss_xml.FEED.encode("utf-8")
+    requests_mock.get(
+        RSS_URL, content=gzip.compress(content), headers={"Content-Encoding": "gzip"}
+    )
+
+    result = fetch(RSS_URL)
+
+    assert result.ok
+    assert result.text == sample_rss_xml.FEED
+    assert result.bytes_decoded == len(content)
+    assert result.bytes_transferred < result.bytes_decoded
+    assert "gzip" in requests_mock.last_request.headers["Accept-Encoding"]
+
+
+@pytest.mark.parametrize("headers", [{}, {"Content-Encoding": "gzip"}])
+def test_fetch_too_large(requests_mock, headers):
+    """
+    Verify downloads are aborted past the maximum body size,
+    including bodies that only exceed it once decompressed
+    """
+    content = b"x" * 100000
+    if headers:
+        content = gzip.compress(content)
+    requests_mock.get(RSS_URL, content=content, headers=headers)
+
+    with pytest.raises(FeedTooLargeError):
+        fetch(RSS_URL, max_size=50000)
+
+
+@pytest.mark.django_db
+def test_get_feed_records_body_sizes(requests_mock):
+    """
+    Verify fetching a feed records its transferred and decoded sizes
+    """
+    content = sample_rss_xml.FEED.encode("utf-8")
+    requests_mock.get(
+        RSS_URL, content=gzip.compress(content), headers={"Content-Encoding": "gzip"}
+    )
+    feed = G(Feed, title="test", rss_url=RSS_URL)
+
+    assert get_feed(feed.pk) == sample_rss_xml.FEED
+
+    feed.refresh_from_db()
+    assert feed.bytes_decoded == len(content)
+    assert 0 < feed.bytes_transferred < feed.bytes_decoded
+
+
+@pytest.mark.django_db
+def test_get_feed_too_large(requests_mock, settings, authenticated_user):
+    """
+    Verify feeds exceeding the maximum size notify the subscriber
+    """
+    settings.FEED_MAX_BODY_SIZE = 10
+    requests_mock.get(RSS_URL, text=sample_rss_xml.FEED)
+    feed = G(Feed, title="test", rss_url=RSS_URL, subscriber=authenticated_user)
+
+    assert get_feed(feed.pk) == ""
+    assert authenticated_user.notifications.count() == 1
+
+
+@pytest.mark.parametrize(
+    "redirects, permanent_url",
+    [
+        ([], None),
+        ([301], "https://test.com/rss1"),
+        ([301, 308], "https://test.com/rss2"),
+        ([302], None),
+        ([301, 302], "https://test.com/rss1"),
+    ],
+)
+def test_fetch_permanent_url(requests_mock, redirects, permanent_url):
+    """
+    Verify only a feed's leading permanent redirects are reported
+    """
+    url = RSS_URL
+    for i, status_code in enumerate(redirects, 1):
+        requests_mock.get(url, status_code=status_code, headers={"Location": f"{RSS_URL}{i}"})
+        url = f"{RSS_URL}{i}"
+    requests_mock.get(url, text=sample_rss_xml.FEED)
+
+    result = fetch(RSS_URL)
+
+    assert result.ok
+    assert result.permanent_url == permanent_url
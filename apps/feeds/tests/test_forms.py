@@ -11,6 +11,7 @@ from apps.feeds.forms import UpdateItemForm
 from apps.feeds.models import Feed
 from apps.feeds.models import Item
 from apps.feeds.feed_parser import ParseContentError
+from apps.feeds.tests import sample_rss_xml
 from apps.feeds.tests.utils import mock_update_feed
 
 
@@ -57,6 +58,31 @@ def test_feed_form_error_parsing_rss_feed(mocker, requests_mock):
     assert not form.is_valid()
 
 
+@pytest.mark.django_db
+def test_feed_form_already_following(requests_mock):
+    """
+    Verify the FollowFeedForm normalizes the url and rejects
+    feeds the user already follows, including after redirects
+    """
+    user = G(get_user_model(), username="test")
+    G(Feed, title="test", rss_url="https://test.com/rss", subscriber=user)
+    requests_mock.get(
+        "https://test.com/old", status_code=301, headers={"Location": "https://test.com/rss"}
+    )
+    requests_mock.get("https://test.com/rss", text=sample_rss_xml.FEED)
+
+    form = FollowFeedForm(data={"rss_url": "HTTPS://TEST.com:443/rss#top"}, user=user)
+    assert not form.is_valid()
+    assert not requests_mock.called
+
+    form = FollowFeedForm(data={"rss_url": "https://test.com/old"}, user=user)
+    assert not form.is_valid()
+
+    form = FollowFeedForm(data={"rss_url": "https://test.com/old"}, user=G(get_user_model()))
+    assert form.is_valid()
+    assert form.cleaned_data["rss_url"] == "https://test.com/rss"
+
+
 @pytest.mark.django_db
 def test_update_item_form_success(mocker, requests_mock):
     """
@@ -65,7 +91,7 @@ def test_update_item_form_success(mocker, requests_mock):
     # Create a test user, related feeds and items
     user = G(get_user_model(), username="test")
     feed = G(Feed, title="testfeed", subscriber=user)
-    item = G(Item, title="test", feed=feed)
+    item = G(Item, entry__title="test", feed=feed)
     comment = "lol"
     form = UpdateItemForm(data={"comment": comment})
 
@@ -99,17 +125,15 @@ def test_update_feed_form_success(mocker):
     Verify a user succesfully updating a feed
     by clicking and confirming via the update button
     """
-    mocker.patch(
-        "apps.feeds.forms.update_feed_items.delay", side_effect=mock_update_feed
-    )
+    mocker.patch("apps.feeds.forms.refresh_feed", side_effect=mock_update_feed)
 
     # Create some existing feeds and items
     feed = G(Feed, title="fake")
-    item = G(Item, title="item", feed=feed)
+    item = G(Item, entry__title="item", feed=feed)
     before_last_updated_at = feed.last_updated_at
 
     assert feed.items.count() == 1
-    assert feed.items.first().title == "item"
+    assert feed.items.first().entry.title == "item"
 
     # Confirm feed to be updated
     form = UpdateFeedForm(data={"title": feed.title})
@@ -126,5 +150,5 @@ def test_update_feed_form_success(mocker):
     after_last_updated_at = feed.last_updated_at
 
     assert feed.items.count() == 1
-    assert feed.items.first().title == "newitem"
+    assert feed.items.first().entry.title == "newitem"
     assert after_last_updated_at > before_last_updated_at
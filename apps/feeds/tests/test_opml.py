@@ -0,0 +1,229 @@
+import pytest
+import requests
+
+from celery.exceptions import MaxRetriesExceededError
+
+from django import urls
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django_dynamic_fixture import G
+
+from apps.feeds.models import Feed
+from apps.feeds.models import OPMLImport
+from apps.feeds.opml import OPMLError
+from apps.feeds.opml import Outline
+from apps.feeds.opml import iter_opml
+from apps.feeds.opml import parse_opml
+from apps.feeds.tasks import import_feed
+from apps.feeds.tasks import import_opml
+from apps.feeds.tests import sample_rss_xml
+
+OPML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<opml version="1.0">
+  <head><title>Subscriptions</title></head>
+  <body>
+    <outline text="News" title="News">
+      <outline type="rss" text="NU" title="NU" xmlUrl="https://test.com/rss" htmlUrl="https://test.com"/>
+      <outline type="rss" text="NU again" xmlUrl="HTTPS://TEST.com/rss#dup"/>
+    </outline>
+    <outline type="rss" text="Other &amp; more" xmlUrl="https://other.com/rss"/>
+  </body>
+</opml>
+"""
+
+
+def test_parse_opml():
+    """
+    Verify feed outlines are read with their folder
+    """
+    assert parse_opml(OPML) == (
+        [
+            Outline("NU", "https://test.com/rss", "https://test.com", "News"),
+            Outline("NU again", "HTTPS://TEST.com/rss#dup", "", "News"),
+            Outline("Other & more", "https://other.com/rss", "", ""),
+        ],
+        0,
+    )
+
+
+def test_parse_opml_invalid_urls():
+    """
+    Verify outlines without a valid http(s) url are skipped and counted
+    """
+    long_url = "https://test.com/" + "a" * 255
+    content = f"""<opml version="2.0"><body>
+      <outline text="ok" xmlUrl="https://test.com/rss"/>
+      <outline text="file" xmlUrl="file:///etc/passwd"/>
+      <outline text="relative" xmlUrl="/rss"/>
+      <outline text="javascript" xmlUrl="javascript:alert(1)"/>
+      <outline text="empty" xmlUrl=""/>
+      <outline text="long" xmlUrl="{long_url}"/>
+    </body></opml>""".encode()
+
+    assert parse_opml(content) == ([Outline("ok", "https://test.com/rss", "", "")], 5)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"not xml",
+        b"<rss></rss>",
+        b'<!DOCTYPE opml [<!ENTITY a "a">]><opml><body></body></opml>',
+    ],
+)
+def test_parse_opml_invalid(content):
+    """
+    Verify invalid and DTD declaring documents are rejected
+    """
+    with pytest.raises(OPMLError):
+        parse_opml(content)
+
+
+def test_iter_opml():
+    """
+    Verify exported documents can be imported again
+    """
+    outlines = [
+        Outline("Other & more", "https://other.com/rss", "", ""),
+        Outline("NU", "https://test.com/rss", "https://test.com", "News"),
+        Outline("<Tech>", "https://tech.com/rss?a=1&b=2", "", "Tech"),
+    ]
+
+    assert parse_opml("".join(iter_opml(outlines)).encode()) == (outlines, 0)
+
+
+@pytest.mark.django_db
+def test_import_opml(mocker, authenticated_user):
+    """
+    Verify imported feeds are created in bulk, skipping feeds already
+    followed, and validated by a group of tasks
+    """
+    group = mocker.patch("apps.feeds.tasks.group")
+    G(Feed, title="followed", rss_url="https://other.com/rss", subscriber=authenticated_user)
+
+    outlines, _ = parse_opml(OPML)
+    opml_import = import_opml(authenticated_user, outlines, invalid=2)
+
+    assert (opml_import.total, opml_import.duplicates) == (3, 2)
+    # Invalid outlines are counted as failed right away
+    assert (opml_import.processed, opml_import.failed) == (2, 2)
+    feed = authenticated_user.feeds.get(rss_url="https://test.com/rss")
+    assert (feed.title, feed.folder) == ("NU", "News")
+    tasks = list(group.call_args[0][0])
+    assert [task.args for task in tasks] == [(opml_import.pk, feed.pk)]
+    group.return_value.apply_async.assert_called_once_with()
+
+
+@pytest.mark.django_db
+def test_import_feed(requests_mock, authenticated_user):
+    """
+    Verify imported feeds are validated, and invalid ones removed
+    """
+    requests_mock.get("https://test.com/rss", text=sample_rss_xml.FEED)
+    requests_mock.get("https://other.com/rss", status_code=404)
+    opml_import = G(OPMLImport, user=authenticated_user, total=2, processed=0, failed=0)
+    valid = G(Feed, title="NU", link="", rss_url="https://test.com/rss")
+    invalid = G(Feed, title="Other", rss_url="https://other.com/rss")
+
+    assert import_feed(opml_import.pk, valid.pk)
+    assert not import_feed(opml_import.pk, invalid.pk)
+
+    valid.refresh_from_db()
+    assert valid.link == sample_rss_xml.LINK
+    assert valid.items.count() == 2
+    assert not Feed.objects.filter(pk=invalid.pk).exists()
+
+    opml_import.refresh_from_db()
+    assert (opml_import.processed, opml_import.failed) == (2, 1)
+    assert opml_import.finished
+
+
+@pytest.mark.django_db
+def test_import_feed_transient_errors(mocker, requests_mock, authenticated_user):
+    """
+    Verify feeds failing with a server error are kept: fetches are
+    retried, and feeds still failing once retries run out wait for
+    the scheduled updates
+    """
+    retry = mocker.patch(
+        "apps.feeds.tasks.import_feed.retry", side_effect=MaxRetriesExceededError
+    )
+    requests_mock.get("https://test.com/rss", status_code=503)
+    opml_import = G(OPMLImport, user=authenticated_user, total=1, processed=0, failed=0)
+    feed = G(Feed, title="NU", rss_url="https://test.com/rss")
+
+    assert not import_feed(opml_import.pk, feed.pk)
+
+    assert retry.call_count == 1
+    assert Feed.objects.filter(pk=feed.pk).exists()
+    opml_import.refresh_from_db()
+    assert (opml_import.processed, opml_import.failed) == (1, 0)
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        requests.exceptions.MissingSchema,
+        requests.exceptions.InvalidSchema,
+        requests.exceptions.InvalidURL,
+    ],
+)
+@pytest.mark.django_db
+def test_import_feed_invalid_url(mocker, requests_mock, authenticated_user, exc):
+    """
+    Verify feeds with a url requests can't fetch are removed, without retries
+    """
+    retry = mocker.patch("apps.feeds.tasks.import_feed.retry")
+    requests_mock.get("https://test.com/rss", exc=exc)
+    opml_import = G(OPMLImport, user=authenticated_user, total=1, processed=0, failed=0)
+    feed = G(Feed, title="NU", rss_url="https://test.com/rss")
+
+    assert not import_feed(opml_import.pk, feed.pk)
+
+    assert not retry.called
+    assert not Feed.objects.filter(pk=feed.pk).exists()
+    opml_import.refresh_from_db()
+    assert (opml_import.processed, opml_import.failed) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_view_import_opml(mocker, client, authenticated_user):
+    """
+    Verify uploading an OPML file redirects to the import's progress
+    """
+    mocker.patch("apps.feeds.tasks.group")
+    opml = SimpleUploadedFile("feeds.opml", OPML, content_type="text/x-opml")
+
+    resp = client.post(urls.reverse("feeds:import_opml"), {"opml": opml})
+
+    opml_import = authenticated_user.opml_imports.get()
+    assert resp.status_code == 302
+    assert resp.url == opml_import.get_absolute_url()
+
+    resp = client.get(resp.url)
+    assert resp.status_code == 200
+    assert b"0 of 2" in resp.content
+
+
+@pytest.mark.django_db
+def test_view_export_opml(client, authenticated_user):
+    """
+    Verify the user's feeds are exported as a streamed OPML file
+    """
+    G(
+        Feed,
+        title="NU",
+        rss_url="https://test.com/rss",
+        link="",
+        folder="News",
+        subscriber=authenticated_user,
+    )
+    G(Feed, title="Not mine", rss_url="https://other.com/rss")
+
+    resp = client.get(urls.reverse("feeds:export_opml"))
+
+    assert resp.status_code == 200
+    assert resp.streaming
+    assert parse_opml(b"".join(resp.streaming_content)) == (
+        [Outline("NU", "https://test.com/rss", "", "News")],
+        0,
+    )
@@ -1,9 +1,14 @@
+import datetime as dt
+import freezegun
 import pytest
 
 from django_dynamic_fixture import G
 
 from apps.feeds.models import Feed
+from apps.feeds.models import Host
 from apps.feeds.models import Item
+from apps.feeds.models import ReadState
+from apps.feeds.querysets import pick_read_up_to
 
 
 @pytest.mark.django_db
@@ -16,9 +21,9 @@ def test_annotate_unread_items_count_queryset(authenticated_user):
     feed = G(Feed, title="Currentusersfeed1", subscriber=authenticated_user)
 
     # Create item within the feed
-    item1 = G(Item, title="item1", feed=feed)
-    item2 = G(Item, title="item2", feed=feed)
-    item3 = G(Item, title="item3", feed=feed)
+    item1 = G(Item, entry__title="item1", feed=feed)
+    item2 = G(Item, entry__title="item2", feed=feed)
+    item3 = G(Item, entry__title="item3", feed=feed)
 
     # Verify initially all items are unread
     qs = Feed.objects.annotate_unread_items_count(authenticated_user)
@@ -47,8 +52,251 @@ def test_annotate_unread_items_count_queryset(authenticated_user):
     assert qs.values_list("unread", flat=True)[0] == 0
 
     # Add an item
-    item4 = G(Item, title="item4", feed=feed)
+    item4 = G(Item, entry__title="item4", feed=feed)
 
     # Verify the unread items count is 1
     qs = Feed.objects.annotate_unread_items_count(authenticated_user)
     assert qs.values_list("unread", flat=True)[0] == 1
+
+
+@pytest.mark.django_db
+def test_acquire_and_release_refresh():
+    """
+    Verify a feed can only have one refresh in flight
+    """
+    with freezegun.freeze_time("2020-06-20 10:00"):
+        feed = G(Feed, title="test")
+
+        assert Feed.objects.acquire_refresh(feed.pk)
+        assert not Feed.objects.acquire_refresh(feed.pk)
+
+        Feed.objects.release_refresh(feed.pk)
+        assert Feed.objects.acquire_refresh(feed.pk)
+
+    # A lost refresh is taken over after the lock timeout
+    with freezegun.freeze_time("2020-06-20 10:11"):
+        assert Feed.objects.acquire_refresh(feed.pk)
+
+
+@pytest.mark.django_db
+def test_acquire_refresh_min_interval():
+    """
+    Verify a feed isn't refreshed again within the minimum interval
+    """
+    with freezegun.freeze_time("2020-06-20 10:00"):
+        feed = G(Feed, title="test")
+
+    with freezegun.freeze_time("2020-06-20 10:00:30"):
+        assert not Feed.objects.acquire_refresh(feed.pk, min_interval=60)
+
+    with freezegun.freeze_time("2020-06-20 10:01:30"):
+        assert Feed.objects.acquire_refresh(feed.pk, min_interval=60)
+
+
+@pytest.mark.django_db
+def test_acquire_refreshes():
+    """
+    Verify the refreshes of several feeds are acquired at once,
+    skipping the feeds with a refresh in flight
+    """
+    in_flight = G(Feed, title="in_flight")
+    idle = [G(Feed, title=f"idle{i}") for i in range(2)]
+    assert Feed.objects.acquire_refresh(in_flight.pk)
+
+    feeds = Feed.objects.filter(pk__in=[in_flight.pk] + [feed.pk for feed in idle])
+    assert sorted(feeds.acquire_refreshes()) == [feed.pk for feed in idle]
+    assert feeds.acquire_refreshes() == []
+
+
+@pytest.mark.django_db
+def test_feed_breaker(settings):
+    """
+    Verify consecutive failures open a feed's breaker with exponentially
+    spaced probes, quarantine the feed, and a success closes it
+    """
+    settings.FEED_BREAKER_THRESHOLD = 2
+    settings.FEED_BREAKER_BASE_DELAY = 60
+    settings.FEED_BREAKER_MAX_DELAY = 240
+    settings.FEED_QUARANTINE_DAYS = 1
+    feed = G(Feed, title="test")
+    feeds = Feed.objects.filter(pk=feed.pk)
+
+    with freezegun.freeze_time("2020-06-20 10:00"):
+        # Below the threshold the feed is still updated as usual
+        feeds.record_failure()
+        assert feeds.due_for_update().exists()
+
+        expected_delays = [60, 120, 240, 240]
+        for delay in expected_delays:
+            feeds.record_failure()
+            feed.refresh_from_db()
+            assert feed.status == Feed.FAILING
+            assert feed.next_attempt_at == dt.datetime(2020, 6, 20, 10) + dt.timedelta(
+                seconds=delay
+            )
+            assert not feeds.due_for_update().exists()
+
+    with freezegun.freeze_time("2020-06-20 10:04"):
+        assert feeds.due_for_update().exists()
+
+    with freezegun.freeze_time("2020-06-21 10:00"):
+        assert feeds.record_failure() == [feed.pk]
+        assert feeds.record_failure() == []
+        feed.refresh_from_db()
+        assert feed.status == Feed.QUARANTINED
+        assert not feeds.due_for_update().exists()
+
+    feeds.record_success()
+    feed.refresh_from_db()
+    assert feed.status == Feed.ACTIVE
+    assert feed.consecutive_failures == 0
+    assert feed.first_failed_at is None
+    assert feeds.due_for_update().exists()
+
+
+@pytest.mark.django_db
+def test_record_failure_set_based(settings, django_assert_num_queries):
+    """
+    Verify failures of several feeds are recorded with a single update
+    """
+    settings.FEED_BREAKER_THRESHOLD = 1
+    settings.FEED_BREAKER_BASE_DELAY = 60
+    feeds = [G(Feed, title=f"feed{i}") for i in range(3)]
+    Feed.objects.filter(pk=feeds[0].pk).update(consecutive_failures=1)
+
+    with freezegun.freeze_time("2020-06-20 10:00"):
+        with django_assert_num_queries(2):
+            Feed.objects.filter(pk__in=[feed.pk for feed in feeds]).record_failure()
+
+    for feed in feeds:
+        feed.refresh_from_db()
+        assert feed.status == Feed.FAILING
+        assert feed.first_failed_at == dt.datetime(2020, 6, 20, 10)
+    assert [feed.consecutive_failures for feed in feeds] == [2, 1, 1]
+    assert feeds[0].next_attempt_at == dt.datetime(2020, 6, 20, 10, 2)
+    assert feeds[1].next_attempt_at == dt.datetime(2020, 6, 20, 10, 1)
+
+
+@pytest.mark.django_db
+def test_host_breaker(settings):
+    """
+    Verify consecutive failed fetches from a host open its breaker
+    """
+    settings.HOST_BREAKER_THRESHOLD = 2
+
+    with freezegun.freeze_time("2020-06-20 10:00"):
+        Host.objects.record_failure("test.com")
+        assert list(Host.objects.open_breakers()) == []
+
+        Host.objects.record_failure("test.com")
+        assert list(Host.objects.open_breakers()) == ["test.com"]
+
+    with freezegun.freeze_time("2020-06-20 10:31"):
+        assert list(Host.objects.open_breakers()) == []
+
+    Host.objects.record_success("test.com")
+    assert Host.objects.get(name="test.com").consecutive_failures == 0
+
+
+@pytest.mark.django_db
+def test_item_list_columns(authenticated_user):
+    """
+    Verify item lists don't load the entries' full content
+    """
+    feed = G(Feed, subscriber=authenticated_user)
+    G(Item, entry__title="item", entry__description="long", feed=feed, subscriber=authenticated_user)
+
+    item = Item.objects.river(authenticated_user).get()
+
+    assert {"description", "summary"} <= item.entry.get_deferred_fields()
+    assert "description" in item.feed.get_deferred_fields()
+    assert item.entry.title == "item"
+
+
+@pytest.mark.django_db
+def test_read_state(authenticated_user):
+    """
+    Verify reads in order only advance the feed's read_up_to,
+    and out of order reads are kept as exceptions
+    """
+    feed = G(Feed, subscriber=authenticated_user)
+    items = [G(Item, feed=feed, subscriber=authenticated_user) for _ in range(5)]
+    ids = [item.pk for item in items]
+
+    ReadState.objects.mark_read(feed.pk, [ids[0], ids[3]])
+    state = ReadState.objects.get(feed=feed)
+    assert (state.read_up_to, state.read_ids, state.unread_ids) == (ids[0], [ids[3]], [])
+
+    ReadState.objects.mark_read(feed.pk, [ids[1], ids[2]])
+    state.refresh_from_db()
+    assert (state.read_up_to, state.read_ids, state.unread_ids) == (ids[3], [], [])
+
+    ReadState.objects.mark_unread(feed.pk, [ids[1], ids[4]])
+    state.refresh_from_db()
+    assert (state.read_up_to, state.read_ids, state.unread_ids) == (ids[3], [], [ids[1]])
+
+    unread = Item.objects.annotate_unread(authenticated_user).filter(unread=True)
+    assert sorted(unread.values_list("id", flat=True)) == [ids[1], ids[4]]
+    assert Feed.objects.annotate_unread_items_count(authenticated_user).get().unread == 2
+
+    ReadState.objects.mark_all_read(feed.pk)
+    state.refresh_from_db()
+    assert (state.read_up_to, state.read_ids, state.unread_ids) == (ids[4], [], [])
+    assert not Item.objects.annotate_unread(authenticated_user).filter(unread=True)
+
+
+@pytest.mark.django_db
+def test_read_state_compaction(authenticated_user, settings):
+    """
+    Verify read states keep at most READ_STATE_MAX_EXCEPTIONS exceptions,
+    and only the exceptions of the feeds queried are inlined
+    """
+    settings.READ_STATE_MAX_EXCEPTIONS = 2
+    feed = G(Feed, subscriber=authenticated_user)
+    other = G(Feed, subscriber=authenticated_user)
+    ids = [G(Item, feed=feed, subscriber=authenticated_user).pk for _ in range(8)]
+    other_ids = [G(Item, feed=other, subscriber=authenticated_user).pk for _ in range(2)]
+
+    # Reading the newest items first moves read_up_to past the older
+    # unread items, the oldest of which is then taken as read
+    ReadState.objects.mark_read(feed.pk, ids[3:])
+    state = ReadState.objects.get(feed=feed)
+    assert (state.read_up_to, state.read_ids, state.unread_ids) == (ids[7], [], ids[1:3])
+    unread = Item.objects.annotate_unread(authenticated_user).filter(unread=True, feed=feed)
+    assert sorted(unread.values_list("id", flat=True)) == ids[1:3]
+
+    ReadState.objects.mark_read(other.pk, other_ids[1:])
+    read_ids, unread_ids = ReadState.objects.filter(feed=other).exceptions()
+    assert (read_ids, unread_ids) == ({other_ids[1]}, set())
+
+
+@pytest.mark.django_db
+def test_item_unread_select_related(authenticated_user, django_assert_num_queries):
+    """
+    Verify items read their unread state from the feed's read state
+    loaded along with them
+    """
+    feed = G(Feed, subscriber=authenticated_user)
+    items = [G(Item, feed=feed, subscriber=authenticated_user) for _ in range(3)]
+    ReadState.objects.mark_read(feed.pk, [items[1].pk])
+
+    with django_assert_num_queries(1):
+        unread = [
+            item.unread
+            for item in Item.objects.select_related("feed__read_state").order_by("id")
+        ]
+    assert unread == [True, False, True]
+
+
+def test_pick_read_up_to():
+    """
+    Verify read states are picked with the fewest exceptions
+    """
+    assert pick_read_up_to([]) == (0, [], [])
+    assert pick_read_up_to([(1, True), (2, True)]) == (0, [], [])
+    assert pick_read_up_to([(1, False), (2, True), (3, False), (4, False), (5, True)]) == (
+        4,
+        [],
+        [2],
+    )
+    assert pick_read_up_to([(1, True), (2, False), (3, True), (4, True)]) == (0, [2], [])
@@ -0,0 +1,66 @@
+import os
+import time
+
+import pytest
+
+from apps.feeds.encoding import encode_feed
+from apps.feeds.spool import SpoolError
+from apps.feeds.spool import clean_spool
+from apps.feeds.spool import read_spooled
+from apps.feeds.spool import spool_body
+
+
+@pytest.fixture
+def spool_dir(settings, tmp_path):
+    settings.FEED_SPOOL_DIR = str(tmp_path)
+    settings.FEED_SPOOL_MIN_SIZE = 10
+    return tmp_path
+
+
+def test_spool_body(spool_dir):
+    """
+    Verify bodies of at least FEED_SPOOL_MIN_SIZE chars are spooled,
+    encoded for the parser
+    """
+    text = '<?xml version="1.0" encoding="iso-8859-1"?><rss>café</rss>'
+
+    assert spool_body("<rss/>") == "<rss/>"
+
+    body = spool_body(text)
+    assert (spool_dir / body["spooled"]).read_bytes() == encode_feed(text)
+    assert read_spooled(body) == encode_feed(text)
+    assert not list(spool_dir.iterdir())
+    assert read_spooled("<rss/>") == "<rss/>"
+
+
+def test_spool_disabled(settings):
+    """
+    Verify bodies aren't spooled without a spool directory
+    """
+    settings.FEED_SPOOL_DIR = ""
+    settings.FEED_SPOOL_MIN_SIZE = 0
+
+    assert spool_body("<rss/>") == "<rss/>"
+
+
+@pytest.mark.parametrize("body", [{}, {"spooled": "../secret"}, {"spooled": "missing"}])
+def test_read_spooled_invalid(spool_dir, body):
+    """
+    Verify only existing files of the spool directory are read
+    """
+    with pytest.raises(SpoolError):
+        read_spooled(body)
+
+
+def test_clean_spool(spool_dir):
+    """
+    Verify only spool files older than max_age are removed
+    """
+    old, new = spool_dir / "old.xml", spool_dir / "new.xml"
+    old.write_bytes(b"<rss/>")
+    new.write_bytes(b"<rss/>")
+    expired = time.time() - 120
+    os.utime(old, (expired, expired))
+
+    assert clean_spool(60) == 1
+    assert [path.name for path in spool_dir.iterdir()] == ["new.xml"]
@@ -1,4 +1,6 @@
+import datetime as dt
 import feedparser
+import json
 import pytest
 import requests
 from time import sleep
@@ -7,15 +9,24 @@ from celery.exceptions import MaxRetriesExceededError
 
 from django_dynamic_fixture import G
 
+from apps.feeds.feed_parser import ParsedEntry
+from apps.feeds.models import Entry
 from apps.feeds.models import Feed
+from apps.feeds.models import Host
 from apps.feeds.models import Item
+from apps.feeds.tasks import clean_feed_spool
 from apps.feeds.tasks import get_feed
 from apps.feeds.tasks import notify_subscriber
 from apps.feeds.tasks import parse_feed
+from apps.feeds.tasks import refresh_feed
 from apps.feeds.tasks import update_feed
+from apps.feeds.tasks import update_feeds
 from apps.feeds.tasks import update_all_feeds
 from apps.feeds.tasks import update_feed_items
+from apps.feeds.tasks import wait_for_parse_backlog
+from apps.feeds.tests import sample_rss_xml
 from apps.notifications.models import Notification
+from rss_scraper.celery import app as celery_app
 
 
 @pytest.mark.django_db(transaction=True)
@@ -69,8 +80,8 @@ def test_update_all_feeds_success(
     # Create a test feeds and related item
     feed_zero_items = G(Feed, title="test", rss_url=rss_url)
     feed_two_items = G(Feed, title="test", rss_url=rss_url)
-    G(Item, title="test0", feed=feed_two_items, bookmark=True)
-    G(Item, title="test1", feed=feed_two_items)
+    G(Item, entry__title="test0", feed=feed_two_items, bookmark=True)
+    G(Item, entry__title="test1", feed=feed_two_items)
 
     # Verify feeds initial items
     assert feed_zero_items.items.count() == 0
@@ -127,7 +138,7 @@ def test_update_feed_fail():
     """
     # Create a fake feed with an item
     feed = G(Feed, title="fake")
-    item = G(Item, title="test", feed=feed)
+    item = G(Item, entry__title="test", feed=feed)
     before_last_updated_at = feed.last_updated_at
 
     # Verify feed items are not updated
@@ -153,3 +164,321 @@ def test_notify_user(authenticated_user):
 
     assert feed.title in notification.title
     assert feed.get_update_url() == notification.details
+
+    # Repeated failures are coalesced into the unread notification
+    notify_subscriber(feed.pk)
+    assert authenticated_user.notifications.count() == 1
+    assert authenticated_user.notifications.first().occurrences == 2
+
+
+@pytest.mark.parametrize(
+    "task, queue",
+    [
+        (update_all_feeds, "default"),
+        (update_feed_items, "default"),
+        (get_feed, "fetch"),
+        (parse_feed, "parse"),
+        (clean_feed_spool, "parse"),
+        (update_feed, "store"),
+        (update_feeds, "store"),
+    ],
+)
+def test_task_routes(task, queue):
+    """
+    Verify feed update stages are routed to their own queues
+    """
+    route = celery_app.amqp.router.route({}, task.name)
+    assert route["queue"].name == queue
+
+
+@pytest.mark.django_db
+def test_refresh_feed_priority(mocker, settings):
+    """
+    Verify user-initiated refreshes are queued ahead of scheduled updates
+    """
+    apply_async = mocker.patch("apps.feeds.tasks.update_feed_items.apply_async")
+    feed = G(Feed, title="test")
+    Feed.objects.filter(pk=feed.pk).update(last_updated_at=dt.datetime(2020, 1, 1))
+
+    assert refresh_feed(feed.pk)
+
+    apply_async.assert_called_once_with(
+        (feed.pk, settings.FEED_REFRESH_PRIORITY),
+        priority=settings.FEED_REFRESH_PRIORITY,
+    )
+    assert settings.FEED_REFRESH_PRIORITY > settings.FEED_POLL_PRIORITY
+
+
+@pytest.mark.django_db
+def test_refresh_feed_single_flight(mocker):
+    """
+    Verify repeated refreshes of a feed are dropped while
+    a refresh is in flight and within the minimum interval
+    """
+    apply_async = mocker.patch("apps.feeds.tasks.update_feed_items.apply_async")
+    feed = G(Feed, title="test")
+    Feed.objects.filter(pk=feed.pk).update(last_updated_at=dt.datetime(2020, 1, 1))
+
+    # Only the first of repeated clicks starts a refresh
+    assert refresh_feed(feed.pk)
+    assert not refresh_feed(feed.pk)
+    assert apply_async.call_count == 1
+
+    # Storing the items ends the refresh, but the feed
+    # was just updated
+    update_feed([ParsedEntry(title="new")], feed.pk)
+    assert not refresh_feed(feed.pk)
+    assert apply_async.call_count == 1
+
+
+@pytest.mark.django_db
+def test_update_all_feeds_skips_in_flight(mocker):
+    """
+    Verify scheduled updates skip feeds with a refresh in flight
+    """
+    delay = mocker.patch("apps.feeds.tasks.update_feed_items.delay")
+    in_flight = G(Feed, title="in_flight")
+    idle = G(Feed, title="idle")
+    assert Feed.objects.acquire_refresh(in_flight.pk)
+
+    update_all_feeds()
+
+    delay.assert_called_once_with(idle.pk, feed_ids=[idle.pk])
+
+
+@pytest.mark.django_db
+def test_update_all_feeds_fetches_url_once(mocker):
+    """
+    Verify feeds sharing a url are updated from a single fetch
+    """
+    delay = mocker.patch("apps.feeds.tasks.update_feed_items.delay")
+    feed1 = G(Feed, title="feed1", rss_url="https://test.com/rss")
+    feed2 = G(Feed, title="feed2", rss_url="HTTPS://Test.com:443/rss?utm_source=x")
+    other = G(Feed, title="other", rss_url="https://other.com/rss")
+
+    update_all_feeds()
+
+    assert delay.call_count == 2
+    delay.assert_any_call(feed1.pk, feed_ids=[feed1.pk, feed2.pk])
+    delay.assert_any_call(other.pk, feed_ids=[other.pk])
+
+
+@pytest.mark.django_db
+def test_update_feed_items_shared_fetch(requests_mock):
+    """
+    Verify one fetch updates every feed sharing the url
+    and follows the feed's permanent redirect. Parsed entries
+    are stored as passed between tasks, serialized to JSON
+    """
+    old_url = "http://test.com/rss"
+    new_url = "https://test.com/rss"
+    requests_mock.get(old_url, status_code=301, headers={"Location": new_url})
+    requests_mock.get(new_url, text=sample_rss_xml.FEED)
+    feeds = [G(Feed, title=f"feed{i}", rss_url=old_url) for i in range(2)]
+
+    feed_ids = [feed.pk for feed in feeds]
+    parsed_items = json.loads(json.dumps(parse_feed(get_feed(feeds[0].pk, feed_ids))))
+    update_feeds(parsed_items, feed_ids)
+
+    assert requests_mock.call_count == 2
+    for feed in feeds:
+        feed.refresh_from_db()
+        assert feed.rss_url == new_url
+        assert feed.items.count() == 2
+        assert feed.refresh_started_at is None
+    # Entries are stored once for all the feeds
+    assert Entry.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_update_feeds_keeps_item_state():
+    """
+    Verify updates keep the state of items still in the feed,
+    delete the others unless bookmarked, and delete entries
+    no item refers to anymore
+    """
+    feed = G(Feed, title="test", rss_url="https://test.com/rss")
+    parsed_items = [
+        ParsedEntry(title="kept", link="https://test.com/kept"),
+        ParsedEntry(title="dropped", link="https://test.com/dropped"),
+        ParsedEntry(title="bookmarked", link="https://test.com/bookmarked"),
+    ]
+    update_feeds(parsed_items, [feed.pk])
+    feed.items.get(entry__title="kept").mark_as_read()
+    feed.items.filter(entry__title="bookmarked").update(bookmark=True)
+
+    update_feeds(
+        [
+            ParsedEntry(title="kept (edited)", link="https://test.com/kept"),
+            ParsedEntry(title="new"),
+        ],
+        [feed.pk],
+    )
+
+    items = Item.objects.filter(feed=feed).select_related("entry", "feed__read_state")
+    items = {item.entry.title: item for item in items}
+    assert set(items) == {"kept (edited)", "bookmarked", "new"}
+    assert not items["kept (edited)"].unread
+    assert items["new"].unread
+    assert not Entry.objects.filter(title="dropped").exists()
+
+
+@pytest.mark.django_db
+def test_update_all_feeds_skips_open_breakers(mocker):
+    """
+    Verify scheduled updates skip quarantined feeds, feeds
+    waiting for their next probe and hosts with an open breaker
+    """
+    delay = mocker.patch("apps.feeds.tasks.update_feed_items.delay")
+    G(Feed, title="quarantined", status=Feed.QUARANTINED)
+    G(
+        Feed,
+        title="failing",
+        status=Feed.FAILING,
+        next_attempt_at=dt.datetime.utcnow() + dt.timedelta(hours=1),
+    )
+    G(Feed, title="down", rss_url="https://down.com/rss")
+    G(Host, name="down.com", next_attempt_at=dt.datetime.utcnow() + dt.timedelta(hours=1))
+    active = G(Feed, title="active", rss_url="https://test.com/rss")
+
+    update_all_feeds()
+
+    delay.assert_called_once_with(active.pk, feed_ids=[active.pk])
+
+
+@pytest.mark.django_db
+def test_get_feed_failing_not_retried(mocker, requests_mock, authenticated_user):
+    """
+    Verify a feed with an open breaker is probed once, without retries,
+    and error responses count as failures
+    """
+    retry = mocker.patch("apps.feeds.tasks.get_feed.retry")
+    rss_url = "https://test.com/rss"
+    requests_mock.get(rss_url, status_code=503, text="unavailable")
+    feed = G(
+        Feed,
+        title="test",
+        rss_url=rss_url,
+        subscriber=authenticated_user,
+        status=Feed.FAILING,
+        consecutive_failures=5,
+    )
+
+    assert get_feed(feed.pk) == ""
+
+    assert not retry.called
+    feed.refresh_from_db()
+    assert feed.consecutive_failures == 6
+    assert Host.objects.get(name="test.com").consecutive_failures == 1
+    assert authenticated_user.notifications.count() == 1
+
+    # A successful fetch closes the breakers
+    requests_mock.get(rss_url, text=sample_rss_xml.FEED)
+    assert get_feed(feed.pk) == sample_rss_xml.FEED
+
+    feed.refresh_from_db()
+    assert feed.status == Feed.ACTIVE
+    assert feed.consecutive_failures == 0
+    assert Host.objects.get(name="test.com").consecutive_failures == 0
+
+
+@pytest.mark.parametrize("status_code", [404, 410])
+@pytest.mark.django_db
+def test_get_feed_rejected(mocker, requests_mock, settings, status_code):
+    """
+    Verify feeds rejected by their server fail without retries,
+    and don't count against their host
+    """
+    retry = mocker.patch("apps.feeds.tasks.get_feed.retry")
+    rss_url = "https://test.com/rss"
+    requests_mock.get(rss_url, status_code=status_code, text="gone")
+    feed = G(Feed, title="test", rss_url=rss_url)
+
+    for _ in range(settings.HOST_BREAKER_THRESHOLD):
+        assert get_feed(feed.pk) == ""
+
+    assert not retry.called
+    feed.refresh_from_db()
+    assert feed.consecutive_failures == settings.HOST_BREAKER_THRESHOLD
+    assert not Host.objects.filter(name="test.com").exists()
+
+
+@pytest.mark.django_db
+def test_get_feed_host_failure(mocker, requests_mock):
+    """
+    Verify connection errors are retried and count against the host
+    """
+    retry = mocker.patch(
+        "apps.feeds.tasks.get_feed.retry", side_effect=MaxRetriesExceededError()
+    )
+    rss_url = "https://test.com/rss"
+    requests_mock.get(rss_url, exc=requests.exceptions.ConnectTimeout("timeout"))
+    feed = G(Feed, title="test", rss_url=rss_url)
+
+    assert get_feed(feed.pk) == ""
+
+    assert retry.called
+    assert Host.objects.get(name="test.com").consecutive_failures == 1
+
+
+@pytest.mark.django_db
+def test_update_feeds_excerpt(settings):
+    """
+    Verify entries are stored with a plain text excerpt
+    and the length of their content
+    """
+    settings.ENTRY_EXCERPT_LENGTH = 12
+    feed = G(Feed, title="test", rss_url="https://test.com/rss")
+    description = "<p>Hello &amp; <b>welcome</b>\n to the feed</p>"
+
+    update_feeds([ParsedEntry(title="new", description=description)], [feed.pk])
+
+    entry = feed.items.get().entry
+    assert entry.excerpt == "Hello & wel…"
+    assert entry.content_length == len(description)
+
+
+@pytest.mark.django_db
+def test_get_feed_spooled(settings, tmp_path, requests_mock):
+    """
+    Verify large bodies are handed over to the parse stage
+    through spool files, removed once parsed
+    """
+    settings.FEED_SPOOL_DIR = str(tmp_path)
+    settings.FEED_SPOOL_MIN_SIZE = 100
+    feed = G(Feed, rss_url="https://test.com/rss")
+    requests_mock.get(feed.rss_url, text=sample_rss_xml.FEED)
+
+    body = get_feed(feed.pk)
+
+    assert list(body) == ["spooled"]
+    assert [path.name for path in tmp_path.iterdir()] == [body["spooled"]]
+    assert len(parse_feed(json.loads(json.dumps(body)))) == 2
+    assert not list(tmp_path.iterdir())
+    # A body can only be parsed once
+    assert parse_feed(body) == []
+
+
+def test_wait_for_parse_backlog(mocker, settings):
+    """
+    Verify fetches wait for the parse backlog to drain,
+    for at most FEED_PARSE_MAX_WAIT secs
+    """
+    settings.FEED_PARSE_MAX_BACKLOG = 10
+    settings.FEED_PARSE_MAX_WAIT = 60
+    sleep = mocker.patch("apps.feeds.tasks.time.sleep")
+    backlog = mocker.patch("apps.feeds.tasks.get_parse_backlog", side_effect=[20, 11, 10])
+
+    assert wait_for_parse_backlog()
+    assert sleep.call_count == 2
+
+    backlog.side_effect = None
+    backlog.return_value = 20
+    mocker.patch("apps.feeds.tasks.time.monotonic", side_effect=[0, 30, 61])
+
+    assert not wait_for_parse_backlog()
+
+    settings.FEED_PARSE_MAX_BACKLOG = 0
+    backlog.reset_mock()
+    assert wait_for_parse_backlog()
+    assert not backlog.called
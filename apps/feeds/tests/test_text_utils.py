@@ -0,0 +1,27 @@
+import pytest
+
+from apps.feeds.text_utils import html_to_text
+from apps.feeds.text_utils import make_excerpt
+
+
+@pytest.mark.parametrize(
+    "content, expected_output",
+    [
+        (None, ""),
+        ("plain", "plain"),
+        ("<p>a <i>b</i></p>\n\n<p>c&nbsp;&lt;d&gt;</p>", "a b c <d>"),
+    ],
+)
+def test_html_to_text(content, expected_output):
+    """
+    Test getting the plain text of HTML fragments
+    """
+    assert html_to_text(content) == expected_output
+
+
+def test_make_excerpt():
+    """
+    Test excerpts are truncated to the maximum length, ellipsis included
+    """
+    assert make_excerpt("<p>short</p>", 10) == "short"
+    assert make_excerpt("<p>a longer text</p>", 10) == "a longer …"
@@ -0,0 +1,32 @@
+import pytest
+
+from apps.feeds.url_utils import normalize_url
+
+
+@pytest.mark.parametrize(
+    "url, expected_url",
+    [
+        ("https://test.com/rss", "https://test.com/rss"),
+        ("HTTPS://Test.COM/Rss", "https://test.com/Rss"),
+        ("https://test.com", "https://test.com/"),
+        ("http://test.com:80/rss", "http://test.com/rss"),
+        ("https://test.com:443/rss", "https://test.com/rss"),
+        ("https://test.com:8443/rss", "https://test.com:8443/rss"),
+        ("https://test.com/rss#latest", "https://test.com/rss"),
+        (
+            "https://test.com/rss?utm_source=x&format=atom&fbclid=1&UTM_Medium=y",
+            "https://test.com/rss?format=atom",
+        ),
+        ("https://user:pw@Test.com/rss", "https://user:pw@test.com/rss"),
+        # Queries without tracking params are kept as spelled
+        ("https://test.com/?rss", "https://test.com/?rss"),
+        ("https://test.com/feed?q=a%20b&t=x+y", "https://test.com/feed?q=a%20b&t=x+y"),
+        ("https://test.com/feed?a=1;b=2&c=%2F", "https://test.com/feed?a=1;b=2&c=%2F"),
+        ("https://test.com/?rss&utm_source=x", "https://test.com/?rss"),
+    ],
+)
+def test_normalize_url(url, expected_url):
+    """
+    Verify spellings of the same feed url normalize to one url
+    """
+    assert normalize_url(url) == expected_url
@@ -30,7 +30,7 @@ def test_item(test_feed):
     Create a feed with items and authenticated_user
     as subscriber
     """
-    item = G(Item, title="test_item", description="testing views here", feed=test_feed)
+    item = G(Item, entry__title="test_item", entry__description="testing views here", feed=test_feed)
     return item
 
 
@@ -38,6 +38,7 @@ def test_item(test_feed):
     "url_name, url_kwargs",
     [
         ("feeds:myfeeds", None),
+        ("feeds:river", None),
         ("feeds:follow", None),
         ("feeds:bookmarks", None),
         ("feeds:feed_detail", {"pk": 1}),
@@ -99,7 +100,7 @@ def test_view_myfeeds_unread_items_count_update(client, test_feed, test_item):
     """
     # Create another item in users' feed to
     # properly verify unread items count update
-    item = G(Item, title="newitem", feed=test_feed)
+    item = G(Item, entry__title="newitem", feed=test_feed)
 
     # Render the myfeeds page for authenticated user
     myfeeds_url = urls.reverse("feeds:myfeeds")
@@ -146,6 +147,73 @@ def test_view_myfeeds_unread_items_count_update(client, test_feed, test_item):
     assert int(rendered_feed_unread_count) == 1
 
 
+@pytest.mark.django_db
+def test_view_mark_feed_read(client, test_feed, test_item):
+    """
+    Verify all of a feed's items are marked read at once
+    """
+    G(Item, entry__title="newitem", feed=test_feed)
+
+    resp = client.post(test_feed.get_mark_read_url())
+
+    assert resp.status_code == 302
+    assert resp.url == test_feed.get_absolute_url()
+    assert Feed.objects.annotate_unread_items_count(test_feed.subscriber).get().unread == 0
+    assert not any(item.unread for item in test_feed.items.all())
+
+
+@pytest.mark.django_db
+def test_view_river(client, authenticated_user, settings):
+    """
+    Verify the river pages through the items of all the user's feeds,
+    newest first, with unread and folder filters
+    """
+    settings.RIVER_PAGE_SIZE = 2
+    news = G(Feed, title="news", folder="News", subscriber=authenticated_user)
+    blog = G(Feed, title="blog", folder="", subscriber=authenticated_user)
+    published_at = dt.datetime(2020, 7, 1)
+    for i in range(4):
+        for feed in [news, blog]:
+            G(
+                Item,
+                entry__title=f"{feed.title}{i}",
+                feed=feed,
+                subscriber=authenticated_user,
+                published_at=published_at - dt.timedelta(hours=i),
+            )
+    for item in Item.objects.filter(entry__title__in=["news1", "news3", "blog1", "blog3"]):
+        item.mark_as_read()
+    G(Item, entry__title="undated", feed=blog, subscriber=authenticated_user, published_at=None)
+    G(Item, entry__title="not mine", published_at=published_at)
+
+    def rendered_items(resp):
+        soup = BeautifulSoup(resp.content, "html.parser")
+        return [a.get_text().strip() for a in soup.select('a[href*="/feeds/item"]')]
+
+    river_url = urls.reverse("feeds:river")
+    titles = []
+    pages = 0
+    url = river_url
+    while url:
+        resp = client.get(url)
+        assert resp.status_code == 200
+        titles.extend(rendered_items(resp))
+        cursor = resp.context["next_cursor"]
+        url = f"{river_url}?cursor={cursor}" if cursor else None
+        pages += 1
+
+    assert pages == 5
+    assert len(titles) == 9
+    assert set(titles[:2]) == {"news0", "blog0"}
+    assert titles[-1] == "undated"
+
+    resp = client.get(river_url, {"unread": "1", "folder": "News"})
+    assert rendered_items(resp) == ["news0", "news2"]
+
+    resp = client.get(river_url, {"cursor": "foo"})
+    assert resp.status_code == 404
+
+
 @pytest.mark.django_db
 def test_view_bookmarks(client, test_feed, test_item):
     """
@@ -156,11 +224,11 @@ def test_view_bookmarks(client, test_feed, test_item):
     test_item.save()
 
     # Create another item for authenticated user, but don't bookmark
-    my_unbookmarked_item = G(Item, title="unbookmarked", feed=test_feed)
+    my_unbookmarked_item = G(Item, entry__title="unbookmarked", feed=test_feed)
 
     # Create another bookmarked item, not belonging
     # to current user
-    not_my_bookmarked_item = G(Item, title="notmybookmarked")
+    not_my_bookmarked_item = G(Item, entry__title="notmybookmarked")
 
     # Render the myfeeds page
     bookmarks_url = urls.reverse("feeds:bookmarks")
@@ -172,9 +240,9 @@ def test_view_bookmarks(client, test_feed, test_item):
     soup = BeautifulSoup(resp.content, "html.parser")
     rendered_items = soup.select('a[href*="/feeds/item"]')[0].get_text().strip()
 
-    assert rendered_items == test_item.title
-    assert my_unbookmarked_item.title not in soup
-    assert not_my_bookmarked_item.title not in soup
+    assert rendered_items == test_item.entry.title
+    assert my_unbookmarked_item.entry.title not in soup
+    assert not_my_bookmarked_item.entry.title not in soup
 
 
 @pytest.mark.django_db
@@ -224,11 +292,11 @@ def test_view_follow_feed_success(mocker, authenticated_user, client, requests_m
     assert feed.last_updated_at == dt.datetime(2020, 6, 20, 10)
     assert feed.items.count() == 2
     assert total_items_after == total_items_before + feed.items.count()
-    assert list(feed.items.values_list("title", flat=True)) == [
+    assert list(feed.items.values_list("entry__title", flat=True)) == [
         sample_rss_xml.ITEM1_TITLE,
         sample_rss_xml.ITEM2_TITLE,
     ]
-    assert list(feed.items.values_list("unread", flat=True)) == [True, True]
+    assert [item.unread for item in feed.items.all()] == [True, True]
     assert list(feed.items.values_list("bookmark", flat=True)) == [False, False]
     assert list(feed.items.values_list("comments", flat=True)) == [None, None]
 
@@ -239,9 +307,7 @@ def test_view_update_feed_success(mocker, client, requests_mock, test_feed):
     Test manually updating a feed form the update confirmation
     page by clicking Confirm Feed Update button
     """
-    mocker.patch(
-        "apps.feeds.forms.update_feed_items.delay", side_effect=mock_update_feed
-    )
+    mocker.patch("apps.feeds.forms.refresh_feed", side_effect=mock_update_feed)
 
     before_last_updated_at = test_feed.last_updated_at
     update_url = test_feed.get_update_url()
@@ -256,14 +322,14 @@ def test_view_update_feed_success(mocker, client, requests_mock, test_feed):
     assert resp.status_code == 302
     assert resp.url == urls.reverse("feeds:myfeeds")
     assert test_feed.items.count() == 1
-    assert test_feed.items.first().title == "newitem"
+    assert test_feed.items.first().entry.title == "newitem"
     assert after_last_updated_at > before_last_updated_at
 
 
 def mock_update_feed(feed_id):
     feed = Feed.objects.get(pk=feed_id)
     feed.items.all().delete()
-    G(Item, title="newitem", feed=feed)
+    G(Item, entry__title="newitem", feed=feed)
     feed.last_updated_at = dt.datetime.utcnow()
     feed.save()
 
@@ -292,7 +358,7 @@ def test_view_feed_detail(client, test_feed, test_item):
 
     assert test_feed.title == rendered_feed_title
     assert rendered_unread_notifications_count == 1
-    assert list(test_feed.items.values_list("title", flat=True)) == rendered_items
+    assert list(test_feed.items.values_list("entry__title", flat=True)) == rendered_items
 
 
 @pytest.mark.django_db
@@ -318,11 +384,52 @@ def test_view_item_detail(client, test_feed, test_item):
     rendered_item_title = soup.select("p")[1].get_text().strip()
     rendered_item_description = soup.select("p")[2].get_text().strip()
 
-    assert rendered_item_title == test_item.title
-    assert rendered_item_description == test_item.description
+    assert rendered_item_title == test_item.entry.title
+    assert rendered_item_description == test_item.entry.description
     assert rendered_comments == item_comments
 
 
+@pytest.mark.django_db
+def test_view_conditional_get(client, test_feed, test_item):
+    """
+    Verify reader pages are answered with a 304 until the feed
+    is updated or the user changes its items
+    """
+    feed_detail_url = test_feed.get_absolute_url()
+    item_detail_url = test_item.get_absolute_url()
+    bookmarks_url = urls.reverse("feeds:bookmarks")
+
+    # Reading the item changes its page and its feed's unread count
+    client.get(item_detail_url)
+
+    for url in [feed_detail_url, item_detail_url, bookmarks_url]:
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert "private" in resp["Cache-Control"]
+
+        etag = resp["ETag"]
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert (
+            client.get(url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"]).status_code
+            == 304
+        )
+
+    # Bookmarking the item changes all the pages
+    etags = [client.get(url)["ETag"] for url in [feed_detail_url, bookmarks_url]]
+    client.post(item_detail_url, {"bookmark": True})
+
+    for url, etag in zip([feed_detail_url, bookmarks_url], etags):
+        resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 200
+
+    # So do updates of the feed
+    etag = client.get(feed_detail_url)["ETag"]
+    with freezegun.freeze_time(dt.datetime.utcnow() + dt.timedelta(minutes=1)):
+        test_feed.save()
+
+    assert client.get(feed_detail_url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
 @pytest.mark.django_db
 def test_view_item_detail_update_success(client, test_feed, test_item):
     """
@@ -0,0 +1,262 @@
+import datetime as dt
+import hashlib
+import hmac
+from urllib.parse import parse_qs
+
+import freezegun
+import pytest
+
+from django import urls
+from django_dynamic_fixture import G
+
+from apps.feeds.feed_parser import ParsedEntry
+from apps.feeds.feed_parser import get_hub
+from apps.feeds.feed_parser import parse
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+from apps.feeds.models import WebSubSubscription
+from apps.feeds.tasks import update_all_feeds
+from apps.feeds.tasks import update_feeds
+from apps.feeds.tasks import websub_subscribe
+from apps.feeds.tests import sample_rss_xml
+from apps.feeds.websub import verify_signature
+
+CALLBACK_URL = "https://rss.test.com"
+
+
+def sign(secret, body, method="sha256"):
+    return f"{method}={hmac.new(secret.encode(), body, method).hexdigest()}"
+
+
+def test_get_hub():
+    """
+    Verify hubs are discovered from a feed's hub and self links
+    """
+    assert get_hub(parse(sample_rss_xml.FEED_WITH_HUB)) == (
+        sample_rss_xml.HUB,
+        sample_rss_xml.TOPIC,
+    )
+    assert get_hub(parse(sample_rss_xml.FEED)) == (None, None)
+
+
+@pytest.mark.parametrize("method", ["sha1", "sha256", "sha512"])
+def test_verify_signature(method):
+    """
+    Verify pushed content is only accepted with a valid HMAC signature
+    """
+    body = b"<rss></rss>"
+
+    assert verify_signature("secret", body, sign("secret", body, method))
+    assert not verify_signature("other", body, sign("secret", body, method))
+    assert not verify_signature("secret", body, f"md5={hashlib.md5(body).hexdigest()}")
+    assert not verify_signature("secret", body, None)
+
+
+@pytest.mark.django_db
+def test_websub_subscribe(settings, requests_mock):
+    """
+    Verify feeds are subscribed to their hub once, until due for renewal
+    """
+    settings.WEBSUB_CALLBACK_URL = CALLBACK_URL
+    hub = requests_mock.post(sample_rss_xml.HUB, status_code=202)
+    feed = G(Feed, title="test", rss_url=sample_rss_xml.TOPIC)
+
+    assert websub_subscribe(feed.pk, sample_rss_xml.HUB, sample_rss_xml.TOPIC)
+    assert not websub_subscribe(feed.pk, sample_rss_xml.HUB, sample_rss_xml.TOPIC)
+
+    subscription = WebSubSubscription.objects.get()
+    assert subscription.pending
+    assert len(subscription.token) >= 32
+    assert hub.call_count == 1
+    assert parse_qs(hub.last_request.text) == {
+        "hub.mode": ["subscribe"],
+        "hub.topic": [sample_rss_xml.TOPIC],
+        "hub.callback": [
+            CALLBACK_URL + urls.reverse("feeds:websub_callback", args=[subscription.token])
+        ],
+        "hub.secret": [subscription.secret],
+        "hub.lease_seconds": [str(settings.WEBSUB_LEASE_SECONDS)],
+    }
+
+
+@pytest.mark.django_db
+def test_websub_callback_verification(client):
+    """
+    Verify the callback confirms requested subscriptions and starts their lease
+    """
+    subscription = G(WebSubSubscription, topic=sample_rss_xml.TOPIC, pending=True)
+    url = urls.reverse("feeds:websub_callback", args=[subscription.token])
+    params = {
+        "hub.mode": "subscribe",
+        "hub.topic": sample_rss_xml.TOPIC,
+        "hub.challenge": "challenge",
+        "hub.lease_seconds": "3600",
+    }
+
+    resp = client.get(url, {**params, "hub.topic": "https://other.com/rss"})
+    assert resp.status_code == 404
+    resp = client.get(url, {**params, "hub.mode": "unsubscribe"})
+    assert resp.status_code == 404
+
+    resp = client.get(url, params)
+    assert resp.status_code == 200
+    assert resp.content == b"challenge"
+    assert WebSubSubscription.objects.active().filter(pk=subscription.pk).exists()
+    subscription.refresh_from_db()
+    assert not subscription.pending
+
+
+@pytest.mark.django_db
+def test_websub_callback_forged_verification(client):
+    """
+    Verify verifications and denials are ignored unless made
+    with the subscription's token, while a request is pending
+    """
+    lease_expires_at = dt.datetime.utcnow() + dt.timedelta(days=1)
+    subscription = G(
+        WebSubSubscription, topic=sample_rss_xml.TOPIC, lease_expires_at=lease_expires_at
+    )
+    params = {"hub.topic": sample_rss_xml.TOPIC, "hub.challenge": "challenge"}
+
+    # Without a pending request
+    url = urls.reverse("feeds:websub_callback", args=[subscription.token])
+    for mode in ["subscribe", "denied"]:
+        resp = client.get(url, {**params, "hub.mode": mode})
+        assert resp.status_code == 404
+
+    # With a guessed token
+    WebSubSubscription.objects.filter(pk=subscription.pk).update(pending=True)
+    for token in [str(subscription.pk), "guessed"]:
+        url = urls.reverse("feeds:websub_callback", args=[token])
+        resp = client.get(url, {**params, "hub.mode": "denied"})
+        assert resp.status_code == 404
+        resp = client.post(url, b"<rss></rss>", content_type="application/rss+xml")
+        assert resp.status_code == 404
+
+    subscription.refresh_from_db()
+    assert subscription.pending
+    assert subscription.lease_expires_at == lease_expires_at
+
+
+@pytest.mark.django_db
+def test_websub_callback_lease_and_denial(client, settings):
+    """
+    Verify leases granted by hubs are capped, and only
+    denials of the subscribed topic end a subscription
+    """
+    subscription = G(WebSubSubscription, topic=sample_rss_xml.TOPIC, pending=True)
+    url = urls.reverse("feeds:websub_callback", args=[subscription.token])
+    params = {
+        "hub.mode": "subscribe",
+        "hub.topic": sample_rss_xml.TOPIC,
+        "hub.challenge": "challenge",
+        "hub.lease_seconds": "99999999999999",
+    }
+
+    with freezegun.freeze_time("2020-06-20 10:00"):
+        resp = client.get(url, params)
+    assert resp.status_code == 200
+    subscription.refresh_from_db()
+    assert subscription.lease_expires_at == dt.datetime(2020, 6, 20, 10) + dt.timedelta(
+        seconds=settings.WEBSUB_MAX_LEASE_SECONDS
+    )
+
+    # The hub denies a renewal
+    WebSubSubscription.objects.filter(pk=subscription.pk).update(pending=True)
+    resp = client.get(url, {"hub.mode": "denied", "hub.topic": "https://other.com/rss"})
+    assert resp.status_code == 404
+    resp = client.get(url, {"hub.mode": "denied"})
+    assert resp.status_code == 404
+    subscription.refresh_from_db()
+    assert subscription.lease_expires_at is not None
+
+    resp = client.get(url, {"hub.mode": "denied", "hub.topic": sample_rss_xml.TOPIC})
+    assert resp.status_code == 200
+    subscription.refresh_from_db()
+    assert subscription.lease_expires_at is None
+
+
+@pytest.mark.django_db
+def test_websub_callback_push(client, mocker):
+    """
+    Verify signed content pushed by the hub is stored, and
+    content with an invalid signature is ignored
+    """
+    delay = mocker.patch("apps.feeds.views.store_pushed_feed.delay")
+    subscription = G(
+        WebSubSubscription,
+        secret="secret",
+        lease_expires_at=dt.datetime.utcnow() + dt.timedelta(days=1),
+    )
+    url = urls.reverse("feeds:websub_callback", args=[subscription.token])
+    body = sample_rss_xml.FEED.encode("utf-8")
+
+    resp = client.post(
+        url, body, content_type="application/rss+xml", HTTP_X_HUB_SIGNATURE="sha1=invalid"
+    )
+    assert resp.status_code == 202
+    assert not delay.called
+
+    resp = client.post(
+        url,
+        body,
+        content_type="application/rss+xml",
+        HTTP_X_HUB_SIGNATURE=sign("secret", body),
+    )
+    assert resp.status_code == 202
+    delay.assert_called_once_with(subscription.pk, sample_rss_xml.FEED)
+
+
+@pytest.mark.django_db
+def test_update_feeds_merge():
+    """
+    Verify pushed items are merged with the feed's items
+    """
+    rss_url = "https://test.com/rss"
+    feed = G(Feed, title="test", rss_url=rss_url)
+    old = G(
+        Item,
+        entry__source_url=rss_url,
+        entry__guid="https://test.com/old",
+        entry__title="old",
+        feed=feed,
+    )
+    updated = G(
+        Item,
+        entry__source_url=rss_url,
+        entry__guid="https://test.com/new",
+        entry__title="stale",
+        feed=feed,
+    )
+    updated.mark_as_read()
+
+    update_feeds([ParsedEntry(title="new", link="https://test.com/new")], [feed.pk], merge=True)
+
+    assert sorted(feed.items.values_list("entry__title", flat=True)) == ["new", "old"]
+    assert Item.objects.filter(pk=old.pk).exists()
+    # The updated entry's item keeps its state
+    assert not Item.objects.get(pk=updated.pk).unread
+
+
+@pytest.mark.django_db
+def test_update_all_feeds_fallback_poll(mocker, settings):
+    """
+    Verify feeds pushed by their hub are only polled every fallback interval
+    """
+    delay = mocker.patch("apps.feeds.tasks.update_feed_items.delay")
+    feed = G(Feed, title="test", rss_url=sample_rss_xml.TOPIC)
+    G(
+        WebSubSubscription,
+        rss_url=sample_rss_xml.TOPIC,
+        lease_expires_at=dt.datetime.utcnow() + dt.timedelta(days=1),
+    )
+
+    update_all_feeds()
+    assert not delay.called
+
+    Feed.objects.filter(pk=feed.pk).update(
+        last_updated_at=dt.datetime.utcnow()
+        - dt.timedelta(seconds=settings.WEBSUB_FALLBACK_POLL_INTERVAL + 1)
+    )
+    update_all_feeds()
+    delay.assert_called_once_with(feed.pk, feed_ids=[feed.pk])
@@ -0,0 +1,26 @@
+import html
+import re
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def html_to_text(content):
+    """
+    :param content: str - HTML fragment, e.g. an entry's description
+    :return: str - Its plain text, with whitespace collapsed
+    """
+    return WHITESPACE.sub(" ", html.unescape(strip_tags(content or ""))).strip()
+
+
+def make_excerpt(content, length):
+    """
+    Get a plain text excerpt of an HTML fragment
+
+    :param content: str - HTML fragment
+    :param length: int - Maximum characters, including the ellipsis
+    :return: str
+    """
+    return Truncator(html_to_text(content)).chars(length)
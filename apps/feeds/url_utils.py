@@ -0,0 +1,82 @@
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query params added by campaign/click tracking, they don't change the feed
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "mc_cid", "mc_eid", "_ga"}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+# Feed.rss_url's max length
+MAX_URL_LENGTH = 255
+
+validate_http_url = URLValidator(schemes=["http", "https"])
+
+
+def normalize_url(url):
+    """
+    Canonicalize a feed url so different spellings of the same
+    feed map to one fetch key:
+    1) lowercase scheme and host
+    2) drop default ports, fragments and tracking query params
+
+    :param url: str - Feed's url
+    :return: str
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    netloc = (parts.hostname or "").lower()
+    if ":" in netloc:
+        # IPv6 address
+        netloc = f"[{netloc}]"
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        credentials = parts.username
+        if parts.password:
+            credentials = f"{credentials}:{parts.password}"
+        netloc = f"{credentials}@{netloc}"
+
+    # Other params are kept as spelled, servers may route on the exact query
+    query = "&".join(
+        param for param in parts.query.split("&") if not is_tracking_param(param)
+    )
+
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def is_valid_feed_url(url):
+    """
+    Whether url can be followed as a feed: an http(s) url
+    fitting Feed.rss_url once normalized
+
+    :param url: str - Feed's url
+    :return: Boolean
+    """
+    try:
+        validate_http_url(url)
+    except ValidationError:
+        return False
+    return len(normalize_url(url)) <= MAX_URL_LENGTH
+
+
+def is_tracking_param(param):
+    """
+    :param param: str - Raw "key=value" param of a query string
+    :return: Boolean
+    """
+    key = unquote(param.split("=", 1)[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def get_host(url):
+    """
+    :param url: str - Feed's url
+    :return: str - Lowercased host name, "" if url has none
+    """
+    return urlsplit(url).hostname or ""
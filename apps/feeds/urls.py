@@ -1,14 +1,26 @@
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from stronghold.decorators import public
 
 from apps.feeds import views
 
 app_name = "feeds"
 urlpatterns = [
     path("myfeeds/", views.MyFeedList.as_view(), name="myfeeds"),
+    path("river/", views.River.as_view(), name="river"),
     path("bookmarks/", views.ItemBookmarkList.as_view(), name="bookmarks"),
     path("follow/", views.FollowFeed.as_view(), name="follow"),
+    path("import/", views.ImportOPML.as_view(), name="import_opml"),
+    path("import/<int:pk>", views.ImportDetail.as_view(), name="import_detail"),
+    path("export/", views.ExportOPML.as_view(), name="export_opml"),
     path("feed/<int:pk>", views.FeedDetail.as_view(), name="feed_detail"),
     path("updatefeeds/<int:pk>", views.UpdateFeed.as_view(), name="update_async"),
     path("unfollow/<int:pk>", views.UnfollowFeed.as_view(), name="unfollow"),
+    path("feed/<int:pk>/read", views.MarkFeedRead.as_view(), name="mark_read"),
     path("item/<int:pk>", views.ItemDetail.as_view(), name="item_detail"),
+    path(
+        "websub/<str:token>",
+        public(csrf_exempt(views.WebSubCallback.as_view())),
+        name="websub_callback",
+    ),
 ]
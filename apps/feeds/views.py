@@ -1,15 +1,40 @@
+import datetime as dt
+
+from django import shortcuts
 from django import urls
+from django.conf import settings
+from django.http import Http404
+from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.views.generic import DetailView
 from django.views.generic import ListView
 from django.views.generic import UpdateView
+from django.views.generic import View
 from django.views.generic.edit import DeleteView
 from django.views.generic.edit import FormView
 
+from apps.feeds.conditional import bookmarks_stamps
+from apps.feeds.conditional import conditional_page
+from apps.feeds.conditional import feed_stamps
+from apps.feeds.conditional import item_stamps
 from apps.feeds.forms import FollowFeedForm
+from apps.feeds.forms import ImportOPMLForm
 from apps.feeds.forms import UpdateFeedForm
 from apps.feeds.forms import UpdateItemForm
 from apps.feeds.models import Feed
 from apps.feeds.models import Item
+from apps.feeds.models import OPMLImport
+from apps.feeds.models import Profile
+from apps.feeds.models import ReadState
+from apps.feeds.models import WebSubSubscription
+from apps.feeds.encoding import decode_feed
+from apps.feeds.opml import Outline
+from apps.feeds.opml import iter_opml
+from apps.feeds.tasks import store_pushed_feed
+from apps.feeds.websub import verify_signature
+from rss_scraper.pagination import InvalidCursor
+from rss_scraper.pagination import paginate_keyset
 
 
 class MyFeedList(ListView):
@@ -17,26 +42,77 @@ class MyFeedList(ListView):
         return Feed.objects.annotate_unread_items_count(self.request.user)
 
 
+@method_decorator(conditional_page(feed_stamps), name="get")
 class FeedDetail(DetailView):
     model = Feed
 
     def get_queryset(self):
-        return Feed.objects.annotate_unread_items_count(self.request.user)
+        # Filtered first, only this feed's read state is needed
+        return (
+            Feed.objects.filter(pk=self.kwargs["pk"])
+            .annotate_unread_items_count(self.request.user)
+            .prefetch_items()
+        )
+
 
+class River(ListView):
+    """
+    Items of all the user's feeds, newest first
+    """
+    context_object_name = "item_list"
+    template_name = "feeds/river.html"
 
+    def get_queryset(self):
+        self.unread = self.request.GET.get("unread") == "1"
+        self.folder = self.request.GET.get("folder")
+        items = Item.objects.river(self.request.user, unread=self.unread, folder=self.folder)
+
+        try:
+            items, self.next_cursor = paginate_keyset(
+                items,
+                ["-published_at", "-id"],
+                cursor=self.request.GET.get("cursor"),
+                page_size=settings.RIVER_PAGE_SIZE,
+                nullable=["published_at"],
+            )
+        except InvalidCursor as exc:
+            raise Http404(exc)
+        return items
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["next_cursor"] = self.next_cursor
+        context["unread"] = self.unread
+        context["folder"] = self.folder
+        context["folders"] = (
+            self.request.user.feeds.exclude(folder="")
+            .order_by("folder")
+            .values_list("folder", flat=True)
+            .distinct()
+        )
+        return context
+
+
+@method_decorator(conditional_page(bookmarks_stamps), name="get")
 class ItemBookmarkList(ListView):
     def get_queryset(self):
-        return Item.objects.filter(feed__subscriber=self.request.user, bookmark=True,)
+        return Item.objects.filter(
+            feed__subscriber=self.request.user, bookmark=True,
+        ).list_columns()
 
 
+@method_decorator(conditional_page(item_stamps), name="get")
 class ItemDetail(UpdateView):
     model = Item
+    queryset = Item.objects.select_related("entry", "feed__read_state")
     form_class = UpdateItemForm
     success_url = urls.reverse_lazy("feeds:myfeeds")
 
     def get(self, request, *args, **kwargs):
         get = super().get(request, *args, **kwargs)
-        self.object.mark_as_read()
+        if self.object.unread:
+            self.object.mark_as_read()
+            Profile.objects.touch_read_state(request.user)
         return get
 
     def form_valid(self, form):
@@ -44,22 +120,70 @@ class ItemDetail(UpdateView):
         return super().form_valid(form)
 
 
+class MarkFeedRead(View):
+    def post(self, request, pk):
+        feed = shortcuts.get_object_or_404(Feed, pk=pk, subscriber=request.user)
+        ReadState.objects.mark_all_read(feed.pk)
+        Profile.objects.touch_read_state(request.user)
+        return shortcuts.redirect(feed)
+
+
 class UnfollowFeed(DeleteView):
     model = Feed
     success_url = urls.reverse_lazy("feeds:myfeeds")
     template_name = "feeds/unfollow_feed.html"
 
+    def delete(self, request, *args, **kwargs):
+        delete = super().delete(request, *args, **kwargs)
+        # The feed's bookmarked items are gone
+        Profile.objects.touch_read_state(request.user)
+        return delete
+
 
 class FollowFeed(FormView):
     form_class = FollowFeedForm
     template_name = "feeds/follow_feed.html"
     success_url = urls.reverse_lazy("feeds:myfeeds")
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["user"] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         form.save(self.request.user)
         return super().form_valid(form)
 
 
+class ImportOPML(FormView):
+    form_class = ImportOPMLForm
+    template_name = "feeds/import_opml.html"
+
+    def form_valid(self, form):
+        opml_import = form.save(self.request.user)
+        return shortcuts.redirect(opml_import)
+
+
+class ImportDetail(DetailView):
+    def get_queryset(self):
+        return OPMLImport.objects.filter(user=self.request.user)
+
+
+class ExportOPML(View):
+    def get(self, request):
+        feeds = (
+            request.user.feeds.order_by("folder", "title")
+            .values_list("title", "rss_url", "link", "folder")
+            .iterator()
+        )
+        resp = StreamingHttpResponse(
+            iter_opml(Outline(*feed) for feed in feeds),
+            content_type="text/x-opml; charset=utf-8",
+        )
+        resp["Content-Disposition"] = 'attachment; filename="feeds.opml"'
+        return resp
+
+
 class UpdateFeed(UpdateView):
     model = Feed
     template_name = "feeds/update_feed.html"
@@ -69,3 +193,51 @@ class UpdateFeed(UpdateView):
     def form_valid(self, form):
         failed = form.update(self.object)
         return super().form_valid(form)
+
+
+class WebSubCallback(View):
+    """
+    Callback of WebSub hubs: verifies subscription requests (GET)
+    and receives pushed feed content (POST)
+    """
+
+    def get(self, request, token):
+        subscription = shortcuts.get_object_or_404(WebSubSubscription, token=token)
+        mode = request.GET.get("hub.mode")
+        # Only answers to our pending request, about the subscribed topic,
+        # are acted on
+        if not subscription.pending or request.GET.get("hub.topic") != subscription.topic:
+            raise Http404
+
+        subscriptions = WebSubSubscription.objects.filter(pk=subscription.pk)
+        if mode == "denied":
+            subscriptions.update(lease_expires_at=None, pending=False)
+            return HttpResponse()
+
+        challenge = request.GET.get("hub.challenge")
+        if mode != "subscribe" or not challenge:
+            raise Http404
+
+        lease_seconds = request.GET.get("hub.lease_seconds", "")
+        if lease_seconds.isdigit():
+            lease_seconds = min(int(lease_seconds), settings.WEBSUB_MAX_LEASE_SECONDS)
+        else:
+            lease_seconds = settings.WEBSUB_LEASE_SECONDS
+        subscriptions.update(
+            lease_expires_at=dt.datetime.utcnow() + dt.timedelta(seconds=lease_seconds),
+            pending=False,
+        )
+        return HttpResponse(challenge, content_type="text/plain")
+
+    def post(self, request, token):
+        subscription = shortcuts.get_object_or_404(WebSubSubscription, token=token)
+
+        # Content with an invalid signature is acknowledged, but ignored
+        signature = request.headers.get("X-Hub-Signature")
+        if subscription.lease_expires_at and verify_signature(
+            subscription.secret, request.body, signature
+        ):
+            feed = decode_feed(request.body, request.headers.get("Content-Type"))
+            store_pushed_feed.delay(subscription.pk, feed)
+
+        return HttpResponse(status=202)
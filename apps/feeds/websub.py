@@ -0,0 +1,52 @@
+import hashlib
+import hmac
+
+from django.conf import settings
+
+SIGNATURE_METHODS = {"sha1", "sha256", "sha384", "sha512"}
+
+
+def request_subscription(subscription, mode="subscribe"):
+    """
+    Ask a subscription's hub to (un)subscribe our callback to its topic.
+    The hub confirms by requesting the callback, see WebSubCallback
+
+    :param subscription: WebSubSubscription
+    :param mode: str - "subscribe" or "unsubscribe"
+    :return: requests.Response
+    :raises: requests.RequestException
+    """
+    # The callback view only verifies signatures, it doesn't need requests
+    from apps.feeds.fetcher import session
+
+    resp = session.post(
+        subscription.hub,
+        data={
+            "hub.mode": mode,
+            "hub.topic": subscription.topic,
+            "hub.callback": subscription.get_callback_url(),
+            "hub.secret": subscription.secret,
+            "hub.lease_seconds": settings.WEBSUB_LEASE_SECONDS,
+        },
+        timeout=settings.REQUEST_TIMEOUT,
+    )
+    resp.raise_for_status()
+    return resp
+
+
+def verify_signature(secret, body, signature):
+    """
+    Check the X-Hub-Signature of pushed content, an HMAC of
+    the body keyed with the subscription's secret
+
+    :param secret: str - Subscription's secret
+    :param body: bytes - Request body
+    :param signature: str - X-Hub-Signature header, e.g. "sha256=<hex digest>"
+    :return: Boolean
+    """
+    method, _, digest = (signature or "").partition("=")
+    if method not in SIGNATURE_METHODS or not digest:
+        return False
+
+    expected = hmac.new(secret.encode(), body, method).hexdigest()
+    return hmac.compare_digest(expected, digest.lower())
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from apps.notifications.models import Notification
+from rss_scraper.admin import LargeTableAdmin
+
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdmin):
+    list_display = ["id", "title", "user", "unread", "occurrences", "created_at", "last_seen_at"]
+    list_filter = ["unread"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    search_lookups = ["id", "user__username"]
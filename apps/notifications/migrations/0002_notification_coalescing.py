@@ -0,0 +1,39 @@
+# Generated by Django 3.0.7 on 2026-10-19 15:50
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def copy_created_at(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    Notification.objects.update(last_seen_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='key',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='last_seen_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(unread=True), fields=['user', 'key'], name='notification_unread_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.7 on 2026-10-19 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_coalescing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='notification_list_idx'),
+        ),
+    ]
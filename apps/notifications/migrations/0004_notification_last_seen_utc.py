@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-19 17:13
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_notification_list_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='last_seen_at',
+            field=models.DateTimeField(default=datetime.datetime.utcnow),
+        ),
+    ]
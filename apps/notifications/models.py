@@ -1,7 +1,12 @@
+import datetime as dt
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
 
+from apps.notifications.querysets import NotificationQuerySet
+
 
 class Notification(models.Model):
     """
@@ -14,9 +19,28 @@ class Notification(models.Model):
     )
     unread = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Repeated notifications with the same key are coalesced
+    # into one unread notification
+    key = models.CharField(max_length=255, blank=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(default=dt.datetime.utcnow)
+
+    objects = NotificationQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Serves unread counts and coalescing lookups
+            models.Index(
+                fields=["user", "key"],
+                condition=Q(unread=True),
+                name="notification_unread_idx",
+            ),
+            # Serves the keyset paginated notifications list
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="notification_list_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -0,0 +1,39 @@
+import datetime as dt
+
+from django.db import models
+from django.db.models import F
+from django.db.models import Q
+
+
+class NotificationQuerySet(models.QuerySet):
+    def notify(self, notifications):
+        """
+        Send notifications in bulk. A notification repeating a user's
+        unread notification with the same key is coalesced into it,
+        incrementing its occurrences and last seen time, instead of
+        creating another row
+
+        :param notifications: List - unsaved Notification instances
+        :return: List - newly created notifications
+        """
+        pending = {}
+        for notification in notifications:
+            pending.setdefault((notification.user_id, notification.key), notification)
+
+        repeated = set(
+            self.filter(unread=True, key__in={key for _, key in pending})
+            .values_list("user_id", "key")
+            .distinct()
+        ) & set(pending)
+
+        if repeated:
+            lookup = Q()
+            for user_id, key in repeated:
+                lookup |= Q(user_id=user_id, key=key)
+            self.filter(lookup, unread=True).update(
+                occurrences=F("occurrences") + 1, last_seen_at=dt.datetime.utcnow()
+            )
+
+        return self.bulk_create(
+            [n for user_key, n in pending.items() if user_key not in repeated]
+        )
@@ -0,0 +1,28 @@
+import pytest
+
+from django import urls
+from django.contrib.auth import get_user_model
+from django_dynamic_fixture import G
+
+from apps.notifications.models import Notification
+
+
+@pytest.mark.django_db
+def test_admin_notifications(admin_client, django_assert_max_num_queries):
+    """
+    Verify notifications are listed with their users in a constant
+    number of queries, and searched by their user's username
+    """
+    user = G(get_user_model(), username="reader")
+    notifications = [G(Notification, user=user) for _ in range(5)]
+    G(Notification, user=G(get_user_model()))
+    url = urls.reverse("admin:notifications_notification_changelist")
+
+    with django_assert_max_num_queries(8):
+        resp = admin_client.get(url)
+    assert resp.context["cl"].result_count == 6
+
+    resp = admin_client.get(url, {"q": "reader"})
+    assert sorted(result.pk for result in resp.context["cl"].result_list) == [
+        notification.pk for notification in notifications
+    ]
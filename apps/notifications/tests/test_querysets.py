@@ -0,0 +1,57 @@
+import freezegun
+import pytest
+
+from django.contrib.auth import get_user_model
+from django_dynamic_fixture import G
+
+from apps.notifications.models import Notification
+
+
+@pytest.mark.django_db
+def test_notify_coalesces_unread_notifications():
+    """
+    Verify repeated notifications are coalesced into the user's
+    unread notification with the same key
+    """
+    user1 = G(get_user_model(), username="user1")
+    user2 = G(get_user_model(), username="user2")
+
+    def notifications():
+        return [
+            Notification(title="failed", user=user1, key="feed:1"),
+            Notification(title="failed", user=user2, key="feed:2"),
+        ]
+
+    with freezegun.freeze_time("2020-06-20 10:00"):
+        Notification.objects.notify(notifications())
+    with freezegun.freeze_time("2020-06-21 10:00"):
+        Notification.objects.notify(notifications())
+
+    assert Notification.objects.count() == 2
+    for notification in Notification.objects.all():
+        assert notification.occurrences == 2
+        assert str(notification.created_at) == "2020-06-20 10:00:00"
+        assert str(notification.last_seen_at) == "2020-06-21 10:00:00"
+
+    # Once read, a repeated notification is sent again
+    user1.notifications.first().mark_as_read()
+    Notification.objects.notify(notifications())
+
+    assert user1.notifications.count() == 2
+    assert user1.notifications.filter(unread=True).get().occurrences == 1
+    assert user2.notifications.get().occurrences == 3
+
+
+@pytest.mark.django_db
+def test_notify_bulk_inserts(django_assert_num_queries):
+    """
+    Verify notifications for many users are inserted in bulk
+    """
+    users = [G(get_user_model(), username=f"user{i}") for i in range(50)]
+
+    with django_assert_num_queries(2):
+        Notification.objects.notify(
+            [Notification(title="failed", user=user, key="feed") for user in users]
+        )
+
+    assert Notification.objects.filter(unread=True).count() == 50
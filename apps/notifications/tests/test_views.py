@@ -2,6 +2,7 @@ from bs4 import BeautifulSoup
 import pytest
 
 from django import urls
+from django.contrib.auth import get_user_model
 from django_dynamic_fixture import G
 
 from apps.notifications.models import Notification
@@ -12,6 +13,8 @@ from apps.notifications.models import Notification
     [
         ("notifications:notifications", None),
         ("notifications:notification_detail", {"pk": 1}),
+        ("notifications:mark_all_read", None),
+        ("notifications:clear_read", None),
     ],
 )
 def test_protected_view(client, url_name, url_kwargs):
@@ -70,3 +73,82 @@ def test_notifications_detail_page(authenticated_user, client):
     assert resp.status_code == 200
     assert notification.title == soup.select("p")[1].get_text().strip()
     assert notification.details in soup.select("a[href]")[-1]
+
+
+@pytest.mark.django_db
+def test_notifications_page_only_lists_users_notifications(authenticated_user, client):
+    """
+    Verify users only see their own notifications
+    """
+    other_user = G(get_user_model(), username="other")
+    mine = Notification.objects.create(title="mine", user=authenticated_user)
+    not_mine = Notification.objects.create(title="notmine", user=other_user)
+
+    resp = client.get(urls.reverse("notifications:notifications"))
+    soup = BeautifulSoup(resp.content, "html.parser")
+    rendered_notifications = [
+        n.get_text().strip()
+        for n in soup.select('a[href*="/notifications/notification/"]')
+    ]
+
+    assert rendered_notifications == [mine.title]
+    assert client.get(not_mine.get_absolute_url()).status_code == 404
+
+
+@pytest.mark.django_db
+def test_notifications_page_pagination(authenticated_user, client, settings):
+    """
+    Verify the notifications page is paginated with cursors
+    """
+    settings.NOTIFICATIONS_PAGE_SIZE = 2
+    notifications = [
+        Notification.objects.create(title=f"test{i}", user=authenticated_user)
+        for i in range(3)
+    ]
+
+    url = urls.reverse("notifications:notifications")
+    resp = client.get(url)
+    soup = BeautifulSoup(resp.content, "html.parser")
+    rendered_notifications = [
+        n.get_text().strip()
+        for n in soup.select('a[href*="/notifications/notification/"]')
+    ]
+    older = soup.select('a[href^="?cursor="]')[0]["href"]
+
+    assert rendered_notifications == ["test2", "test1"]
+
+    resp = client.get(url + older)
+    soup = BeautifulSoup(resp.content, "html.parser")
+    rendered_notifications = [
+        n.get_text().strip()
+        for n in soup.select('a[href*="/notifications/notification/"]')
+    ]
+
+    assert rendered_notifications == ["test0"]
+    assert not soup.select('a[href^="?cursor="]')
+    assert client.get(url + "?cursor=foo").status_code == 404
+
+
+@pytest.mark.django_db
+def test_mark_all_read_and_clear_read(authenticated_user, client):
+    """
+    Verify users can mark all their notifications as read
+    and then clear them
+    """
+    other_user = G(get_user_model(), username="other")
+    for i in range(3):
+        Notification.objects.create(title=f"test{i}", user=authenticated_user)
+    Notification.objects.create(title="notmine", user=other_user)
+
+    resp = client.post(urls.reverse("notifications:mark_all_read"))
+
+    assert resp.status_code == 302
+    assert resp.url == urls.reverse("notifications:notifications")
+    assert not authenticated_user.notifications.filter(unread=True).exists()
+    assert other_user.notifications.get().unread
+
+    resp = client.post(urls.reverse("notifications:clear_read"))
+
+    assert resp.status_code == 302
+    assert not authenticated_user.notifications.exists()
+    assert other_user.notifications.exists()
@@ -11,4 +11,6 @@ urlpatterns = [
         views.NotificationDetail.as_view(),
         name="notification_detail",
     ),
+    path("notifications/read/", views.MarkAllRead.as_view(), name="mark_all_read"),
+    path("notifications/clear/", views.ClearRead.as_view(), name="clear_read"),
 ]
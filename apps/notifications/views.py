@@ -1,17 +1,57 @@
+from django import shortcuts
+from django.conf import settings
+from django.http import Http404
 from django.views.generic import DetailView
 from django.views.generic import ListView
+from django.views.generic import View
 
 from apps.notifications.models import Notification
+from rss_scraper.pagination import InvalidCursor
+from rss_scraper.pagination import paginate_keyset
 
 
 class NotificationList(ListView):
     model = Notification
+    context_object_name = "notification_list"
+    template_name = "notifications/notification_list.html"
+
+    def get_queryset(self):
+        try:
+            notifications, self.next_cursor = paginate_keyset(
+                Notification.objects.filter(user=self.request.user),
+                ["-created_at", "-id"],
+                cursor=self.request.GET.get("cursor"),
+                page_size=settings.NOTIFICATIONS_PAGE_SIZE,
+            )
+        except InvalidCursor as exc:
+            raise Http404(exc)
+        return notifications
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["next_cursor"] = self.next_cursor
+        return context
 
 
 class NotificationDetail(DetailView):
     model = Notification
 
+    def get_queryset(self):
+        return Notification.objects.filter(user=self.request.user)
+
     def get(self, request, *args, **kwargs):
         get = super().get(request, *args, **kwargs)
         self.object.mark_as_read()
         return get
+
+
+class MarkAllRead(View):
+    def post(self, request, *args, **kwargs):
+        Notification.objects.filter(user=request.user, unread=True).update(unread=False)
+        return shortcuts.redirect("notifications:notifications")
+
+
+class ClearRead(View):
+    def post(self, request, *args, **kwargs):
+        Notification.objects.filter(user=request.user, unread=False).delete()
+        return shortcuts.redirect("notifications:notifications")
@@ -0,0 +1,45 @@
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rss_scraper.pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Admin of a table too large to count or scan for every changelist:
+    large counts are estimated, the unfiltered count isn't shown and
+    searches only match indexed fields exactly
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Newest first, served by the primary key's index
+    ordering = ["-id"]
+    # Lookups of indexed fields matched exactly against the search term,
+    # e.g. ["id", "subscriber__username"]. Admin search_fields aren't used,
+    # they're matched case insensitively (UPPER(field) LIKE ...), which
+    # indexes don't serve
+    search_lookups = []
+
+    def get_search_fields(self, request):
+        return self.search_lookups
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        match = Q()
+        for lookup in self.search_lookups:
+            field = get_fields_from_path(self.model, lookup)[-1]
+            try:
+                value = field.to_python(term)
+            except ValidationError:
+                # e.g. a title searched for as an id
+                continue
+            match |= Q(**{lookup: value})
+
+        if not match:
+            return queryset.none(), False
+        return queryset.filter(match), False
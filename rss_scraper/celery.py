@@ -1,9 +1,27 @@
 import os
 
 from celery import Celery
+from celery.signals import task_postrun
+from celery.signals import task_prerun
+from celery.signals import worker_init
+
+from rss_scraper.db import patch_for_gevent
+from rss_scraper.memory import start_task_memory
+from rss_scraper.memory import stop_task_memory
+from rss_scraper.profiling import start_task_profile
+from rss_scraper.profiling import stop_task_profile
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rss_scraper.settings")
 
 app = Celery("rss_scraper")
 app.config_from_object("django.conf.settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+# Cooperative, bounded database access of the gevent fetch workers
+worker_init.connect(patch_for_gevent)
+# Opt-in profiling of tasks, see PROFILING_TASKS and PROFILING_FEED_IDS
+task_prerun.connect(start_task_profile)
+task_postrun.connect(stop_task_profile)
+# Memory of every task, see MEMORY_DEBUG_TOP_ALLOCATIONS
+task_prerun.connect(start_task_memory)
+task_postrun.connect(stop_task_memory)
@@ -0,0 +1,50 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+# Bounds the greenlets of a gevent pool using a database connection at
+# once. Set at worker start, see patch_for_gevent
+_db_slots = None
+
+
+def patch_for_gevent(**extra):
+    """
+    worker_init handler. In gevent pools, makes psycopg2 yield to other
+    greenlets while it waits on the database (with psycogreen), instead of
+    blocking the whole worker, and bounds the greenlets querying at once
+    to FETCH_DB_CONCURRENCY, see db_slot
+    """
+    global _db_slots
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+    if not monkey.is_module_patched("socket"):
+        return
+
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+    _db_slots = threading.BoundedSemaphore(settings.FETCH_DB_CONCURRENCY)
+
+
+@contextmanager
+def db_slot():
+    """
+    Wrap the queries of tasks that may run in a gevent pool. There,
+    Django's connections are per greenlet: a greenlet waits for one of
+    FETCH_DB_CONCURRENCY slots and closes its connection when done,
+    rather than holding a connection while it waits on the network
+    """
+    if _db_slots is None:
+        yield
+        return
+
+    with _db_slots:
+        try:
+            yield
+        finally:
+            if not connection.in_atomic_block:
+                connection.close()
@@ -0,0 +1,107 @@
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from collections import namedtuple
+
+from django.conf import settings
+
+# Code importing what each kind of process imports until it's ready to
+# serve: web processes load the WSGI app and url patterns, workers load
+# the Celery app and its tasks
+TARGETS = {
+    "web": (
+        "import rss_scraper.wsgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns"
+    ),
+    "worker": (
+        "import django\n"
+        "django.setup()\n"
+        "from rss_scraper.celery import app\n"
+        "app.loader.import_default_modules()"
+    ),
+}
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+ModuleImport = namedtuple("ModuleImport", ["module", "self_us", "cumulative_us", "depth"])
+
+
+class ImportProfileError(Exception):
+    pass
+
+
+def profile_imports(code):
+    """
+    Run code in a fresh interpreter with -X importtime and
+    collect the import time of every module it imports
+
+    :param code: str - Python code, e.g. a value of TARGETS
+    :return: List - ModuleImport tuples, in the order imports finished
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=settings.BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    imports = []
+    errors = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append(
+                ModuleImport(module, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+        elif not line.startswith("import time:"):
+            errors.append(line)
+
+    if result.returncode:
+        raise ImportProfileError("\n".join(errors[-10:]))
+    return imports
+
+
+def project_imports(imports, packages=("apps", "rss_scraper")):
+    """
+    Get the imports of other packages made by the project's modules,
+    the imports a lazy import could defer
+
+    :param imports: List - ModuleImport tuples, see profile_imports
+    :param packages: Tuple - Top level packages of the project
+    :return: List - (ModuleImport, importing module) tuples, slowest first
+    """
+    found = []
+    # A module's own imports finish before it, one level deeper
+    importers = {}
+    for module_import in reversed(imports):
+        importer = importers.get(module_import.depth - 1)
+        importers[module_import.depth] = module_import.module
+        if (
+            importer
+            and importer.split(".")[0] in packages
+            and module_import.module.split(".")[0] not in packages
+        ):
+            found.append((module_import, importer))
+    return sorted(found, key=lambda found_import: found_import[0].cumulative_us, reverse=True)
+
+
+def by_package(imports):
+    """
+    :param imports: List - ModuleImport tuples
+    :return: List - (top level package, total self time in us, modules count)
+        tuples, slowest first
+    """
+    packages = defaultdict(lambda: [0, 0])
+    for module_import in imports:
+        package = packages[module_import.module.split(".")[0]]
+        package[0] += module_import.self_us
+        package[1] += 1
+    return sorted(
+        ((name, self_us, count) for name, (self_us, count) in packages.items()),
+        key=lambda package: package[1],
+        reverse=True,
+    )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from rss_scraper.importtime import ImportProfileError
+from rss_scraper.importtime import TARGETS
+from rss_scraper.importtime import by_package
+from rss_scraper.importtime import profile_imports
+from rss_scraper.importtime import project_imports
+
+
+class Command(BaseCommand):
+    help = "Profile the imports of a cold started web or worker process"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "target",
+            nargs="*",
+            help=f"Kind of process to profile ({', '.join(sorted(TARGETS))}). "
+            "Profiles all of them by default",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=15,
+            help="Number of slowest packages and modules listed",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["target"]) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}")
+
+        for target in options["target"] or sorted(TARGETS):
+            try:
+                imports = profile_imports(TARGETS[target])
+            except ImportProfileError as exc:
+                raise CommandError(f"Importing {target} failed:\n{exc}")
+
+            total_us = sum(module_import.self_us for module_import in imports)
+            self.stdout.write(
+                f"{target}: {len(imports)} modules imported in {total_us / 1000:.1f}ms"
+            )
+
+            self.stdout.write("  slowest packages (self time):")
+            for package, self_us, count in by_package(imports)[: options["limit"]]:
+                self.stdout.write(f"    {self_us / 1000:8.1f}ms  {package} ({count} modules)")
+
+            self.stdout.write("  slowest imports of project modules (cumulative time):")
+            for module_import, importer in project_imports(imports)[: options["limit"]]:
+                self.stdout.write(
+                    f"    {module_import.cumulative_us / 1000:8.1f}ms  "
+                    f"{module_import.module} (from {importer})"
+                )
@@ -0,0 +1,92 @@
+import logging
+import resource
+import tracemalloc
+
+from django.conf import settings
+
+from rss_scraper.profiling import task_feed_ids
+
+logger = logging.getLogger(__name__)
+
+# Memory of the tasks running in this worker process, by task id
+_task_memory = {}
+
+
+def current_rss_kb():
+    """
+    :return: int - Resident memory of the process (KB), 0 if unknown
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0
+    return pages * resource.getpagesize() // 1024
+
+
+def peak_rss_kb():
+    """
+    :return: int - Peak resident memory of the process (KB)
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def start_task_memory(task_id=None, task=None, args=(), kwargs=None, **extra):
+    """
+    task_prerun handler, logging the feeds a task runs for before it runs,
+    so the feeds of a task killed for running out of memory are known.
+    With MEMORY_DEBUG_TOP_ALLOCATIONS set, traces the task's allocations
+    """
+    feed_ids = sorted(task_feed_ids(task, args, kwargs or {}))
+    rss = current_rss_kb()
+    logger.info("Started %s[%s] feeds=%s rss=%dKB", task.name, task_id, feed_ids, rss)
+
+    if settings.MEMORY_DEBUG_TOP_ALLOCATIONS:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # Also resets the traced peak, traces are of this task only
+        tracemalloc.clear_traces()
+    _task_memory[task_id] = (feed_ids, rss, peak_rss_kb())
+
+
+def stop_task_memory(task_id=None, task=None, **extra):
+    """
+    task_postrun handler, logging the memory a task grew the process by,
+    and whether it raised the process' peak memory. With allocations
+    traced, also logs the task's peak of traced memory and the sites
+    of the allocations it left behind
+    """
+    started = _task_memory.pop(task_id, None)
+    if started is None:
+        return
+    feed_ids, rss_before, peak_before = started
+
+    rss, peak = current_rss_kb(), peak_rss_kb()
+    logger.info(
+        "Finished %s[%s] feeds=%s rss=%dKB (%+dKB) peak_rss=%dKB%s",
+        task.name,
+        task_id,
+        feed_ids,
+        rss,
+        rss - rss_before,
+        peak,
+        " (raised by this task)" if peak > peak_before else "",
+    )
+
+    if settings.MEMORY_DEBUG_TOP_ALLOCATIONS and tracemalloc.is_tracing():
+        retained, traced_peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ]
+        )
+        logger.info(
+            "Allocations of %s[%s]: peak=%dKB retained=%dKB, top retained sites:",
+            task.name,
+            task_id,
+            traced_peak // 1024,
+            retained // 1024,
+        )
+        for stat in snapshot.statistics("lineno")[: settings.MEMORY_DEBUG_TOP_ALLOCATIONS]:
+            logger.info("  %s", stat)
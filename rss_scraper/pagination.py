@@ -0,0 +1,182 @@
+import base64
+import datetime as dt
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    """
+    Encode the ordering values of a row as an opaque, url safe cursor.
+    Datetimes keep their full (microsecond) precision
+
+    :param values: List - Ordering field values
+    :return: str
+    """
+    values = [v.isoformat() if isinstance(v, dt.datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from exc
+
+    if not isinstance(values, list):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return values
+
+
+def keyset_filter(ordering, values, nulls_first=(), nulls_last=()):
+    """
+    Build a filter selecting the rows that come after the row with
+    given values, in given ordering. E.g. for ["-created_at", "-id"]:
+    created_at <= x AND (created_at < x OR (created_at = x AND id < y)).
+    The redundant bound on the leading field lets the planner scan an
+    index range, rather than filter every row against the disjunction
+
+    :param ordering: List - Field names, "-" prefixed for descending order
+    :param values: List - Values of the ordering fields
+    :param nulls_first: Iterable - Nullable fields whose nulls come first
+    :param nulls_last: Iterable - Nullable fields whose nulls come last
+    :return: Q
+    """
+    lookup = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        operator = "lt" if field.startswith("-") else "gt"
+
+        if value is None:
+            if name in nulls_first:
+                lookup |= equal & Q(**{f"{name}__isnull": False})
+            equal &= Q(**{f"{name}__isnull": True})
+            continue
+
+        after = Q(**{f"{name}__{operator}": value})
+        if name in nulls_last:
+            after |= Q(**{f"{name}__isnull": True})
+        lookup |= equal & after
+        equal &= Q(**{name: value})
+    return lookup & leading_bound(ordering[0], values[0], nulls_first, nulls_last)
+
+
+def leading_bound(field, value, nulls_first=(), nulls_last=()):
+    """
+    Build the range of the leading ordering field the rows following
+    value are in, see keyset_filter
+
+    :param field: str - Field name, "-" prefixed for descending order
+    :param value: Value of the field
+    :param nulls_first: Iterable - Nullable fields whose nulls come first
+    :param nulls_last: Iterable - Nullable fields whose nulls come last
+    :return: Q - Empty where the range is every row
+    """
+    name = field.lstrip("-")
+    if value is None:
+        # Past the nulls every row follows, before them only nulls do
+        if name in nulls_last:
+            return Q(**{f"{name}__isnull": True})
+        return Q()
+
+    operator = "lte" if field.startswith("-") else "gte"
+    bound = Q(**{f"{name}__{operator}": value})
+    if name in nulls_last:
+        bound |= Q(**{f"{name}__isnull": True})
+    return bound
+
+
+def paginate_keyset(queryset, ordering, cursor=None, page_size=50, nullable=()):
+    """
+    Return a page of rows following cursor. Unlike offset pagination,
+    every page costs the same index range scan, however deep it is.
+    The last ordering field must be unique (e.g. "-id")
+
+    :param queryset: QuerySet - Rows to paginate, model instances or dicts
+    :param ordering: List - Field names, "-" prefixed for descending order
+    :param cursor: str - Cursor returned with the previous page
+    :param page_size: int - Maximum rows per page
+    :param nullable: Iterable - Nullable fields of ordering. Nulls are
+        ordered like the database does natively, so plain indexes serve it
+    :return: Tuple - (list of rows, cursor of the next page or None)
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(ordering):
+            raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+        # e.g. postgres orders nulls as the largest values, sqlite as the smallest
+        nulls_largest = connections[queryset.db].features.nulls_order_largest
+        nulls_first, nulls_last = [], []
+        for field in ordering:
+            if field.lstrip("-") in nullable:
+                descending = field.startswith("-")
+                placement = nulls_first if descending == nulls_largest else nulls_last
+                placement.append(field.lstrip("-"))
+
+        try:
+            queryset = queryset.filter(
+                keyset_filter(ordering, values, nulls_first, nulls_last)
+            )
+        except (ValueError, TypeError, ValidationError) as exc:
+            raise InvalidCursor(f"Invalid cursor: {cursor}") from exc
+
+    rows = list(queryset[: page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    names = [field.lstrip("-") for field in ordering]
+    if isinstance(last, dict):
+        values = [last[name] for name in names]
+    else:
+        values = [getattr(last, name) for name in names]
+    return rows, encode_cursor(values)
+
+
+def estimate_count(queryset):
+    """
+    Estimate the rows of a queryset from the query planner's statistics,
+    rather than counting them (a scan of every matching row)
+
+    :param queryset: QuerySet
+    :return: int - Estimated rows, None where the database can't tell
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator of large tables, e.g. for admin changelists. Counts of
+    more than ADMIN_EXACT_COUNT_LIMIT estimated rows aren't counted
+    exactly, the estimate is used instead
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate <= settings.ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        return estimate
@@ -0,0 +1,207 @@
+import datetime as dt
+import inspect
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+
+class SamplingProfiler:
+    """
+    Sample the call stack of a thread every PROFILING_INTERVAL secs from
+    a background thread. Unlike cProfile, the profiled code isn't slowed
+    down by tracing every call, so it can run on production traffic.
+
+    Stacks are counted in the collapsed format of flamegraph.pl
+    (also read by speedscope): "outer;inner;innermost count". Threads
+    patched by gevent can't be sampled, profiles of the fetch workers
+    only hold their queries
+    """
+
+    def __init__(self, interval=None, thread_id=None):
+        self.interval = interval or settings.PROFILING_INTERVAL
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                filename = os.path.relpath(code.co_filename, settings.BASE_DIR)
+                names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def collapsed(self):
+        """
+        :return: str - Sampled stacks in the collapsed format
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class QueryLog:
+    """
+    Record the SQL queries run on the current thread's database
+    connection, see the execute_wrapper of django.db connections
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+    def lines(self):
+        """
+        :return: str - One line per query, with its duration in ms
+        """
+        return "".join(
+            f"{seconds * 1000:.2f}ms {' '.join(sql.split())}\n" for seconds, sql in self.queries
+        )
+
+
+@contextmanager
+def profile(name):
+    """
+    Profile the code run within the block, writing its sampled stacks to
+    <PROFILING_DIR>/<time>-<name>-<pid>.folded and its SQL queries to the
+    same path ending in .sql
+
+    :param name: str - Name of the profile, e.g. a url path or task name
+    :return: Dict - Yields the profile's "path" (without extension), set
+        once the block has run
+    """
+    result = {}
+    profiler = SamplingProfiler()
+    query_log = QueryLog()
+    profiler.start()
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(query_log):
+            yield result
+    finally:
+        elapsed = time.perf_counter() - started
+        profiler.stop()
+        result["path"] = write_profile(name, profiler, query_log, elapsed)
+
+
+def write_profile(name, profiler, query_log, elapsed):
+    """
+    :return: str - Path of the profile's files, without extension
+    """
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    slug = re.sub(r"[^\w.-]+", "-", name).strip("-")[:100]
+    stamp = dt.datetime.utcnow().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(settings.PROFILING_DIR, f"{stamp}-{slug}-{os.getpid()}")
+
+    with open(f"{path}.folded", "w") as folded_file:
+        folded_file.write(profiler.collapsed())
+    with open(f"{path}.sql", "w") as sql_file:
+        sql_file.write(
+            f"-- {name}: {elapsed * 1000:.1f}ms, {len(query_log.queries)} queries\n"
+        )
+        sql_file.write(query_log.lines())
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests of staff users asking for it, with ?profile=1 or an
+    X-Profile: 1 header, and every request of PROFILING_USERNAMES. The
+    profile's name is sent back in the X-Profile response header.
+    Not used unless PROFILING_DIR is set
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIR:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        with profile(f"{request.method} {request.path}") as result:
+            response = self.get_response(request)
+        response["X-Profile"] = os.path.basename(result["path"])
+        return response
+
+    def should_profile(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return False
+        if user.get_username() in settings.PROFILING_USERNAMES:
+            return True
+        requested = (
+            request.GET.get("profile") == "1" or request.headers.get("X-Profile") == "1"
+        )
+        return requested and user.is_staff
+
+
+# Profiles of the tasks running in this worker process, by task id
+_task_profiles = {}
+
+
+def task_feed_ids(task, args, kwargs):
+    """
+    :return: Set - PKs of the feeds a task was called with, as its
+        feed_id or feed_ids argument
+    """
+    try:
+        arguments = inspect.signature(task.run).bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return set()
+    feed_ids = set(arguments.get("feed_ids") or [])
+    if arguments.get("feed_id"):
+        feed_ids.add(arguments["feed_id"])
+    return {int(feed_id) for feed_id in feed_ids}
+
+
+def start_task_profile(task_id=None, task=None, args=(), kwargs=None, **extra):
+    """
+    task_prerun handler, profiling tasks named in PROFILING_TASKS
+    and tasks of the feeds in PROFILING_FEED_IDS
+    """
+    if not settings.PROFILING_DIR:
+        return
+    if task.name not in settings.PROFILING_TASKS and not (
+        task_feed_ids(task, args, kwargs or {}) & set(settings.PROFILING_FEED_IDS)
+    ):
+        return
+
+    block = profile(f"{task.name}-{task_id}")
+    block.__enter__()
+    _task_profiles[task_id] = block
+
+
+def stop_task_profile(task_id=None, **extra):
+    """
+    task_postrun handler, writing the profile of a profiled task
+    """
+    block = _task_profiles.pop(task_id, None)
+    if block is not None:
+        block.__exit__(None, None, None)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 
 import os
 
+from kombu import Queue
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname((__file__)))
 
@@ -36,28 +38,33 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     # Third party apps
-    "debug_toolbar",
-    "django_extensions",
     "stronghold",
     # Internal Apps
     "apps.feeds",
     "apps.notifications",
     "apps.user",
+    "apps.api",
     "rss_scraper",
 ]
 
 MIDDLEWARE = [
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "rss_scraper.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "stronghold.middleware.LoginRequiredMiddleware",
 ]
 
+# Development only apps, kept out of production processes (the toolbar
+# alone imports pkg_resources, slowing down every worker's start)
+if DEBUG:
+    INSTALLED_APPS += ["debug_toolbar", "django_extensions"]
+    MIDDLEWARE.insert(0, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "rss_scraper.urls"
 
 TEMPLATES = [
@@ -80,6 +87,25 @@ WSGI_APPLICATION = "rss_scraper.wsgi.application"
 
 REQUEST_TIMEOUT = 10
 
+# Host name resolutions are cached per worker process for a fixed TTL
+# (seconds), failed resolutions for the negative TTL. The cache's hit
+# rate and resolver latency are logged every stats interval lookups
+DNS_CACHE_TTL = int(os.environ.get("DNS_CACHE_TTL", 5 * 60))
+DNS_CACHE_NEGATIVE_TTL = 60
+DNS_CACHE_MAX_SIZE = 10000
+DNS_CACHE_STATS_INTERVAL = int(os.environ.get("DNS_CACHE_STATS_INTERVAL", 1000))
+
+# Fetches a worker process runs at once, keep it in line with the fetch
+# workers' pool size (-c). Sizes the fetches' HTTP connection pools
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", 200))
+
+# Feed downloads are aborted past this decompressed size (bytes)
+FEED_MAX_BODY_SIZE = int(os.environ.get("FEED_MAX_BODY_SIZE", 20 * 1024 * 1024))
+
+# Maximum size (bytes) and number of feeds of imported OPML files
+OPML_MAX_SIZE = 5 * 1024 * 1024
+OPML_MAX_FEEDS = 5000
+
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 DATABASES = {
@@ -122,6 +148,30 @@ USE_L10N = True
 USE_TZ = False
 
 
+# Characters of the plain text excerpts of entries, shown on list pages (max 255)
+ENTRY_EXCERPT_LENGTH = 200
+
+# Items of a feed read or unread out of order that its read state keeps
+# track of, past it the oldest are dropped (see ReadStateQuerySet.compact)
+READ_STATE_MAX_EXCEPTIONS = 100
+
+
+# Pagination
+NOTIFICATIONS_PAGE_SIZE = 50
+RIVER_PAGE_SIZE = 50
+# JSON API, clients pick page sizes up to API_MAX_PAGE_SIZE with ?limit=
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+# Maximum ids updated by one bulk mutation
+API_MAX_BULK_SIZE = 500
+
+# Admin changelists show the planner's estimate of tables with more rows
+# than the limit rather than counting them. Bulk actions are run in the
+# background, by batches of feeds
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_ACTION_BATCH_SIZE = 1000
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 STATIC_URL = "/static/"
@@ -132,6 +182,116 @@ CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND")
 CELERY_ACCEPT_CONTENT = ["application/json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
-CELERY_BEAT_SCHEDULE = {"task": {"task": "feeds.update_all", "schedule": 30 * 60,}}
+CELERY_BEAT_SCHEDULE = {
+    "task": {"task": "feeds.update_all", "schedule": 30 * 60,},
+    "websub": {"task": "feeds.renew_websub_subscriptions", "schedule": 60 * 60,},
+    "spool": {"task": "feeds.clean_spool", "schedule": 60 * 60,},
+}
 CELERY_MAX_RETRIES = 2
 CELERY_RETRY_BACKOFF = 5
+
+# Feeds are refreshed at most once at a time. A refresh that does not
+# finish within the timeout (seconds) is considered lost. Users can't
+# refresh a feed again within the minimum interval (seconds)
+FEED_REFRESH_LOCK_TIMEOUT = 10 * 60
+FEED_MIN_REFRESH_INTERVAL = 60
+
+# Circuit breaker of failing feeds (and hosts). After THRESHOLD consecutive
+# failed updates a feed is only probed again after an exponentially growing
+# delay (seconds), starting at one update cycle. Feeds failing for
+# QUARANTINE_DAYS are no longer updated until a user updates them manually
+FEED_BREAKER_THRESHOLD = 3
+FEED_BREAKER_BASE_DELAY = 30 * 60
+FEED_BREAKER_MAX_DELAY = 24 * 60 * 60
+FEED_QUARANTINE_DAYS = 14
+HOST_BREAKER_THRESHOLD = 10
+
+# WebSub push subscriptions, enabled when the public base url hubs can
+# reach the callback at is set. Feeds pushed by their hub are only
+# polled every fallback interval. Leases are renewed within the renewal
+# margin of their expiry, leases granted by hubs are capped at the max
+# lease (seconds)
+WEBSUB_CALLBACK_URL = os.environ.get("WEBSUB_CALLBACK_URL", "")
+WEBSUB_LEASE_SECONDS = 10 * 24 * 60 * 60
+WEBSUB_MAX_LEASE_SECONDS = 30 * 24 * 60 * 60
+WEBSUB_RENEWAL_MARGIN = 24 * 60 * 60
+WEBSUB_FALLBACK_POLL_INTERVAL = 12 * 60 * 60
+
+# Feed updates are split over queues by the resource each stage consumes:
+# fetch (network), parse (CPU) and store (database). See README for the
+# worker profile consuming each queue
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_QUEUES = [
+    Queue(name, routing_key=name, queue_arguments={"x-max-priority": 10})
+    for name in ("default", "fetch", "parse", "store")
+]
+CELERY_TASK_ROUTES = {
+    "apps.feeds.tasks.get_feed": {"queue": "fetch"},
+    "apps.feeds.tasks.import_feed": {"queue": "fetch"},
+    "apps.feeds.tasks.parse_feed": {"queue": "parse"},
+    "feeds.clean_spool": {"queue": "parse"},
+    "apps.feeds.tasks.update_feed": {"queue": "store"},
+    "apps.feeds.tasks.update_feeds": {"queue": "store"},
+}
+# Higher priorities are consumed first. User-initiated refreshes
+# jump ahead of scheduled updates
+FEED_POLL_PRIORITY = 3
+FEED_REFRESH_PRIORITY = 9
+CELERY_TASK_QUEUE_MAX_PRIORITY = 10
+CELERY_TASK_DEFAULT_PRIORITY = FEED_POLL_PRIORITY
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Greenlets of a gevent pool (the fetch workers) querying the database at
+# once. Each one holds a connection only while it queries, so a gevent
+# worker opens at most this many connections, see rss_scraper.db
+FETCH_DB_CONCURRENCY = int(os.environ.get("FETCH_DB_CONCURRENCY", 10))
+# Prefork worker processes are replaced after running the max tasks, or
+# once a task leaves them using more than the max resident memory (KB),
+# so memory fragmented by huge feeds is given back between tasks
+CELERY_WORKER_MAX_TASKS_PER_CHILD = int(
+    os.environ.get("CELERY_WORKER_MAX_TASKS_PER_CHILD", 500)
+)
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = int(
+    os.environ.get("CELERY_WORKER_MAX_MEMORY_PER_CHILD", 300 * 1024)
+)
+# Tasks log the worker's resident memory before and after running, with
+# the feeds they run for. When set, allocations are traced (slow, for
+# debugging) and the top sites of the allocations each task left behind
+# are logged
+MEMORY_DEBUG_TOP_ALLOCATIONS = int(os.environ.get("MEMORY_DEBUG_TOP_ALLOCATIONS", 0))
+
+# Backpressure of the fetch stage: fetches wait (up to FEED_PARSE_MAX_WAIT
+# seconds) while more than FEED_PARSE_MAX_BACKLOG bodies wait in the parse
+# queue. The backlog is checked at most once per interval (seconds) per
+# worker process. Disabled when the max backlog is 0
+FEED_PARSE_MAX_BACKLOG = int(os.environ.get("FEED_PARSE_MAX_BACKLOG", 0))
+FEED_PARSE_MAX_WAIT = 60
+FEED_PARSE_BACKLOG_CHECK_INTERVAL = 1
+
+# Fetched bodies of at least FEED_SPOOL_MIN_SIZE chars are handed over to
+# the parse workers through files of FEED_SPOOL_DIR, a directory shared by
+# the fetch and parse workers, rather than through the broker. Disabled
+# when no directory is set. Files never parsed are removed after the max
+# age (seconds). A spooled body waits in the parse queue until a parse
+# worker gets to it: behind the backlog, which keeps growing once fetches
+# stop waiting after FEED_PARSE_MAX_WAIT, and for as long as the parse
+# workers are down. Keep the max age well above FEED_PARSE_MAX_WAIT plus
+# that queue latency, a body removed before it's parsed fails its update
+FEED_SPOOL_DIR = os.environ.get("FEED_SPOOL_DIR", "")
+FEED_SPOOL_MIN_SIZE = 64 * 1024
+FEED_SPOOL_MAX_AGE = int(os.environ.get("FEED_SPOOL_MAX_AGE", 6 * 60 * 60))
+
+# Opt-in profiling in production, disabled unless PROFILING_DIR is set.
+# Profiles are written to the directory as sampled stacks (.folded, for
+# flamegraph.pl or speedscope) sampled every interval (seconds), plus the
+# SQL queries run (.sql). Staff users profile a request by adding
+# ?profile=1 or an X-Profile: 1 header, and every request of the listed
+# users is profiled. Celery tasks are profiled by name and by the feeds
+# they update. Lists are space separated in the environment
+PROFILING_DIR = os.environ.get("PROFILING_DIR", "")
+PROFILING_INTERVAL = 0.005
+PROFILING_USERNAMES = os.environ.get("PROFILING_USERNAMES", "").split()
+PROFILING_TASKS = os.environ.get("PROFILING_TASKS", "").split()
+PROFILING_FEED_IDS = [int(pk) for pk in os.environ.get("PROFILING_FEED_IDS", "").split()]
+
+# Ingestion benchmarks, see `python manage.py benchmark_ingest --help`
+BENCHMARK_RESULTS_FILE = os.path.join(BASE_DIR, "benchmarks", "results.jsonl")
@@ -0,0 +1,33 @@
+import threading
+
+from rss_scraper import db
+from rss_scraper.db import db_slot
+
+
+def test_db_slot_without_gevent(mocker):
+    """
+    Verify queries outside gevent pools keep their connection
+    """
+    connection = mocker.patch("rss_scraper.db.connection")
+
+    with db_slot():
+        pass
+
+    connection.close.assert_not_called()
+
+
+def test_db_slot_gevent(mocker):
+    """
+    Verify greenlets take a slot while querying, and
+    close their connection once done
+    """
+    slots = threading.BoundedSemaphore(1)
+    mocker.patch.object(db, "_db_slots", slots)
+    connection = mocker.patch("rss_scraper.db.connection")
+    connection.in_atomic_block = False
+
+    with db_slot():
+        assert not slots.acquire(blocking=False)
+
+    assert slots.acquire(blocking=False)
+    connection.close.assert_called_once_with()
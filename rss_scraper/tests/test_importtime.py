@@ -0,0 +1,40 @@
+import pytest
+
+from rss_scraper.importtime import ModuleImport
+from rss_scraper.importtime import TARGETS
+from rss_scraper.importtime import by_package
+from rss_scraper.importtime import profile_imports
+from rss_scraper.importtime import project_imports
+
+# Imported on first use only, by the processes needing them
+LAZY_PACKAGES = {"feedparser", "requests", "dateutil"}
+
+
+@pytest.mark.parametrize("target", sorted(TARGETS))
+def test_cold_start_imports(target):
+    """
+    Verify cold started processes don't import the
+    dependencies of fetching and parsing feeds
+    """
+    imports = profile_imports(TARGETS[target])
+
+    packages = {module_import.module.split(".")[0] for module_import in imports}
+    assert "apps" in packages
+    assert not packages & LAZY_PACKAGES
+
+
+def test_project_imports():
+    """
+    Verify imports are attributed to the project modules importing them
+    """
+    # As listed by -X importtime, a module's imports before it
+    imports = [
+        ModuleImport("feedparser.sgml", 20, 20, 2),
+        ModuleImport("feedparser", 100, 120, 1),
+        ModuleImport("apps.feeds.utils", 10, 10, 1),
+        ModuleImport("apps.feeds.parser", 5, 135, 0),
+        ModuleImport("json", 30, 30, 0),
+    ]
+
+    assert project_imports(imports) == [(imports[1], "apps.feeds.parser")]
+    assert by_package(imports) == [("feedparser", 120, 2), ("json", 30, 1), ("apps", 15, 2)]
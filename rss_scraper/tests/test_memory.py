@@ -0,0 +1,65 @@
+import logging
+import tracemalloc
+
+import pytest
+
+from apps.feeds.tasks import update_feeds
+from rss_scraper.celery import app as celery_app
+from rss_scraper.memory import current_rss_kb
+from rss_scraper.memory import peak_rss_kb
+from rss_scraper.memory import start_task_memory
+from rss_scraper.memory import stop_task_memory
+
+
+def test_rss():
+    """
+    Verify the process' resident memory is read. The kernel updates the
+    peak lazily, it may lag behind the current resident memory
+    """
+    assert current_rss_kb() > 0
+    assert peak_rss_kb() > 0
+
+
+def test_task_memory(caplog):
+    """
+    Verify the memory of tasks is logged with their feeds
+    """
+    caplog.set_level(logging.INFO, logger="rss_scraper.memory")
+
+    start_task_memory(task_id="a", task=update_feeds, args=([], [1, 2]), kwargs={})
+    stop_task_memory(task_id="a", task=update_feeds)
+
+    started, finished = caplog.messages
+    assert started.startswith(f"Started {update_feeds.name}[a] feeds=[1, 2] rss=")
+    assert finished.startswith(f"Finished {update_feeds.name}[a] feeds=[1, 2] rss=")
+
+
+def test_task_memory_top_allocations(caplog, settings):
+    """
+    Verify the sites of the allocations a task leaves
+    behind are logged in debug mode
+    """
+    caplog.set_level(logging.INFO, logger="rss_scraper.memory")
+    settings.MEMORY_DEBUG_TOP_ALLOCATIONS = 3
+
+    try:
+        start_task_memory(task_id="a", task=update_feeds, args=([], [1]), kwargs={})
+        leaked = [bytearray(1024) for _ in range(1000)]
+        stop_task_memory(task_id="a", task=update_feeds)
+    finally:
+        tracemalloc.stop()
+
+    assert caplog.messages[2].startswith(f"Allocations of {update_feeds.name}[a]: peak=")
+    assert "rss_scraper/tests/test_memory.py" in caplog.messages[3]
+    assert len(caplog.messages) == 6
+
+
+def test_worker_recycling(settings):
+    """
+    Verify worker processes are recycled by task count and memory
+    """
+    assert celery_app.conf.worker_max_tasks_per_child == settings.CELERY_WORKER_MAX_TASKS_PER_CHILD
+    assert (
+        celery_app.conf.worker_max_memory_per_child
+        == settings.CELERY_WORKER_MAX_MEMORY_PER_CHILD
+    )
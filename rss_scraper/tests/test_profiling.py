@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from django import urls
+from django.contrib.auth import get_user_model
+from django_dynamic_fixture import G
+
+from apps.feeds.models import Feed
+from apps.feeds.tasks import get_feed
+from apps.feeds.tasks import update_feeds
+from rss_scraper.profiling import profile
+from rss_scraper.profiling import start_task_profile
+from rss_scraper.profiling import stop_task_profile
+from rss_scraper.profiling import task_feed_ids
+
+
+@pytest.fixture
+def profiling_dir(settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path)
+    settings.PROFILING_INTERVAL = 0.001
+    return tmp_path
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.django_db
+def test_profile(profiling_dir):
+    """
+    Verify profiles hold the sampled stacks in the collapsed
+    format, and the SQL queries run
+    """
+    with profile("GET /feeds/") as result:
+        busy(0.05)
+        list(Feed.objects.all())
+
+    with open(f"{result['path']}.folded") as folded_file:
+        stacks = folded_file.read().splitlines()
+    assert stacks
+    assert any("busy (rss_scraper/tests/test_profiling.py" in stack for stack in stacks)
+    assert all(stack.rsplit(" ", 1)[1].isdigit() for stack in stacks)
+
+    with open(f"{result['path']}.sql") as sql_file:
+        lines = sql_file.read().splitlines()
+    assert lines[0].startswith("-- GET /feeds/: ")
+    assert 'FROM "feeds_feed"' in lines[1]
+    assert sorted(path.suffix for path in profiling_dir.iterdir()) == [".folded", ".sql"]
+
+
+@pytest.mark.django_db
+def test_profiling_middleware(client, authenticated_user, profiling_dir, settings):
+    """
+    Verify requests are only profiled for staff users asking for
+    it, or for the users listed in PROFILING_USERNAMES
+    """
+    url = urls.reverse("feeds:myfeeds")
+
+    resp = client.get(url, {"profile": "1"})
+    assert "X-Profile" not in resp
+    assert not list(profiling_dir.iterdir())
+
+    authenticated_user.is_staff = True
+    authenticated_user.save()
+    resp = client.get(url, HTTP_X_PROFILE="1")
+    assert resp.status_code == 200
+    assert "-GET-feeds-myfeeds-" in resp["X-Profile"]
+    assert (profiling_dir / f"{resp['X-Profile']}.sql").exists()
+
+    authenticated_user.is_staff = False
+    authenticated_user.save()
+    settings.PROFILING_USERNAMES = [authenticated_user.username]
+    resp = client.get(url)
+    assert "X-Profile" in resp
+
+
+def test_task_feed_ids():
+    """
+    Verify the feeds of a task are found in its arguments
+    """
+    assert task_feed_ids(get_feed, (1,), {"feed_ids": [1, 2]}) == {1, 2}
+    assert task_feed_ids(update_feeds, ([], ["3"]), {}) == {3}
+    assert task_feed_ids(update_feeds, (), {"foo": 1}) == set()
+
+
+@pytest.mark.django_db
+def test_task_profile(profiling_dir, settings):
+    """
+    Verify tasks are profiled by name and by feed
+    """
+    settings.PROFILING_FEED_IDS = [2]
+
+    start_task_profile(task_id="a", task=update_feeds, args=([], [1]), kwargs={})
+    stop_task_profile(task_id="a")
+    assert not list(profiling_dir.iterdir())
+
+    start_task_profile(task_id="b", task=update_feeds, args=([], [1, 2]), kwargs={})
+    stop_task_profile(task_id="b")
+    assert len(list(profiling_dir.glob("*-b-*.folded"))) == 1
+
+    settings.PROFILING_TASKS = [get_feed.name]
+    start_task_profile(task_id="c", task=get_feed, args=(1,), kwargs={})
+    stop_task_profile(task_id="c")
+    assert len(list(profiling_dir.glob("*-c-*.sql"))) == 1
@@ -0,0 +1,159 @@
+import datetime as dt
+
+import pytest
+
+from django import urls
+
+from apps.feeds.models import Comment
+from apps.feeds.models import Entry
+from apps.feeds.models import Feed
+from apps.feeds.models import Item
+from apps.feeds.models import ReadState
+from apps.notifications.models import Notification
+from rss_scraper.tests.utils import assert_view_budget
+from rss_scraper.tests.utils import normalize_sql
+from rss_scraper.tests.utils import top_queries
+
+FEEDS = 200
+ITEMS_PER_FEED = 100
+NOTIFICATIONS = 300
+
+
+@pytest.fixture
+def large_dataset(authenticated_user):
+    """
+    Seed realistic data volumes for the authenticated user:
+    hundreds of feeds, tens of thousands of items
+    """
+    feeds = Feed.objects.bulk_create(
+        [
+            Feed(
+                title=f"feed{i}",
+                link=f"https://test.com/{i}",
+                description="testing",
+                rss_url=f"https://test.com/{i}/rss",
+                subscriber=authenticated_user,
+            )
+            for i in range(FEEDS)
+        ]
+    )
+    # bulk_create only sets primary keys on postgres
+    feeds = list(authenticated_user.feeds.all())
+
+    published_at = dt.datetime(2020, 7, 1)
+    Entry.objects.bulk_create(
+        [
+            Entry(
+                source_url=feed.rss_url,
+                guid=f"https://test.com/item/{i}",
+                title=f"item{i}",
+                link=f"https://test.com/item/{i}",
+                description="lorem ipsum " * 50,
+                published_at=published_at - dt.timedelta(minutes=i),
+            )
+            for feed in feeds
+            for i in range(ITEMS_PER_FEED)
+        ]
+    )
+    entries = {
+        (entry.source_url, entry.guid): entry for entry in Entry.objects.all()
+    }
+    Item.objects.bulk_create(
+        [
+            Item(
+                entry=entries[feed.rss_url, f"https://test.com/item/{i}"],
+                feed=feed,
+                subscriber=authenticated_user,
+                published_at=published_at - dt.timedelta(minutes=i),
+                bookmark=i % 50 == 0,
+            )
+            for feed in feeds
+            for i in range(ITEMS_PER_FEED)
+        ]
+    )
+    # The older two thirds of each feed's items are read,
+    # a few of them out of order
+    read_states = []
+    for feed in feeds:
+        item_ids = list(feed.items.order_by("id").values_list("id", flat=True))
+        read_states.append(
+            ReadState(
+                feed=feed,
+                read_up_to=item_ids[66],
+                read_ids=item_ids[70:72],
+                unread_ids=item_ids[10:12],
+            )
+        )
+    ReadState.objects.bulk_create(read_states)
+    Notification.objects.bulk_create(
+        [
+            Notification(title=f"failed{i}", details="/", user=authenticated_user)
+            for i in range(NOTIFICATIONS)
+        ]
+    )
+
+    item = Item.objects.filter(feed=feeds[0]).first()
+    Comment.objects.bulk_create([Comment(text=f"comment{i}", item=item) for i in range(20)])
+
+    return {"feed": feeds[0], "item": item}
+
+
+@pytest.mark.parametrize(
+    "url_name, url_kwarg, max_queries, max_seconds",
+    [
+        ("feeds:myfeeds", None, 6, 1.0),
+        ("feeds:river", None, 7, 1.0),
+        ("feeds:feed_detail", "feed", 9, 1.0),
+        ("feeds:bookmarks", None, 7, 1.0),
+        ("feeds:item_detail", "item", 9, 1.0),
+        ("notifications:notifications", None, 5, 1.0),
+    ],
+)
+@pytest.mark.django_db
+def test_view_budgets(client, large_dataset, url_name, url_kwarg, max_queries, max_seconds):
+    """
+    Verify views stay within their query count and wall time budgets
+    for users with large numbers of feeds, items and notifications
+    """
+    args = [large_dataset[url_kwarg].pk] if url_kwarg else None
+    assert_view_budget(client, urls.reverse(url_name, args=args), max_queries, max_seconds)
+
+
+@pytest.mark.parametrize(
+    "url_name, url_kwarg",
+    [
+        ("feeds:feed_detail", "feed"),
+        ("feeds:bookmarks", None),
+        ("feeds:item_detail", "item"),
+    ],
+)
+@pytest.mark.django_db
+def test_conditional_view_budgets(client, large_dataset, url_name, url_kwarg):
+    """
+    Verify unchanged pages are answered with a 304 from version
+    stamps, without the queries of rendering them
+    """
+    args = [large_dataset[url_kwarg].pk] if url_kwarg else None
+    url = urls.reverse(url_name, args=args)
+    # Reading an item bumps its page's stamps once
+    client.get(url)
+    etag = client.get(url)["ETag"]
+
+    assert_view_budget(client, url, 4, 0.2, status_code=304, HTTP_IF_NONE_MATCH=etag)
+
+
+def test_top_queries():
+    """
+    Verify repeated statements are grouped and ranked first
+    """
+    captured_queries = [
+        {"sql": "SELECT * FROM feeds_item WHERE id = 1", "time": "0.001"},
+        {"sql": "SELECT * FROM feeds_item WHERE id = 2", "time": "0.002"},
+        {"sql": "SELECT * FROM feeds_feed WHERE title = 'foo'", "time": "0.010"},
+    ]
+
+    assert top_queries(captured_queries) == [
+        (2, 0.003, "SELECT * FROM feeds_item WHERE id = ?"),
+        (1, 0.010, "SELECT * FROM feeds_feed WHERE title = ?"),
+    ]
+    assert normalize_sql("WHERE id IN (1, 2, 3)") == "WHERE id IN (?...)"
@@ -0,0 +1,66 @@
+import os
+import re
+import time
+from collections import defaultdict
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Scales wall time budgets, e.g. on slow CI machines
+TIME_FACTOR = float(os.environ.get("VIEW_BUDGET_TIME_FACTOR", 1))
+
+
+def normalize_sql(sql):
+    """
+    Replace literal values in a query so repetitions of the
+    same statement (N+1 queries) group together
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(\.\d+)?\b", "?", sql)
+    return re.sub(r"\(\?(, \?)+\)", "(?...)", sql)
+
+
+def top_queries(captured_queries, limit=5):
+    """
+    Group captured queries by statement and return the most
+    frequent/expensive ones as (count, total seconds, sql)
+    """
+    grouped = defaultdict(lambda: [0, 0.0])
+    for query in captured_queries:
+        stats = grouped[normalize_sql(query["sql"])]
+        stats[0] += 1
+        stats[1] += float(query["time"])
+
+    ranked = sorted(grouped.items(), key=lambda kv: (kv[1][0], kv[1][1]), reverse=True)
+    return [(count, seconds, sql) for sql, (count, seconds) in ranked[:limit]]
+
+
+def assert_view_budget(client, url, max_queries, max_seconds, status_code=200, **extra):
+    """
+    Request url and assert the response was served within
+    a maximum query count and wall time budget. On failure
+    the top offending queries are reported
+
+    :param extra: Request headers, e.g. HTTP_IF_NONE_MATCH
+
+    :return: HttpResponse
+    """
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        resp = client.get(url, **extra)
+        elapsed = time.perf_counter() - started
+
+    assert resp.status_code == status_code
+    num_queries = len(ctx.captured_queries)
+    max_seconds *= TIME_FACTOR
+
+    if num_queries > max_queries or elapsed > max_seconds:
+        report = "\n".join(
+            f"  {count}x {seconds:.4f}s {sql[:300]}"
+            for count, seconds, sql in top_queries(ctx.captured_queries)
+        )
+        raise AssertionError(
+            f"{url} exceeded its budget: {num_queries} queries (max {max_queries}), "
+            f"{elapsed:.3f}s (max {max_seconds:.3f}s). Top queries:\n{report}"
+        )
+    return resp
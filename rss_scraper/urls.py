@@ -8,6 +8,7 @@ import rss_scraper.views
 urlpatterns = [
     path("", public(rss_scraper.views.Home.as_view()), name="home"),
     path("admin/", admin.site.urls),
+    path("api/", include("apps.api.urls")),
     path("feeds/", include("apps.feeds.urls")),
     path("notifications/", include("apps.notifications.urls")),
     path("user/", include("apps.user.urls")),